@@ -1,14 +1,13 @@
 import os
-import uuid
 import json
 import subprocess
 from datetime import datetime, timedelta
-from flask import Flask, request, render_template, url_for, send_from_directory, flash, jsonify , send_file ,make_response
-from werkzeug.utils import secure_filename
-import cv_gen.generator as generator
+from flask import Flask, request, render_template, url_for, send_from_directory, flash, jsonify ,make_response
+import builds
+import delivery
 from models import User, CVData, ContactMessage
 from auth import auth as auth_blueprint
-from extensions import db, login_manager,get_celery ,get_limiter , init_app
+from extensions import db, login_manager,get_celery ,get_limiter , get_template_registry , get_job_queue , get_janitor , get_prefetcher , build_wait , init_app
 from forms import CVForm
 from functools import wraps
 import os
@@ -22,6 +21,10 @@ from flask_minify import Minify
 from about import about as about_blueprint
 from templates import templates as templates_blueprint
 from articles import articles as articles_blueprint
+from metrics import metrics as metrics_blueprint
+from jobs import jobs as jobs_blueprint, job_response
+from cv_gen.admission import CompileBusy
+from cv_gen.ingest import UploadRejected
 
 
 
@@ -48,6 +51,18 @@ def create_app():
 
     limiter = get_limiter(app)
 
+    # Compile the LaTeX templates up front instead of on the first request
+    get_template_registry(app)
+
+    # CV builds run as jobs, see cv_gen/job_queue.py
+    get_job_queue(app).register("build_cv", builds.build_job)
+
+    # Lazily saved PDFs are built ahead of time while no build is pending
+    get_prefetcher(app).register(builds.prefetch_pdf)
+
+    # Expired uploads, .tex files and PDFs are removed in the background
+    get_janitor(app).start()
+
     # Register blueprints
     app.register_blueprint(auth_blueprint)
     app.register_blueprint(routes_blueprint)  
@@ -55,6 +70,8 @@ def create_app():
     app.register_blueprint(about_blueprint)
     app.register_blueprint(templates_blueprint)
     app.register_blueprint(articles_blueprint)
+    app.register_blueprint(metrics_blueprint)
+    app.register_blueprint(jobs_blueprint)
 
     
     # Helper functions
@@ -62,16 +79,6 @@ def create_app():
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
-    def cleanup_old_files(directory, days=1):
-        now = datetime.now()
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            if os.path.isfile(filepath):
-                modified_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                if now - modified_time > timedelta(days=days):
-                    os.remove(filepath)
-                    app.logger.info(f"Removed old file: {filepath}")
-
     def json_response(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -83,6 +90,35 @@ def create_app():
             return jsonify(response), status
         return wrapper
 
+    def upload_success_response(pdf_filename):
+        # Check if request wants JSON response (for AJAX)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            app.logger.info("Returning JSON response for AJAX request")
+            return jsonify({
+                'success': True,
+                'download_link': url_for('download_file', filename=pdf_filename),
+                'preview_link': url_for('preview_pdf', filename=pdf_filename)
+            })
+        
+        # Regular form response
+        app.logger.info("File processing completed successfully")
+        flash("File uploaded and converted successfully!")
+        return render_template( RoutePath.home_index ,
+                            download_link=pdf_filename,
+                            preview_link=url_for('preview_pdf', filename=pdf_filename))
+
+    def busy_response(error):
+        # Saturated build queue: answer right away and tell the client when to retry
+        message = "The server is busy generating other CVs, please try again shortly"
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = jsonify({'success': False, 'error': message, 'retry_after': error.retry_after})
+        else:
+            flash(message)
+            response = make_response(render_template( RoutePath.home_index ))
+        response.status_code = 503
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+
     # Add this helper function to check allowed image types
     def allowed_image_file(filename):
         return '.' in filename and \
@@ -126,14 +162,17 @@ def create_app():
 
                     app.logger.info("Profile image uploaded successfully")
 
-                    # Save the image with unique ID
-                    unique_id = uuid.uuid4()
-                    image_filename = f"{unique_id}_{secure_filename(profile_image.filename)}"
-                    image_path = os.path.join(app.config['IMAGE_UPLOAD_FOLDER'], image_filename)
-
-                    # Save the image
+                    # Stored under its content hash, the same photo is kept once;
+                    # the original expires with the uploads, the normalized copy is kept
+                    image_upload = builds.ingest_upload(
+                        profile_image, app.config['UPLOAD_FOLDER'], app.config['IMAGE_MAX_BYTES']
+                    )
+                    image_path = image_upload.path
                     app.logger.info(f"Image saved to: {image_path}")
-                    profile_image.save(image_path)
+
+                    # Crop and downsample to the printed size before embedding
+                    image_path = builds.normalize_profile_image(image_path, image_upload.digest)
+                    app.logger.info(f"Image normalized to: {image_path}")
                 
         except Exception as e:
             app.logger.info("Profile image upload failed with error:" + str(e))
@@ -141,9 +180,6 @@ def create_app():
                 
         
         if file and allowed_file(file.filename):
-            unique_id = uuid.uuid4()
-            safe_filename = secure_filename(file.filename)
-            filename = f"{unique_id}_{safe_filename}"
             
             # Debugging: Log all form data
             app.logger.debug(f"Form data received: {request.form.to_dict()}")
@@ -153,31 +189,22 @@ def create_app():
                 template_style = request.form.get('template', 'professional')
                 app.logger.info(f"Selected template style: {template_style}")
                 
-                
-                input_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                latex_output_path = os.path.join(app.config['LATEX_OUTPUT_FOLDER'], f"{unique_id}.tex")
-                pdf_filename = f"{unique_id}.pdf"
-                pdf_output_path = os.path.join(app.config['PDF_OUTPUT_FOLDER'], pdf_filename)
+                # Written, hashed and checked in one pass over the upload
+                upload = builds.ingest_upload(file, app.config['UPLOAD_FOLDER'], app.config['UPLOAD_MAX_BYTES'])
+                input_path = upload.path
                 
                 app.logger.info(f"File paths configured - "
                             f"Input: {input_path}, "
-                            f"LaTeX Output: {latex_output_path}, "
-                            f"PDF Output: {pdf_output_path}"
                             f"Profile Image: {image_path}"
                             )
+                app.logger.info(f"Successfully saved uploaded file to {input_path} - "
+                            f"size: {upload.size} bytes{' (already stored)' if upload.duplicate else ''}"
+                            )
                 
-                
-                file.save(input_path)
-                app.logger.info(f"Successfully saved uploaded file to {input_path}")
-                
-                # Verify file was actually saved
-                if not os.path.exists(input_path):
-                    app.logger.error(f"File save verification failed - {input_path} doesn't exist")
-                    flash("Failed to save uploaded file")
-                    return render_template( RoutePath.home_index )
-                else:
-                    app.logger.info(f"File save verified - size: {os.path.getsize(input_path)} bytes")
-                
+            except UploadRejected as e:
+                app.logger.warning(f"Upload rejected: {str(e)}")
+                flash(str(e))
+                return render_template( RoutePath.home_index )
             except IOError as e:
                 app.logger.error(f"File operation failed: {str(e)}", exc_info=True)
                 flash("File system error occurred")
@@ -197,98 +224,33 @@ def create_app():
                     app.logger.info(f"Generating CV : {profile_image} and {image_path}")
 
                     if image_path is not None:
-                        cv_generator = generator.Generator(input_path, template=template_style, image_path=image_path)
+                        cv_generator = builds.new_generator(input_path, template=template_style, image_path=image_path)
                     else:
-                        cv_generator = generator.Generator(input_path, template=template_style)
+                        cv_generator = builds.new_generator(input_path, template=template_style)
 
                 except Exception as e:
                     app.logger.error(f"Failed to generate CV with selected template: {str(e)}", exc_info=True)
 
-                cv_str = cv_generator.make_cv()
-
-                app.logger.info(f"Generated LaTeX content (length: {len(cv_str)} characters)")
-                
-                try:
-                    with open(latex_output_path, "w") as tex_file:
-                        app.logger.info(f"Attempting to write LaTeX output to: {latex_output_path}")
-                        tex_file.write(cv_str)
-                        app.logger.info(f"Successfully wrote {len(cv_str)} characters to {latex_output_path}")
-                    
-                    # Verify LaTeX file was written
-                    if not os.path.exists(latex_output_path):
-                        app.logger.error(f"LaTeX file write verification failed - {latex_output_path} doesn't exist")
-                        flash("Failed to generate LaTeX output")
-                        return render_template( RoutePath.home_index )
-                    else:
-                        app.logger.info(f"LaTeX file verified - size: {os.path.getsize(latex_output_path)} bytes")
-                        
-                except IOError as e:
-                    app.logger.error(f"Failed to write to {latex_output_path}: {str(e)}", exc_info=True)
-                    flash("Failed to generate LaTeX output")
-                    return render_template( RoutePath.home_index )
-                except Exception as e:
-                    app.logger.error(f"Unexpected error while writing to {latex_output_path}: {str(e)}", exc_info=True)
-                    flash("Unexpected error during LaTeX generation")
-                    return render_template( RoutePath.home_index )
-                
-                # Convert LaTeX to PDF
-                app.logger.info("Starting PDF generation with pdflatex")
+                # The .tex write and pdflatex run on the job queue, the
+                # request only waits for them when the client cannot poll
                 try:
-                    result = subprocess.run(
-                        ["/usr/bin/pdflatex", "-interaction=nonstopmode", "-output-directory", app.config['PDF_OUTPUT_FOLDER'], latex_output_path],
-                        capture_output=True,
-                        text=True,
-                        timeout=30  # Add timeout to prevent hanging
-                    )
-                    
-                    app.logger.debug(f"pdflatex stdout: {result.stdout}")
-                    app.logger.debug(f"pdflatex stderr: {result.stderr}")
-                    
-                    
-                    # Verify PDF was created
-                    if not os.path.exists(pdf_output_path):
-                        app.logger.error(f"PDF output verification failed - {pdf_output_path} doesn't exist")
-                        flash("PDF generation failed")
-                        return render_template( RoutePath.home_index )
-                    else:
-                        app.logger.info(f"PDF generated successfully - size: {os.path.getsize(pdf_output_path)} bytes")
-                    
-                    # Clean up auxiliary files
-                    base_filename = os.path.splitext(os.path.basename(latex_output_path))[0]
-                    extensions_to_delete = ['aux', 'log', 'out']
-                    for ext in extensions_to_delete:
-                        aux_file = os.path.join(app.config['PDF_OUTPUT_FOLDER'], f"{base_filename}.{ext}")
-                        if os.path.exists(aux_file):
-                            try:
-                                os.remove(aux_file)
-                                app.logger.debug(f"Removed auxiliary file: {aux_file}")
-                            except Exception as e:
-                                app.logger.warning(f"Could not remove {aux_file}: {str(e)}")
-                    
-                except subprocess.TimeoutExpired:
-                    app.logger.error("pdflatex timed out")
-                    flash("PDF generation timed out")
-                    return render_template( RoutePath.home_index )
-                except Exception as e:
-                    app.logger.error(f"PDF generation failed: {str(e)}", exc_info=True)
+                    job_id, pdf_filename = builds.submit_build(cv_generator)
+                except CompileBusy as e:
+                    app.logger.warning(f"Upload rejected: {str(e)}")
+                    return busy_response(e)
+                app.logger.info(f"Queued build job {job_id} for {pdf_filename}")
+
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    record = get_job_queue(app).status(job_id)
+                    return jsonify(job_response(record)), 202
+
+                record = get_job_queue(app).wait(job_id, timeout=build_wait(app))
+                if record is None or record['status'] != 'done':
+                    app.logger.error(f"Build job {job_id} did not finish: {record}")
                     flash("PDF generation failed")
                     return render_template( RoutePath.home_index )
-                
-                # Check if request wants JSON response (for AJAX)
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    app.logger.info("Returning JSON response for AJAX request")
-                    return jsonify({
-                        'success': True,
-                        'download_link': url_for('download_file', filename=pdf_filename),
-                        'preview_link': url_for('preview_pdf', filename=pdf_filename)
-                    })
-                
-                # Regular form response
-                app.logger.info("File processing completed successfully")
-                flash("File uploaded and converted successfully!")
-                return render_template( RoutePath.home_index ,
-                                    download_link=pdf_filename,
-                                    preview_link=url_for('preview_pdf', filename=pdf_filename))
+
+                return upload_success_response(pdf_filename)
                 
             except Exception as e:
                 app.logger.error(f"Processing error: {str(e)}", exc_info=True)
@@ -310,17 +272,14 @@ def create_app():
 
             pdf_path = os.path.join(os.path.abspath(app.config['PDF_OUTPUT_FOLDER']), filename)
 
-            if not os.path.exists(pdf_path):
+            # Shared links, so caches in front of the app may keep them too
+            response = delivery.send_pdf(filename, as_attachment=True, private=False)
+            if response is None:
                 app.logger.error(f"Download failed - file not found: {pdf_path}")
                 return page_not_found("Download failed - File not found")
 
             app.logger.info(f"Serving download for: {pdf_path}")
-            return send_from_directory(
-                app.config['PDF_OUTPUT_FOLDER'],
-                filename,
-                as_attachment=True,
-                mimetype='application/pdf'
-            )
+            return response
 
         except Exception as e:
             app.logger.error(f"Download failed: {str(e)}", exc_info=True)
@@ -343,28 +302,16 @@ def create_app():
             app.logger.info(f"PDF directory: {pdf_dir}")
 
             # Security checks
-            if not os.path.exists(pdf_path):
-                app.logger.error(f"Preview failed - file not found: {pdf_path}")
-                return page_not_found("Preview failed - File not found")
-                
-
             if not pdf_path.startswith(pdf_dir):
                 app.logger.error(f"Security violation: {pdf_path} outside allowed directory")
                 return page_not_found("Security violation")
 
-            app.logger.info(f"Serving PDF preview: {pdf_path}")
-
-            # Serve with correct headers
-            response = send_file(
-                pdf_path,
-                mimetype='application/pdf',
-                as_attachment=False,
-                conditional=True
-            )
+            response = delivery.send_pdf(filename, private=False)
+            if response is None:
+                app.logger.error(f"Preview failed - file not found: {pdf_path}")
+                return page_not_found("Preview failed - File not found")
 
-            # Cache control headers
-            response.headers['Cache-Control'] = 'no-store, max-age=0'
-            response.headers['Pragma'] = 'no-cache'
+            app.logger.info(f"Serving PDF preview: {pdf_path}")
             return response
 
         except Exception as e:
@@ -442,12 +389,11 @@ def create_app():
 
     @app.route('/how-to-use/intro-vid', methods=['GET'])
     def intro_video():
-        # Send the intro video
-        return send_file(
-            os.path.join(app.root_path, 'static', 'videos', 'intro-vid.mp4'),
-            mimetype='video/mp4',
-            as_attachment=False,
-            conditional=True
+        # Send the intro video, seeking needs Range support
+        return delivery.send_artifact(
+            os.path.join(app.root_path, 'static', 'videos'),
+            'intro-vid.mp4',
+            mimetype='video/mp4'
         )
 
     @app.errorhandler(404)
@@ -466,11 +412,4 @@ def create_app():
     def inject_route_path():
         return {'RoutePath': RoutePath}
 
-    # Scheduled cleanup
-    @app.before_request
-    def scheduled_cleanup():
-        if request.endpoint != 'static':
-            for folder in [app.config['UPLOAD_FOLDER'], app.config['LATEX_OUTPUT_FOLDER']]:
-                cleanup_old_files(folder, days=1)
-
     return app
@@ -0,0 +1,259 @@
+"""
+
+bench_generator.py
+
+Description:
+Benchmarks the CV build: Generator.make_cv(), writing the .tex file and the
+pdflatex compile are timed separately for mock/mock.json and for synthetic
+CVs scaled along one dimension at a time (number of experiences, length of
+responsibilities, with and without a profile image).
+
+Results are written as JSON so runs can be compared between commits:
+
+    python benchmarks/bench_generator.py                       # writes benchmarks/results/<commit>.json
+    python benchmarks/bench_generator.py --compare benchmarks/results/<old>.json
+    python benchmarks/bench_generator.py --pdflatex benchmarks/stub_pdflatex.py
+
+Without TeX installed the stub in benchmarks/stub_pdflatex.py is used, so the
+compile numbers then only cover process start and file I/O.
+
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import zlib
+import struct
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from cv_gen.generator import Generator  # noqa: E402
+from cv_gen.compiler import compile_latex  # noqa: E402
+from cv_gen import latex_format  # noqa: E402
+
+
+MOCK_PATH = os.path.join(REPO_ROOT, "mock", "mock.json")
+STUB_PDFLATEX = os.path.join(REPO_ROOT, "benchmarks", "stub_pdflatex.py")
+STAGES = ["make_cv", "write", "compile"]
+
+
+def write_png(path, width=600, height=800):
+    """Write a plain grey PNG, so the image cases need no imaging library"""
+    raw = b"".join(b"\x00" + b"\x80" * width * 3 for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+
+def scaled_experiences(cv_data, count):
+    data = copy.deepcopy(cv_data)
+    experiences = cv_data["content"]["experience"]
+    data["content"]["experience"] = [
+        copy.deepcopy(experiences[i % len(experiences)]) for i in range(count)
+    ]
+    return data
+
+
+def long_responsibilities(cv_data, items=20, length=2000):
+    data = copy.deepcopy(cv_data)
+    sentence = "Designed, built and maintained production systems end to end. "
+    text = (sentence * (length // len(sentence) + 1))[:length]
+    for experience in data["content"]["experience"]:
+        experience["responsibilities"] = [text] * items
+    return data
+
+
+def build_cases(image_path):
+    """Case name -> (cv_data, image_path)"""
+    with open(MOCK_PATH, "r") as f:
+        mock = json.load(f)
+
+    cases = {
+        "mock": (mock, None),
+        "mock-image": (mock, image_path),
+        "long-responsibilities": (long_responsibilities(mock), None),
+    }
+    for count in [10, 100, 1000]:
+        cases[f"experiences-{count}"] = (scaled_experiences(mock, count), None)
+    return cases
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def run_case(cv_data, image_path, work_dir, name, args, fmt):
+    timings = {stage: [] for stage in STAGES}
+    tex_path = os.path.join(work_dir, f"{name}.tex")
+    tex_bytes = 0
+
+    for _ in range(args.repeat):
+        cv_generator = Generator(cv_data, template=args.template, image_path=image_path)
+
+        started_at = time.perf_counter()
+        cv_str = cv_generator.make_cv()
+        timings["make_cv"].append(time.perf_counter() - started_at)
+
+        # Only the file write, the CV was rendered in the make_cv stage
+        started_at = time.perf_counter()
+        with open(tex_path, "w") as tex_file:
+            tex_file.write(cv_str)
+        timings["write"].append(time.perf_counter() - started_at)
+        tex_bytes = len(cv_str.encode("utf-8"))
+
+        if args.skip_compile:
+            continue
+
+        started_at = time.perf_counter()
+        try:
+            process = compile_latex(tex_path, work_dir, args.pdflatex, fmt, timeout=args.timeout)
+            failed = process.returncode != 0
+        except subprocess.TimeoutExpired:
+            failed = True
+        timings["compile"].append(time.perf_counter() - started_at)
+        if failed:
+            print(f"  warning: pdflatex failed for {name}", file=sys.stderr)
+
+    result = {"tex_bytes": tex_bytes}
+    for stage, samples in timings.items():
+        if samples:
+            result[stage] = summarize(samples)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(base, current):
+    """Print median timings of two result files side by side"""
+    print(f"\n{'case':<24}{'stage':<10}{'base':>10}{'current':>10}{'change':>9}")
+    for name, result in current["results"].items():
+        base_result = base["results"].get(name, {})
+        for stage in STAGES:
+            if stage not in result or stage not in base_result:
+                continue
+            old = base_result[stage]["median"]
+            new = result[stage]["median"]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"{name:<24}{stage:<10}{old * 1000:>8.2f}ms{new * 1000:>8.2f}ms{change:>+8.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CV generator and LaTeX build")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument("--cases", nargs="*", help="only run these cases")
+    parser.add_argument("--template", default=None)
+    parser.add_argument(
+        "--pdflatex",
+        default=None,
+        help="pdflatex binary, defaults to /usr/bin/pdflatex or the stub if TeX is not installed",
+    )
+    parser.add_argument("--precompiled-format", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--skip-compile", action="store_true")
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.pdflatex is None:
+        args.pdflatex = "/usr/bin/pdflatex" if os.path.exists("/usr/bin/pdflatex") else STUB_PDFLATEX
+    if args.pdflatex == STUB_PDFLATEX:
+        print("Using the pdflatex stub, compile timings exclude TeX itself", file=sys.stderr)
+
+    work_dir = tempfile.mkdtemp(prefix="cv-bench-")
+    try:
+        image_path = os.path.join(work_dir, "profile.png")
+        write_png(image_path)
+        cases = build_cases(image_path)
+
+        fmt = None
+        if args.precompiled_format and not args.skip_compile:
+            fmt = latex_format.ensure_format(
+                Generator({}, template=args.template).add_header(),
+                os.path.join(work_dir, "formats"),
+                pdflatex=args.pdflatex,
+                template=args.template,
+            )
+
+        # Untimed run so loading the templates is not billed to the first case
+        Generator(cases["mock"][0], template=args.template).make_cv()
+
+        results = {}
+        for name, (cv_data, case_image) in cases.items():
+            if args.cases and name not in args.cases:
+                continue
+            print(f"{name} ...", file=sys.stderr)
+            results[name] = run_case(cv_data, case_image, work_dir, name, args, fmt)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pdflatex": os.path.basename(args.pdflatex),
+        "template": args.template,
+        "precompiled_format": fmt is not None,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'case':<24}{'tex':>10}" + "".join(f"{stage:>12}" for stage in STAGES))
+    for name, result in results.items():
+        cells = "".join(
+            f"{result[stage]['median'] * 1000:>10.2f}ms" if stage in result else f"{'-':>12}"
+            for stage in STAGES
+        )
+        print(f"{name:<24}{result['tex_bytes']:>10}{cells}")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), report)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+
+stub_pdflatex.py
+
+Description:
+Stand-in for pdflatex so the benchmarks and the batch CLI run on machines
+without TeX. Accepts the command lines cv_gen builds (-output-directory,
+-jobname, -fmt, -ini), reads the .tex file and writes a small PDF plus the
+auxiliary files pdflatex would leave. STUB_PDFLATEX_DELAY (seconds) adds a
+fixed delay per run to simulate a real compile.
+
+Usage:
+    python benchmarks/bench_generator.py --pdflatex benchmarks/stub_pdflatex.py
+
+"""
+
+import os
+import sys
+import time
+
+
+PDF = b"""%PDF-1.4
+1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj
+2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj
+3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >> endobj
+trailer << /Root 1 0 R >>
+%%EOF
+"""
+
+
+def option(args, name):
+    for arg in args:
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def main(args):
+    if "--version" in args:
+        print("pdfTeX 3.141592653-2.6-1.40.25 (stub)")
+        return 0
+
+    time.sleep(float(os.getenv("STUB_PDFLATEX_DELAY", "0")))
+
+    job_name = option(args, "-jobname")
+    if "-ini" in args:
+        # Format build: write the .fmt pdflatex -ini would dump
+        with open(f"{job_name or 'texput'}.fmt", "w") as f:
+            f.write("stub format\n")
+        return 0
+
+    output_dir = "."
+    if "-output-directory" in args:
+        output_dir = args[args.index("-output-directory") + 1]
+
+    tex_path = args[-1]
+    with open(tex_path, "rb") as f:
+        source = f.read()
+
+    base = job_name or os.path.splitext(os.path.basename(tex_path))[0]
+    with open(os.path.join(output_dir, f"{base}.pdf"), "wb") as f:
+        f.write(PDF)
+    for ext in ["aux", "log", "out"]:
+        with open(os.path.join(output_dir, f"{base}.{ext}"), "w") as f:
+            f.write(f"stub: read {len(source)} bytes\n")
+
+    print(f"Output written on {base}.pdf (1 page).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
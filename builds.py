@@ -0,0 +1,430 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+import subprocess
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import current_app
+import db_access
+from cv_gen import latex_format, render_cache, images, ingest
+from cv_gen.compiler import scratch_dir
+from cv_gen.job_queue import DONE, FINISHED
+from cv_gen.admission import CompileBusy
+from cv_gen.generator import Generator
+from extensions import (
+    get_compile_pool,
+    get_render_cache,
+    get_fragment_cache,
+    get_template_registry,
+    get_job_queue,
+    get_janitor,
+    get_admission,
+    get_prefetcher,
+    build_wait,
+)
+
+# Build jobs by PDF filename, so concurrent requests for one PDF share a job.
+# An Event stands in for the job id while the build is being submitted
+_running_builds = {}
+_running_builds_lock = threading.Lock()
+
+# PDF status of a saved CV, see pdf_status
+PDF_READY = "ready"
+PDF_PENDING = "pending"
+
+
+def template_name(template):
+    """
+    Template name for a Template.id or a name.
+
+    The dashboard posts Template.id, the upload form posts the template name.
+    """
+    if isinstance(template, int) or (isinstance(template, str) and template.isdigit()):
+        db_template = db_access.get_template(int(template))
+        return db_template.name if db_template else None
+    return template
+
+
+def new_generator(source, template=None, image_path=None):
+    """Generator wired to the app's template registry and fragment cache"""
+    return Generator(
+        source,
+        template=template_name(template),
+        image_path=image_path,
+        fragment_cache=get_fragment_cache(current_app),
+        registry=get_template_registry(current_app),
+    )
+
+
+def get_latex_format(cv_generator):
+    """Return the precompiled preamble format to compile against, if enabled"""
+    if not current_app.config.get("LATEX_PRECOMPILED_FORMAT"):
+        return None
+
+    return latex_format.ensure_format(
+        cv_generator.add_header(),
+        current_app.config["LATEX_FORMAT_FOLDER"],
+        pdflatex=current_app.config["PDFLATEX_PATH"],
+        template=cv_generator.template,
+    )
+
+
+def submit_cv(cv_generator, latex_output_path, pdf_output_path, cv_str=None):
+    """Queue a generated CV on the compile pool and return its CompileJob"""
+    return get_compile_pool(current_app).submit(
+        cv_str,
+        pdf_output_path,
+        tex_path=latex_output_path,
+        fmt=get_latex_format(cv_generator),
+    )
+
+
+def compile_cv(cv_generator, latex_output_path, pdf_output_path, cv_str=None):
+    """
+    Compile a generated CV on the compile pool and wait for the PDF.
+
+    Raises subprocess.TimeoutExpired if pdflatex runs past PDFLATEX_TIMEOUT and
+    CompileQueueFull if the pool cannot take more work.
+    """
+    job = submit_cv(cv_generator, latex_output_path, pdf_output_path, cv_str)
+    try:
+        # The worker enforces the slot wait and the pdflatex timeout, this
+        # only bounds the wait if it never reports back
+        return job.result(timeout=build_wait(current_app))
+    except FutureTimeoutError:
+        job.cancel()
+        raise subprocess.TimeoutExpired("pdflatex", current_app.config["PDFLATEX_TIMEOUT"])
+
+
+def render_key(cv_generator):
+    """Render cache key of a Generator's input"""
+    return render_cache.make_key(
+        cv_generator.cv_data,
+        template=cv_generator.template_key,
+        image_path=cv_generator.image_path,
+    )
+
+
+def fetch_cached_pdf(key, pdf_output_path):
+    """Place the cached PDF for key at pdf_output_path, returns False on a miss"""
+    return get_render_cache(current_app).get(key, pdf_output_path)
+
+
+def store_cached_pdf(key, pdf_output_path):
+    """Add a freshly compiled PDF to the render cache"""
+    get_render_cache(current_app).put(key, pdf_output_path)
+
+
+def restore_pdf(pdf_filename):
+    """
+    Bring back a PDF served by name if it was removed from the output folder.
+
+    PDF names are render cache keys, so a cached copy can be linked back in.
+    Returns True if the PDF exists afterwards.
+    """
+    pdf_path = os.path.join(current_app.config["PDF_OUTPUT_FOLDER"], pdf_filename)
+    if os.path.exists(pdf_path):
+        return True
+
+    key = os.path.splitext(os.path.basename(pdf_filename))[0]
+    if not get_render_cache(current_app).get(key, pdf_path):
+        return False
+    track_artifact(pdf_path)
+    return True
+
+
+def build_job(payload, progress):
+    """
+    Job function behind submit_build: write the .tex and compile the PDF.
+
+    Runs on the job queue, so it only gets the JSON payload and rebuilds the
+    Generator from it. Reports the rendered and compiling stages through
+    progress and returns the PDF filename and stage timings.
+    """
+    try:
+        return _build(payload, progress)
+    finally:
+        # Frees the build's place in the host-wide pending limit
+        get_admission(current_app).release(payload["ticket"])
+        with _running_builds_lock:
+            _running_builds.pop(payload["pdf_filename"], None)
+
+
+def _build(payload, progress):
+    pdf_filename = payload["pdf_filename"]
+    pdf_output_path = os.path.join(current_app.config["PDF_OUTPUT_FOLDER"], pdf_filename)
+    cache_key = os.path.splitext(pdf_filename)[0]
+
+    if fetch_cached_pdf(cache_key, pdf_output_path):
+        track_artifact(pdf_output_path)
+        return {"pdf_filename": pdf_filename, "cached": True}
+
+    cv_generator = new_generator(
+        payload["cv_data"], template=payload["template"], image_path=payload["image_path"]
+    )
+    timings = compile_pdf(cv_generator, pdf_filename, progress)
+    return {"pdf_filename": pdf_filename, "cached": False, **timings}
+
+
+def compile_pdf(cv_generator, pdf_filename, progress=None):
+    """
+    Render and compile a Generator into PDF_OUTPUT_FOLDER/pdf_filename, in this thread.
+
+    pdflatex still runs on the compile pool. Returns the stage timings;
+    progress, when given, is called with the rendered and compiling stages.
+    """
+    progress = progress or (lambda stage, **data: None)
+    pdf_output_path = os.path.join(current_app.config["PDF_OUTPUT_FOLDER"], pdf_filename)
+    cache_key = os.path.splitext(pdf_filename)[0]
+
+    # The .tex only lives for the build, in scratch space off the persistent disk
+    with scratch_dir(current_app.config["BUILD_SCRATCH_ROOT"]) as build_dir:
+        started_at = time.monotonic()
+        tex_path = os.path.join(build_dir, f"{cache_key}.tex")
+        saved_path = os.path.join(current_app.config["CV_LATEX_FOLDER"], f"{cache_key}.tex")
+        if os.path.exists(saved_path):
+            # Rendered when the CV was saved, see save_latex
+            shutil.copyfile(saved_path, tex_path)
+        else:
+            with open(tex_path, "w") as tex_file:
+                cv_generator.write_to(tex_file)
+        render_seconds = time.monotonic() - started_at
+        progress("rendered", seconds=render_seconds)
+
+        progress("compiling")
+        started_at = time.monotonic()
+        result = compile_cv(cv_generator, tex_path, pdf_output_path)
+        if not os.path.exists(pdf_output_path):
+            raise RuntimeError(f"PDF generation failed, pdflatex exited with {result.returncode}")
+
+    store_cached_pdf(cache_key, pdf_output_path)
+    track_artifact(pdf_output_path)
+    return {
+        "render_seconds": render_seconds,
+        "compile_seconds": time.monotonic() - started_at,
+    }
+
+
+def save_latex(cv_generator):
+    """
+    Write the LaTeX of a saved CV to CV_LATEX_FOLDER and return its file name.
+
+    The file is named by the render key, like the PDF, so an existing one
+    already holds this LaTeX and is kept. compile_pdf compiles from it.
+    """
+    latex_filename = f"{render_key(cv_generator)}.tex"
+    latex_path = os.path.join(current_app.config["CV_LATEX_FOLDER"], latex_filename)
+    if os.path.exists(latex_path):
+        return latex_filename
+
+    # Written aside and moved in, a concurrent build never reads half a file
+    tmp_path = f"{latex_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w") as tex_file:
+            cv_generator.write_to(tex_file)
+        os.replace(tmp_path, latex_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return latex_filename
+
+
+def submit_build(cv_generator):
+    """
+    Queue the build of a CV and return (job_id, pdf_filename).
+
+    The PDF is named by its render cache key, so the name is known before the
+    job runs and an unchanged CV finishes without running pdflatex. Raises
+    CompileBusy when the host already has PDFLATEX_MAX_PENDING builds pending.
+    """
+    pdf_filename = f"{render_key(cv_generator)}.pdf"
+
+    ticket = uuid.uuid4().hex
+    admission = get_admission(current_app)
+    admission.admit(ticket)
+    try:
+        job_id = get_job_queue(current_app).submit(
+            "build_cv",
+            {
+                "cv_data": cv_generator.cv_data,
+                "template": cv_generator.template,
+                "image_path": cv_generator.image_path,
+                "pdf_filename": pdf_filename,
+                "ticket": ticket,
+            },
+            pdf_filename=pdf_filename,
+        )
+    except Exception:
+        admission.release(ticket)
+        raise
+
+    job_folder = current_app.config["JOB_FOLDER"]
+    track_artifact(os.path.join(job_folder, f"{job_id}.json"))
+    track_artifact(os.path.join(job_folder, f"{job_id}.events"))
+    return job_id, pdf_filename
+
+
+def build_once(cv_generator):
+    """
+    Like submit_build, but joins the build of the same PDF when one is
+    already queued or running in this process.
+    """
+    pdf_filename = f"{render_key(cv_generator)}.pdf"
+    job_queue = get_job_queue(current_app)
+
+    while True:
+        with _running_builds_lock:
+            # Build jobs remove their entry when they finish, unless they ran
+            # in another process (Celery), then it is replaced here
+            entry = _running_builds.get(pdf_filename)
+            if isinstance(entry, str):
+                record = job_queue.status(entry)
+                if record is not None and record["status"] not in FINISHED:
+                    return entry, pdf_filename
+                entry = None
+            if entry is None:
+                # Reserve the PDF while its build is submitted
+                submitted = threading.Event()
+                _running_builds[pdf_filename] = submitted
+                break
+        # Another request is submitting this build, join it once it has
+        entry.wait()
+
+    # Submitted outside the lock: the eager backend runs the job, and its
+    # cleanup in build_job, before submit returns
+    try:
+        job_id, pdf_filename = submit_build(cv_generator)
+        with _running_builds_lock:
+            if _running_builds.get(pdf_filename) is submitted:
+                _running_builds[pdf_filename] = job_id
+    finally:
+        with _running_builds_lock:
+            if _running_builds.get(pdf_filename) is submitted:
+                del _running_builds[pdf_filename]
+        submitted.set()
+    return job_id, pdf_filename
+
+
+def wait_for_build(job_id):
+    """Wait up to build_wait for a build job, True when it produced its PDF"""
+    record = get_job_queue(current_app).wait(job_id, timeout=build_wait(current_app))
+    if record is None or record["status"] != DONE:
+        current_app.logger.error(f"Build job {job_id} did not finish: {record}")
+        return False
+    return True
+
+
+def defer_build(cv_generator):
+    """
+    Name the PDF of a CV without building it, for LAZY_COMPILE.
+
+    The PDF is built by materialize_pdf when it is first requested, or
+    earlier by the prefetcher when LAZY_COMPILE_PREFETCH is set.
+    """
+    pdf_filename = f"{render_key(cv_generator)}.pdf"
+    if current_app.config["LAZY_COMPILE_PREFETCH"] and not restore_pdf(pdf_filename):
+        get_prefetcher(current_app).add(
+            pdf_filename,
+            {
+                "cv_data": cv_generator.cv_data,
+                "template": cv_generator.template,
+                "image_path": cv_generator.image_path,
+            },
+        )
+    return pdf_filename
+
+
+def prefetch_pdf(pdf_filename, payload):
+    """Prefetcher function: queue the build of a deferred PDF, False to retry when busy"""
+    if restore_pdf(pdf_filename):
+        return True
+    cv_generator = new_generator(
+        payload["cv_data"], template=payload["template"], image_path=payload["image_path"]
+    )
+    try:
+        build_once(cv_generator)
+    except CompileBusy:
+        return False
+    return True
+
+
+def pdf_status(cv):
+    """PDF_READY when a saved CV's PDF can be served now, PDF_PENDING while it still has to be built"""
+    return PDF_READY if cv.cv_pdf_name and restore_pdf(cv.cv_pdf_name) else PDF_PENDING
+
+
+def materialize_pdf(cv):
+    """
+    Return (pdf_filename, job_id) for a saved CV, queueing the build of a missing PDF.
+
+    A CV saved with LAZY_COMPILE gets its PDF built on first access; an
+    expired one is rebuilt. Concurrent callers share one build. job_id is
+    None when the PDF can be served now, otherwise the caller hands the job
+    to the client instead of waiting for it. Raises CompileBusy when the
+    host is saturated.
+    """
+    if pdf_status(cv) == PDF_READY:
+        return cv.cv_pdf_name, None
+
+    cv_generator = new_generator(cv.data, template=cv.template_id)
+    job_id, pdf_filename = build_once(cv_generator)
+    get_prefetcher(current_app).discard(pdf_filename)
+
+    # The eager backend has already run the job
+    record = get_job_queue(current_app).status(job_id)
+    if record is not None and record["status"] == DONE:
+        return pdf_filename, None
+    return pdf_filename, job_id
+
+
+def track_artifact(path):
+    """Hand a file the app created to the janitor, it is removed after its folder's retention"""
+    get_janitor(current_app).track(path)
+
+
+def ingest_upload(file, folder, max_bytes=None):
+    """
+    Store an uploaded file in folder as <sha256>.<extension>, see ingest.py.
+
+    Returns the ingest.Upload; raises ingest.UploadRejected when the file is
+    too large or its content does not match its extension. The digest is
+    remembered so cache keys over the file do not hash it again.
+    """
+    extension = file.filename.rsplit(".", 1)[1].lower()
+    upload = ingest.ingest(file.stream, folder, extension, max_bytes=max_bytes)
+    render_cache.remember_digest(upload.path, upload.digest)
+    track_artifact(upload.path)
+    return upload
+
+
+def normalize_profile_image(image_path, src_digest=None):
+    """
+    Downsample an uploaded profile image to its printed size.
+
+    Returns the path to embed, in IMAGE_UPLOAD_FOLDER. The upload itself is
+    left to expire with its folder: with content-hash names another request
+    may have ingested the same file and still be reading it.
+    """
+    image_folder = current_app.config["IMAGE_UPLOAD_FOLDER"]
+    normalized_path = images.normalize_image(
+        image_path,
+        image_folder,
+        dpi=current_app.config["IMAGE_TARGET_DPI"],
+        quality=current_app.config["IMAGE_JPEG_QUALITY"],
+        src_digest=src_digest,
+    )
+    if normalized_path == image_path and os.path.dirname(os.path.abspath(image_path)) != os.path.abspath(image_folder):
+        # Not normalized (no Pillow or an unreadable image), keep the upload itself
+        normalized_path = os.path.join(image_folder, os.path.basename(image_path))
+        if not os.path.exists(normalized_path):
+            tmp_path = f"{normalized_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                shutil.copyfile(image_path, tmp_path)
+                os.replace(tmp_path, normalized_path)
+            except FileNotFoundError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise ingest.UploadRejected("The uploaded image is no longer available, upload it again")
+    track_artifact(normalized_path)
+    return normalized_path
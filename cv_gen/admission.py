@@ -0,0 +1,229 @@
+"""
+
+admission.py
+
+Description:
+Admission control for pdflatex across every process on the host. The compile
+pool caps pdflatex runs per process, but each gunicorn worker (and Celery
+worker) has its own pool, so under a burst the host ran one pool's worth of
+TeX per process and thrashed.
+
+Two limits are enforced with files in a shared folder:
+
+    slots    slot-<n> lock files; a compile holds one with flock while
+             pdflatex runs, so at most `slots` run at once on the host.
+             flock is released by the kernel if the process dies.
+    pending  ticket-<id> files, one per build that was admitted and has not
+             finished. admit() refuses new builds with CompileBusy once
+             `max_pending` are in flight, so the web app can answer 503 with
+             Retry-After right away instead of queueing work that would time
+             out. Tickets left by a crashed worker expire after stale_after.
+
+Counters (admitted, rejected, slot wait times) are kept in a small JSON file
+updated under a lock, so /metrics reports them for all processes.
+
+Usage:
+    admission = AdmissionControl("instance/admission", slots=4, max_pending=16)
+    admission.admit(job_id)           # raises CompileBusy when saturated
+    with admission.slot(timeout=60):  # blocks until a pdflatex slot is free
+        run_pdflatex()
+    admission.release(job_id)
+
+"""
+
+import os
+import json
+import time
+import fcntl
+import math
+import logging
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest compile in the average used for Retry-After
+COMPILE_TIME_SMOOTHING = 0.2
+
+
+class CompileBusy(RuntimeError):
+    """Raised when the host cannot take more LaTeX builds right now"""
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def locked(path):
+    """Exclusive flock on path for the duration of the block"""
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class AdmissionControl:
+
+    def __init__(self, folder, slots=None, max_pending=None, stale_after=600, poll_interval=0.05):
+        self.folder = folder
+        self.slots = slots or os.cpu_count() or 1
+        self.max_pending = max_pending if max_pending is not None else self.slots * 4
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        os.makedirs(folder, exist_ok=True)
+
+        self._admit_lock = os.path.join(folder, "admit.lock")
+        self._stats_path = os.path.join(folder, "stats.json")
+
+    # Pending builds
+
+    def _ticket_path(self, ticket):
+        return os.path.join(self.folder, f"ticket-{ticket}")
+
+    def pending(self):
+        """Builds admitted and not yet finished, removing stale tickets"""
+        count = 0
+        cutoff = time.time() - self.stale_after
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.startswith("ticket-"):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                count += 1
+        return count
+
+    def admit(self, ticket):
+        """Admit one build under ticket, raises CompileBusy when max_pending builds are in flight"""
+        with locked(self._admit_lock):
+            pending = self.pending()
+            if pending >= self.max_pending:
+                retry_after = self.retry_after(pending)
+                self._count(rejected=1)
+                raise CompileBusy(
+                    f"{pending} LaTeX builds are already pending, try again in {retry_after}s",
+                    retry_after=retry_after,
+                )
+            with open(self._ticket_path(ticket), "w"):
+                pass
+        self._count(admitted=1)
+
+    def release(self, ticket):
+        """Finish the build admitted under ticket, from any process"""
+        try:
+            os.remove(self._ticket_path(ticket))
+        except FileNotFoundError:
+            pass
+
+    def retry_after(self, pending=None):
+        """Seconds until a pending build is likely to have finished"""
+        pending = self.pending() if pending is None else pending
+        compile_seconds = self.read_stats().get("compile_seconds_avg") or 5
+        return max(1, min(120, math.ceil(pending / self.slots * compile_seconds)))
+
+    # pdflatex slots
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold one of the host's pdflatex slots, waits up to timeout seconds for one"""
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+        slot_file = None
+
+        while slot_file is None:
+            for index in range(self.slots):
+                candidate = open(os.path.join(self.folder, f"slot-{index}"), "a")
+                try:
+                    fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    candidate.close()
+                    continue
+                slot_file = candidate
+                break
+            else:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._count(slot_timeouts=1)
+                    raise CompileBusy(
+                        f"No pdflatex slot became free within {timeout}s", retry_after=self.retry_after()
+                    )
+                time.sleep(self.poll_interval)
+
+        waited = time.monotonic() - started_at
+        compile_started_at = time.monotonic()
+        try:
+            yield waited
+        finally:
+            fcntl.flock(slot_file, fcntl.LOCK_UN)
+            slot_file.close()
+            self._count(wait_seconds=waited, compile_seconds=time.monotonic() - compile_started_at)
+
+    def running(self):
+        """Slots currently held"""
+        running = 0
+        for index in range(self.slots):
+            with open(os.path.join(self.folder, f"slot-{index}"), "a") as candidate:
+                try:
+                    fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(candidate, fcntl.LOCK_UN)
+                except BlockingIOError:
+                    running += 1
+        return running
+
+    # Counters
+
+    def read_stats(self):
+        try:
+            with open(self._stats_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _count(self, admitted=0, rejected=0, slot_timeouts=0, wait_seconds=None, compile_seconds=None):
+        try:
+            with locked(f"{self._stats_path}.lock"):
+                stats = self.read_stats()
+                stats["admitted"] = stats.get("admitted", 0) + admitted
+                stats["rejected"] = stats.get("rejected", 0) + rejected
+                stats["slot_timeouts"] = stats.get("slot_timeouts", 0) + slot_timeouts
+                if wait_seconds is not None:
+                    stats["compiles"] = stats.get("compiles", 0) + 1
+                    stats["wait_seconds_total"] = stats.get("wait_seconds_total", 0) + wait_seconds
+                    stats["wait_seconds_max"] = max(stats.get("wait_seconds_max", 0), wait_seconds)
+                if compile_seconds is not None:
+                    average = stats.get("compile_seconds_avg")
+                    stats["compile_seconds_avg"] = (
+                        compile_seconds
+                        if average is None
+                        else average + COMPILE_TIME_SMOOTHING * (compile_seconds - average)
+                    )
+
+                tmp_path = f"{self._stats_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(stats, f)
+                os.replace(tmp_path, self._stats_path)
+        except OSError as e:
+            # Metrics must never fail a build
+            logger.warning(f"Could not update admission stats: {e}")
+
+    def stats(self):
+        stats = self.read_stats()
+        compiles = stats.get("compiles", 0)
+        return {
+            "slots": self.slots,
+            "running": self.running(),
+            "pending": self.pending(),
+            "max_pending": self.max_pending,
+            "admitted": stats.get("admitted", 0),
+            "rejected": stats.get("rejected", 0),
+            "slot_timeouts": stats.get("slot_timeouts", 0),
+            "wait_seconds_avg": stats.get("wait_seconds_total", 0) / compiles if compiles else 0.0,
+            "wait_seconds_max": stats.get("wait_seconds_max", 0),
+            "compile_seconds_avg": stats.get("compile_seconds_avg"),
+        }
@@ -0,0 +1,258 @@
+"""
+
+batch.py
+
+Description:
+Regenerates CVs in bulk without going through the web app. Reads CV data
+from a directory of JSON files or a JSONL file, renders each CV with the
+Generator and compiles it with pdflatex in a process pool sized to the cores.
+Results are printed as they complete and appended to a checkpoint file, so an
+interrupted run can be resumed with --resume. A throughput report (CVs/sec,
+p50/p95 per stage) is printed at the end.
+
+Usage:
+    python -m cv_gen.batch mock/ --output-dir batch_output
+    python -m cv_gen.batch cvs.jsonl --template modern --workers 8 --resume
+
+In a JSONL file each line is the CV data, optionally wrapped as
+{"id": "...", "cv": {...}} to name the output PDF. The id is passed
+through secure_filename for the file name; the checkpoint keeps it as given.
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from werkzeug.utils import secure_filename
+
+from cv_gen.generator import Generator
+from cv_gen.compiler import compile_latex
+from cv_gen import latex_format
+
+
+STAGES = ["render", "compile", "total"]
+
+
+def output_name(cv_id, fallback):
+    """File name for a CV's .tex and .pdf; the id comes from the input, so it
+    must not be able to point outside the output directory"""
+    return secure_filename(cv_id) or fallback
+
+
+def unique_name(name, suffix, used_names):
+    """
+    name, or name_<suffix> when an earlier CV of the run already has it.
+
+    CVs are built concurrently, two with one name would overwrite each
+    other's files. Compared case-insensitively for case-insensitive disks.
+    """
+    candidate, attempt = name, 1
+    while candidate.lower() in used_names:
+        candidate = f"{name}_{suffix}" if attempt == 1 else f"{name}_{suffix}_{attempt}"
+        attempt += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def iter_inputs(source):
+    """Yield (cv_id, output name, cv_data or JSON path) from a directory of JSON files or a JSONL file"""
+    used_names = set()
+
+    if os.path.isdir(source):
+        filenames = sorted(filename for filename in os.listdir(source) if filename.endswith(".json"))
+        for index, filename in enumerate(filenames, 1):
+            cv_id = os.path.splitext(filename)[0]
+            name = unique_name(output_name(cv_id, f"file-{index:06d}"), f"{index:06d}", used_names)
+            yield cv_id, name, os.path.join(source, filename)
+        return
+
+    with open(source, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            line_id = f"line-{line_number:06d}"
+            if "cv" in record:
+                # The raw id is kept for the checkpoint, only the file name is
+                # sanitized, and suffixed with the line number when it is taken
+                cv_id = str(record.get("id", line_id))
+                name = unique_name(output_name(cv_id, line_id), f"{line_number:06d}", used_names)
+                yield cv_id, name, record["cv"]
+            else:
+                yield line_id, unique_name(line_id, f"{line_number:06d}", used_names), record
+
+
+def build_one(cv_id, name, source, output_dir, template, pdflatex, fmt, timeout, keep_tex):
+    """Render and compile one CV to <name>.pdf, runs in a pool worker"""
+    result = {"id": cv_id, "status": "ok", "pdf": None, "error": None}
+    started_at = time.perf_counter()
+    tex_path = os.path.join(output_dir, f"{name}.tex")
+
+    try:
+        cv_generator = Generator(source, template=template)
+        with open(tex_path, "w") as tex_file:
+            cv_generator.write_to(tex_file)
+        rendered_at = time.perf_counter()
+
+        process = compile_latex(tex_path, output_dir, pdflatex, fmt, timeout=timeout)
+        pdf_path = os.path.join(output_dir, f"{name}.pdf")
+        if process.returncode != 0 or not os.path.exists(pdf_path):
+            result["status"] = "failed"
+            result["error"] = f"pdflatex exited with {process.returncode}"
+        else:
+            result["pdf"] = pdf_path
+
+        result["render"] = rendered_at - started_at
+        result["compile"] = time.perf_counter() - rendered_at
+    except subprocess.TimeoutExpired:
+        result["status"] = "failed"
+        result["error"] = f"pdflatex timed out after {timeout}s"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if not keep_tex and os.path.exists(tex_path):
+            os.remove(tex_path)
+
+    result["total"] = time.perf_counter() - started_at
+    return result
+
+
+def load_checkpoint(path):
+    """IDs of the CVs a previous run already built"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+    return done
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def print_report(results, skipped, elapsed):
+    succeeded = [r for r in results if r["status"] == "ok"]
+    failed = len(results) - len(succeeded)
+
+    print()
+    print(f"Built {len(succeeded)} CVs, {failed} failed, {skipped} skipped in {elapsed:.1f}s")
+    print(f"Throughput: {len(succeeded) / elapsed if elapsed else 0:.2f} CVs/sec")
+    print(f"{'stage':<10}{'p50':>10}{'p95':>10}")
+    for stage in STAGES:
+        values = [r[stage] for r in succeeded if stage in r]
+        print(f"{stage:<10}{percentile(values, 50):>9.3f}s{percentile(values, 95):>9.3f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cv_gen.batch", description="Render and compile CVs in bulk"
+    )
+    parser.add_argument("source", help="directory of JSON files or a JSONL file")
+    parser.add_argument("--output-dir", default="batch_output", help="where PDFs are written")
+    parser.add_argument("--template", default=None, help="LaTeX template name")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pdflatex", default="/usr/bin/pdflatex")
+    parser.add_argument("--timeout", type=float, default=30, help="pdflatex timeout per CV in seconds")
+    parser.add_argument(
+        "--precompiled-format",
+        action="store_true",
+        help="compile against a precompiled preamble format (see latex_format.py)",
+    )
+    parser.add_argument("--checkpoint", default=None, help="defaults to <output-dir>/checkpoint.jsonl")
+    parser.add_argument("--resume", action="store_true", help="skip CVs the checkpoint lists as built")
+    parser.add_argument("--keep-tex", action="store_true", help="keep the generated .tex files")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_dir = os.path.abspath(args.output_dir)
+    checkpoint_path = args.checkpoint or os.path.join(output_dir, "checkpoint.jsonl")
+
+    done = load_checkpoint(checkpoint_path) if args.resume else set()
+
+    fmt = None
+    if args.precompiled_format:
+        # Every CV of the run shares the template, so one format serves them all
+        fmt = latex_format.ensure_format(
+            Generator({}, template=args.template).add_header(),
+            os.path.join(output_dir, "latex_formats"),
+            pdflatex=args.pdflatex,
+            template=args.template,
+        )
+
+    results = []
+    skipped = 0
+    started_at = time.perf_counter()
+    # Keep a bounded number of CVs in flight so large JSONL files are streamed
+    max_pending = args.workers * 4
+
+    with open(checkpoint_path, "a" if args.resume else "w") as checkpoint, ProcessPoolExecutor(
+        max_workers=args.workers
+    ) as pool:
+
+        def collect(futures):
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                checkpoint.write(json.dumps(result) + "\n")
+                checkpoint.flush()
+                status = "ok" if result["status"] == "ok" else f"FAILED ({result['error']})"
+                print(f"[{len(results)}] {result['id']}: {status} in {result['total']:.2f}s", flush=True)
+
+        pending = set()
+        for cv_id, name, source in iter_inputs(args.source):
+            if cv_id in done:
+                skipped += 1
+                continue
+
+            pending.add(
+                pool.submit(
+                    build_one,
+                    cv_id,
+                    name,
+                    source,
+                    output_dir,
+                    args.template,
+                    args.pdflatex,
+                    fmt,
+                    args.timeout,
+                    args.keep_tex,
+                )
+            )
+            if len(pending) >= max_pending:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(completed)
+
+        while pending:
+            completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(completed)
+
+    print_report(results, skipped, time.perf_counter() - started_at)
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+
+compile_pool.py
+
+Description:
+A fixed pool of pdflatex workers fed by a bounded queue. Web requests submit
+LaTeX source and get back a future for the compiled PDF instead of spawning
+pdflatex themselves, so the number of concurrent TeX runs is capped by the
+pool size rather than by the number of gunicorn workers.
+
+Each worker is a long-lived thread that supervises one pdflatex child at a
+time. TeX itself cannot stay resident between documents; starting it against
+the precompiled preamble format (see latex_format.py) is what keeps each run
+warm.
+
+With an AdmissionControl (see admission.py) every pdflatex run also holds
+one of the host's slots, which caps TeX runs across all processes.
+
+pdflatex writes into a scratch directory per job (see compiler.py), only the
+PDF is moved to pdf_path.
+
+Usage:
+    pool = CompilePool(workers=4, max_queue=16, timeout=30)
+    job = pool.submit(cv_str, "instance/pdf_outputs/<id>.pdf")
+    result = job.result()          # CompileResult(pdf_path, log, returncode, duration)
+    job.cancel()                   # drops a queued job or kills a running pdflatex
+
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import subprocess
+from contextlib import nullcontext
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from cv_gen.compiler import pdflatex_command, scratch_dir, move_into_place
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompileQueueFull(RuntimeError):
+    """Raised by CompilePool.submit when the queue is at capacity"""
+
+
+class CompileCancelled(RuntimeError):
+    """Set on a job's future when it was cancelled while pdflatex was running"""
+
+
+@dataclass
+class CompileResult:
+    pdf_path: str
+    log: str
+    returncode: int
+    duration: float
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0 and os.path.exists(self.pdf_path)
+
+
+@dataclass
+class CompileJob:
+    latex: Optional[str]
+    pdf_path: str
+    tex_path: Optional[str]
+    fmt: Optional[str] = None
+    timeout: Optional[float] = None
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+    _process: Optional[subprocess.Popen] = field(default=None, repr=False)
+    _cancelled: bool = field(default=False, repr=False)
+
+    def result(self, timeout: Optional[float] = None) -> CompileResult:
+        """Wait for the compiled PDF"""
+        return self.future.result(timeout)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self) -> bool:
+        """Cancel the job, killing pdflatex if it is already running"""
+        if self.future.cancel():
+            return True
+        self._cancelled = True
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+            return True
+        return False
+
+
+class CompilePool:
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: float = 30,
+        pdflatex: str = "/usr/bin/pdflatex",
+        admission=None,
+        slot_timeout: Optional[float] = None,
+        scratch_root: Optional[str] = None,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else self.workers * 4
+        self.timeout = timeout
+        self.pdflatex = pdflatex
+        # Host-wide pdflatex slots, shared with the other processes
+        self.admission = admission
+        self.slot_timeout = slot_timeout
+        # Parent of the per-job scratch directories, /dev/shm when None
+        self.scratch_root = scratch_root
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self._shutdown = False
+
+    def _ensure_started(self):
+        # Threads are started on first use so the pool survives a gunicorn
+        # --preload fork without sharing threads across processes
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"pdflatex-worker-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(
+        self,
+        latex: Optional[str],
+        pdf_path: str,
+        tex_path: Optional[str] = None,
+        fmt: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> CompileJob:
+        """
+        Queue LaTeX source for compilation into pdf_path.
+
+        The source is written to tex_path (into the job's scratch directory if
+        not given) by the worker; pass latex=None to compile a tex_path that is
+        already on disk.
+        Raises CompileQueueFull when the queue is at capacity.
+        """
+        if self._shutdown:
+            raise RuntimeError("CompilePool has been shut down")
+
+        self._ensure_started()
+
+        job = CompileJob(latex=latex, pdf_path=pdf_path, tex_path=tex_path, fmt=fmt, timeout=timeout)
+
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise CompileQueueFull(f"Compile queue is full ({self.max_queue} jobs waiting)")
+
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and let the workers exit once the queue drains"""
+        self._shutdown = True
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                self._running += 1
+            try:
+                job.future.set_result(self._compile(job))
+            except BaseException as e:
+                job.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _compile(self, job: CompileJob) -> CompileResult:
+        pdf_filename = os.path.basename(job.pdf_path)
+        job_name = os.path.splitext(pdf_filename)[0]
+        timeout = job.timeout or self.timeout
+        started_at = time.monotonic()
+
+        with scratch_dir(self.scratch_root) as build_dir:
+            tex_path = job.tex_path or os.path.join(build_dir, f"{job_name}.tex")
+            if job.latex is not None:
+                with open(tex_path, "w") as tex_file:
+                    tex_file.write(job.latex)
+
+            slot = self.admission.slot(self.slot_timeout) if self.admission else nullcontext()
+            with slot:
+                job._process = subprocess.Popen(
+                    pdflatex_command(tex_path, build_dir, self.pdflatex, job.fmt, job_name),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                )
+                if job._cancelled:
+                    job._process.kill()
+
+                try:
+                    log, _ = job._process.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    job._process.kill()
+                    job._process.communicate()
+                    logger.warning(f"pdflatex timed out after {timeout}s for {job.pdf_path}")
+                    raise
+
+            built_pdf = os.path.join(build_dir, pdf_filename)
+            if os.path.exists(built_pdf) and not job._cancelled:
+                move_into_place(built_pdf, job.pdf_path)
+
+        if job._cancelled:
+            raise CompileCancelled(f"Compilation of {job.pdf_path} was cancelled")
+
+        return CompileResult(
+            pdf_path=job.pdf_path,
+            log=log,
+            returncode=job._process.returncode,
+            duration=time.monotonic() - started_at,
+        )
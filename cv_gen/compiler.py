@@ -0,0 +1,103 @@
+"""
+
+compiler.py
+
+Description:
+Runs pdflatex on a generated CV. Used by both the upload page and the
+dashboard.
+
+Every compile runs in its own scratch directory, on /dev/shm when it is
+available, so the .aux/.log/.out files never touch the persistent disk and
+concurrent builds cannot clash on file names. Only the PDF is moved into
+the output folder, with an atomic rename.
+
+"""
+
+import os
+import errno
+import shutil
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+
+# Preferred places for scratch directories, the system temp dir is the fallback
+SCRATCH_ROOTS = ["/dev/shm"]
+
+
+def pdflatex_command(tex_path, output_dir, pdflatex="/usr/bin/pdflatex", fmt=None, job_name=None):
+    """Build the pdflatex command line, optionally against a precompiled format"""
+    command = [pdflatex, "-interaction=nonstopmode"]
+    if fmt is not None:
+        command.append(f"-fmt={fmt}")
+    if job_name is not None:
+        command.append(f"-jobname={job_name}")
+    command += ["-output-directory", output_dir, tex_path]
+    return command
+
+
+def scratch_root(preferred=None):
+    """Where scratch directories go: preferred, else /dev/shm, else the system temp dir"""
+    for root in ([preferred] if preferred else []) + SCRATCH_ROOTS:
+        if os.path.isdir(root) and os.access(root, os.W_OK | os.X_OK):
+            return root
+    return tempfile.gettempdir()
+
+
+@contextmanager
+def scratch_dir(root=None):
+    """A private directory for one build, removed with everything in it afterwards"""
+    path = tempfile.mkdtemp(prefix="cv-build-", dir=scratch_root(root))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def move_into_place(src, dest):
+    """
+    Move src to dest atomically.
+
+    /dev/shm is a different filesystem than the output folder, so the file is
+    then copied next to dest first and renamed over it.
+    """
+    try:
+        os.replace(src, dest)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compile_latex(tex_path, output_dir, pdflatex="/usr/bin/pdflatex", fmt=None, timeout=30, scratch=None):
+    """
+    Compile a .tex file into <output_dir>/<name>.pdf.
+
+    pdflatex runs in a scratch directory under scratch (see scratch_root).
+    Raises subprocess.TimeoutExpired if pdflatex does not finish in time.
+    Returns the completed process so callers can log stdout/stderr.
+    """
+    name = os.path.splitext(os.path.basename(tex_path))[0]
+    with scratch_dir(scratch) as build_dir:
+        result = subprocess.run(
+            pdflatex_command(tex_path, build_dir, pdflatex, fmt),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+
+        built_pdf = os.path.join(build_dir, f"{name}.pdf")
+        if os.path.exists(built_pdf):
+            move_into_place(built_pdf, os.path.join(output_dir, f"{name}.pdf"))
+
+    return result
@@ -3,9 +3,16 @@ import json
 import logging
 import unicodedata
 import os
+import signal
+import threading
+import importlib.util
+from itertools import islice
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from typing import Dict, List, Optional, Tuple, Any, Set, Union
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
+from cv_gen.keyword_matcher import matcher_for
 
 # Optional imports with fallbacks
 try:
@@ -14,50 +21,178 @@ except ImportError:
     logging.warning("PyPDF2 not installed. PDF parsing will not be available.")
     PdfReader = None
 
-try:
-    import nltk
-    from nltk.tokenize import sent_tokenize, word_tokenize
-    from nltk.corpus import stopwords
-    # Download necessary NLTK resources if not already downloaded
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords', quiet=True)
-    try:
-        nltk.data.find('taggers/averaged_perceptron_tagger')
-    except LookupError:
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-    try:
-        nltk.data.find('chunkers/maxent_ne_chunker')
-    except LookupError:
-        nltk.download('maxent_ne_chunker', quiet=True)
-    try:
-        nltk.data.find('corpora/words')
-    except LookupError:
-        nltk.download('words', quiet=True)
-    HAS_NLTK = True
-except ImportError:
+# NLP libraries are only looked up here; the models are loaded on first use
+# (or by preload()), importing this module must stay cheap
+HAS_NLTK = importlib.util.find_spec("nltk") is not None
+if not HAS_NLTK:
     logging.warning("NLTK not installed. Advanced NLP features will not be available.")
-    HAS_NLTK = False
 
-try:
+HAS_SPACY = importlib.util.find_spec("spacy") is not None
+if not HAS_SPACY:
+    logging.warning("spaCy not installed. Advanced NLP features will not be available.")
+
+SPACY_MODEL = "en_core_web_sm"
+
+# The parser only reads entities and sentence boundaries. The tagger,
+# lemmatizer and dependency parser are skipped; sentences come from the
+# much cheaper senter pipe where the model ships one
+SPACY_DISABLED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "maxent_ne_chunker": "chunkers/maxent_ne_chunker",
+    "words": "corpora/words",
+}
+
+# File types parse_resume reads
+RESUME_EXTENSIONS = ('.pdf', '.txt', '.text')
+
+# Optional text extraction budget for PDFs, pages past it are never parsed;
+# 0, the default, means no limit. A resume cut short by it carries an
+# 'extraction' report and a warning is logged
+PDF_MAX_PAGES = int(os.getenv("CV_PARSER_PDF_MAX_PAGES", "0")) or None
+PDF_MAX_CHARS = int(os.getenv("CV_PARSER_PDF_MAX_CHARS", "0")) or None
+
+# PDFs longer than PDF_PAGES_PER_TASK pages are extracted in page ranges by up
+# to PDF_WORKERS processes
+PDF_WORKERS = int(os.getenv("CV_PARSER_PDF_WORKERS", "1"))
+PDF_PAGES_PER_TASK = 8
+
+# Never download models, a missing one is reported instead
+OFFLINE = os.getenv("CV_PARSER_OFFLINE", "False").lower() == "true"
+
+_models = {}
+_models_lock = threading.Lock()
+
+# Guards the one-time build of the parser's shared patterns and keywords
+_compile_lock = threading.Lock()
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised by preload() when an NLP model is missing and cannot be downloaded"""
+
+
+class ParseTimeout(BaseException):
+    """
+    Raised inside parse_many when a document runs past its timeout. Not an
+    Exception, so the parser's own fallbacks cannot swallow it.
+    """
+
+
+@contextmanager
+def _time_limit(seconds):
+    # SIGALRM only reaches the main thread, elsewhere documents run unbounded
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ParseTimeout(f"Timed out after {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _load_spacy():
     import spacy
+
     try:
-        nlp = spacy.load("en_core_web_sm")
+        model = spacy.load(SPACY_MODEL, disable=SPACY_DISABLED_PIPES)
     except OSError:
+        if OFFLINE:
+            raise ModelUnavailable(f"spaCy model {SPACY_MODEL} is not installed (offline mode)")
         logging.warning("Spacy model not found. Downloading model...")
         from spacy.cli import download
-        download("en_core_web_sm")
-        nlp = spacy.load("en_core_web_sm")
-    HAS_SPACY = True
-except ImportError:
-    logging.warning("spaCy not installed. Advanced NLP features will not be available.")
-    HAS_SPACY = False
-    nlp = None
+        download(SPACY_MODEL)
+        model = spacy.load(SPACY_MODEL, disable=SPACY_DISABLED_PIPES)
+
+    if "senter" in model.disabled:
+        model.enable_pipe("senter")
+    elif "parser" in model.disabled:
+        # No senter in this model, sentences need the parser back
+        model.enable_pipe("parser")
+    return model
+
+
+def _load_nltk():
+    import nltk
+
+    for resource, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            if OFFLINE:
+                raise ModelUnavailable(f"NLTK resource {resource} is not installed (offline mode)")
+            nltk.download(resource, quiet=True)
+    return nltk
+
+
+def _get_model(name, loader):
+    # Loaded once per process; a failed load is remembered too, so a missing
+    # model costs one warning instead of one attempt per resume
+    if name in _models:
+        return _models[name]
+    with _models_lock:
+        if name not in _models:
+            try:
+                _models[name] = loader()
+            except Exception as e:
+                logging.warning(f"Could not load {name}, continuing without it: {e}")
+                _models[name] = None
+        return _models[name]
+
+
+def get_nlp():
+    """The shared spaCy pipeline, or None without spaCy or its model"""
+    return _get_model("spacy", _load_spacy) if HAS_SPACY else None
+
+
+def get_nltk():
+    """The nltk module with its resources available, or None"""
+    return _get_model("nltk", _load_nltk) if HAS_NLTK else None
+
+
+def preload(spacy=True, nltk=True, offline=None):
+    """
+    Load the NLP models now instead of on the first parse.
+
+    Call it in the parent process before forking workers (gunicorn
+    --preload, a multiprocessing pool with fork) so they share one copy of
+    the models copy-on-write. With offline, or CV_PARSER_OFFLINE set,
+    nothing is downloaded and a missing model raises ModelUnavailable right
+    away instead of degrading every parse.
+    """
+    global OFFLINE
+    if offline is not None:
+        OFFLINE = offline
+
+    loaded = {}
+    with _models_lock:
+        for name, wanted, available, loader in (
+            ("spacy", spacy, HAS_SPACY, _load_spacy),
+            ("nltk", nltk, HAS_NLTK, _load_nltk),
+        ):
+            if not wanted or not available:
+                continue
+            if _models.get(name) is None:
+                try:
+                    _models[name] = loader()
+                except Exception:
+                    _models.pop(name, None)
+                    if OFFLINE:
+                        raise
+                    logging.warning(f"Could not preload {name}", exc_info=True)
+                    continue
+            loaded[name] = _models[name]
+    return loaded
+
 
 # Configure logging
 logging.basicConfig(
@@ -73,7 +208,8 @@ class AdvancedResumeParser:
     using NLP techniques and robust pattern matching.
     """
     
-    def __init__(self, debug_mode=False, use_nlp=True, output_dir=None):
+    def __init__(self, debug_mode=False, use_nlp=True, output_dir=None,
+                 pdf_max_pages=PDF_MAX_PAGES, pdf_max_chars=PDF_MAX_CHARS, pdf_workers=PDF_WORKERS):
         """
         Initialize the parser with configurable options.
         
@@ -81,16 +217,43 @@ class AdvancedResumeParser:
             debug_mode: Enable detailed logging for debugging
             use_nlp: Enable NLP-based enhancements when available
             output_dir: Directory to save intermediate and final outputs
+            pdf_max_pages: Pages of a PDF to read at most, None for all
+            pdf_max_chars: Characters of PDF text to read at most, None for all
+            pdf_workers: Processes extracting page ranges of long PDFs
         """
         self.debug_mode = debug_mode
         self.use_nlp = use_nlp and (HAS_NLTK or HAS_SPACY)
         self.output_dir = output_dir
+        self.pdf_max_pages = pdf_max_pages
+        self.pdf_max_chars = pdf_max_chars
+        self.pdf_workers = pdf_workers
+        
+        # Filled by prepare_batch, read by parse_text
+        self._prepared = {}
+        self._docs = {}
         
         if self.output_dir and not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         
+        # Patterns, keyword lists and templates are shared by all parsers
+        self._compile_shared()
+    
+    @classmethod
+    def _compile_shared(cls):
+        """Build the patterns, keywords and templates every parser uses, once per class"""
+        if cls.__dict__.get('_compiled'):
+            return
+        with _compile_lock:
+            if cls.__dict__.get('_compiled'):
+                return
+            cls._compile_shared_attributes()
+            cls._compiled = True
+    
+    @classmethod
+    def _compile_shared_attributes(cls):
+        """Set the patterns, keyword lists and templates as class attributes"""
         # Define section patterns with common variations
-        self.section_patterns = {
+        section_patterns = {
             'personal_info': r'(^|^.*?\n)((?:[A-Z][a-z]+ )+[A-Z][a-z]+)(?:\s*\n)(.+?(?=\n\s*\n|\n\s*[A-Z]))',
             'objective': r'(?i)(^|\n)\s*(career\s+objective|professional\s+summary|summary|profile|about|objective|career\s+profile|professional\s+profile|career\s+overview|executive\s+summary)\s*(?:\:|\n)',
             'experience': r'(?i)(^|\n)\s*(experience|work\s+history|employment(\s+history)?|professional\s+experience|work\s+experience|career\s+history|professional\s+background)\s*(?:\:|\n)',
@@ -109,8 +272,13 @@ class AdvancedResumeParser:
             'contact': r'(?i)(^|\n)\s*(contact|contact\s+details|contact\s+information|personal\s+details|personal\s+information)\s*(?:\:|\n)',
         }
         
+        cls.section_patterns = {name: re.compile(pattern) for name, pattern in section_patterns.items()}
+        # Headings are found in one scan, the personal info block on its own
+        cls.section_heading_pattern = cls._compile_section_heading_pattern(cls.section_patterns)
+        cls.personal_info_pattern = re.compile(section_patterns['personal_info'], re.MULTILINE)
+        
         # Define regex patterns for extracting common information
-        self.patterns = {
+        patterns = {
             'email': r'[\w.+-]+@[\w-]+\.[\w.-]+',
             'phone': r'(?:(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}|\+\d{1,3}[-\s]?\d{1,14})',
             'linkedin': r'(?:linkedin\.com/in/|linkedin\.com/profile/view\?id=|linkedin\.com/pub/)([a-zA-Z0-9_-]+)',
@@ -124,21 +292,28 @@ class AdvancedResumeParser:
             'name': r'^([A-Z][a-z]+(?:[\s\'-][A-Z][a-z]+)+)'
         }
         
+        cls.patterns = {name: re.compile(pattern) for name, pattern in patterns.items()}
+        
         # Compile common technology and skill keywords
-        self.tech_keywords = self._compile_tech_keywords()
-        self.skill_categories = self._compile_skill_categories()
+        cls.tech_keywords = cls._compile_tech_keywords()
+        cls.skill_categories = cls._compile_skill_categories()
+        # Both keyword sets are searched with one scan per text, see keyword_matcher.py
+        cls.tech_matcher = matcher_for(cls.tech_keywords)
+        cls.skill_matcher = matcher_for(
+            [skill for keywords in cls.skill_categories.values() for skill in keywords]
+        )
         
         # Define common job titles and roles for better extraction
-        self.job_titles = self._compile_job_titles()
+        cls.job_titles = cls._compile_job_titles()
         
         # Common education institutions and degrees
-        self.education_keywords = self._compile_education_keywords()
+        cls.education_keywords = cls._compile_education_keywords()
         
         # Language database with ISO codes and proficiency levels
-        self.language_data = self._compile_language_data()
+        cls.language_data = cls._compile_language_data()
         
         # Define section content templates for structured output
-        self.section_templates = {
+        cls.section_templates = {
             'personal_info': {
                 'name': '',
                 'email': '',
@@ -176,6 +351,28 @@ class AdvancedResumeParser:
             }
         }
     
+    @staticmethod
+    def _compile_section_heading_pattern(section_patterns):
+        """
+        Combine the section heading patterns into one regex.
+        
+        Each section is a named lookahead, so the scan moves one character at
+        a time and finds every heading each pattern would find on its own,
+        including headings overlapping one of another section ("Language
+        Skills" split over two lines is also a "Skills" heading). Only line
+        starts and newlines, where every heading pattern begins, are tried.
+        """
+        lookaheads = []
+        for name, pattern in section_patterns.items():
+            if name == 'personal_info':
+                continue
+            source = pattern.pattern
+            # Inline flags must lead a regex, scope them to this section
+            if source.startswith('(?i)'):
+                source = '(?i:' + source[len('(?i)'):] + ')'
+            lookaheads.append(f'(?=(?P<{name}>{source}))')
+        return re.compile(r'(?:^|(?=\n))(?:' + '|'.join(lookaheads) + ')', re.MULTILINE)
+    
     ################################################################################
     # Main parsing methods
     ################################################################################
@@ -189,26 +386,24 @@ class AdvancedResumeParser:
             output_format: Format of output ('json', 'dict', or 'text')
             
         Returns:
-            Structured resume data in requested format
+            Structured resume data in requested format, with an 'extraction'
+            report when the PDF budget left part of the file unread
         """
         logger.info(f"Starting to parse resume: {file_path}")
         
         try:
-            # Extract text from file based on file extension
-            file_extension = os.path.splitext(file_path)[1].lower()
-            
-            if file_extension == '.pdf':
-                if PdfReader is None:
-                    raise ImportError("PyPDF2 is required for PDF parsing but not installed")
-                text = self._extract_text_from_pdf(file_path)
-            elif file_extension in ['.txt', '.text']:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    text = f.read()
-            else:
-                raise ValueError(f"Unsupported file type: {file_extension}")
+            extraction = {}
+            text = self._extract_text(file_path, extraction)
             
             # Process and return the parsed data
-            return self.parse_text(text, output_format)
+            if not extraction.get('truncated_by'):
+                return self.parse_text(text, output_format)
+            
+            parsed_data = self.parse_text(text, 'dict')
+            parsed_data['extraction'] = extraction
+            if output_format == 'json':
+                return json.dumps(parsed_data, indent=2)
+            return parsed_data
             
         except Exception as e:
             logger.error(f"Error parsing resume: {e}", exc_info=True)
@@ -244,8 +439,9 @@ class AdvancedResumeParser:
             Structured resume data in requested format
         """
         try:
-            # Preprocess the text
-            text = self._preprocess_text(text)
+            # Preprocess the text, unless prepare_batch already did
+            prepared = self._prepared.get(text)
+            text = prepared if prepared is not None else self._preprocess_text(text)
             
             if self.debug_mode and self.output_dir:
                 # Save extracted text for debugging
@@ -314,19 +510,133 @@ class AdvancedResumeParser:
                 return json.dumps(empty_result, indent=2)
             return empty_result
     
+    def parse_many(self, items, workers=None, output_format='dict', ordered=True, timeout=None, batch_size=16):
+        """
+        Parse many resumes in a process pool, yielding results as they are ready.
+        
+        Args:
+            items: Iterable of resume file paths or resume texts; a string is
+                   read as a path when it names an existing file or has a
+                   resume file extension
+            workers: Worker processes, defaults to the number of cores; with
+                     1 or less the resumes are parsed in this process
+            output_format: Format of each result's data ('json', 'dict', or 'text')
+            ordered: Yield in input order, or as soon as each batch completes
+            timeout: Seconds a single resume may take before it is abandoned
+            batch_size: Resumes sent to a worker at a time, spaCy runs over
+                        each batch with nlp.pipe
+            
+        Returns:
+            Generator of dicts with the item's index, a status ('ok',
+            'timeout' or 'failed'), the parsed data, the error if any and
+            the extraction report when the PDF budget left part of the
+            file unread
+        
+        Each worker loads its own parser and NLP models once. Call preload()
+        before parse_many to load them in this process instead, forked
+        workers then share them. Items are read lazily and only a few
+        batches per worker are in flight, so large inputs are streamed.
+        """
+        workers = workers or os.cpu_count() or 1
+        batches = _batched(enumerate(items), batch_size)
+        
+        if workers <= 1:
+            for batch in batches:
+                yield from _parse_batch(self, batch, output_format, timeout)
+            return
+        
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=({
+                'debug_mode': self.debug_mode,
+                'use_nlp': self.use_nlp,
+                'pdf_max_pages': self.pdf_max_pages,
+                'pdf_max_chars': self.pdf_max_chars,
+                'pdf_workers': self.pdf_workers,
+            },),
+        )
+        # Bounded, so a huge input is not read ahead into memory
+        max_pending = workers * 4
+        pending = {}
+        finished = {}
+        next_to_yield = 0
+        
+        def collect():
+            nonlocal next_to_yield
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                finished[pending.pop(future)] = future.result()
+            if not ordered:
+                for results in finished.values():
+                    yield from results
+                finished.clear()
+            while next_to_yield in finished:
+                yield from finished.pop(next_to_yield)
+                next_to_yield += 1
+        
+        try:
+            for number, batch in enumerate(batches):
+                pending[pool.submit(_parse_batch_in_worker, batch, output_format, timeout)] = number
+                while len(pending) + len(finished) >= max_pending:
+                    yield from collect()
+            while pending:
+                yield from collect()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def prepare_batch(self, texts: List[str]) -> None:
+        """
+        Preprocess texts and run spaCy over all of them with nlp.pipe.
+        
+        parse_text then takes the prepared text and spaCy documents instead of
+        computing them one resume at a time. Replaces the previous batch.
+        """
+        self._prepared = {}
+        self._docs = {}
+        nlp_inputs = []
+        for text in texts:
+            prepared = self._preprocess_text(text)
+            self._prepared[text] = prepared
+            if self.use_nlp:
+                # The same slices _apply_nlp_preprocessing and _parse_personal_info take
+                nlp_inputs.append(prepared[:100000])
+                if not self.patterns['name'].search(prepared[:500]):
+                    nlp_inputs.append(prepared[:1000])
+        
+        nlp = get_nlp() if nlp_inputs else None
+        if nlp:
+            nlp_inputs = list(dict.fromkeys(nlp_inputs))
+            self._docs = dict(zip(nlp_inputs, nlp.pipe(nlp_inputs, batch_size=len(nlp_inputs))))
+    
+    def _nlp_doc(self, nlp, text: str):
+        """spaCy document of text, from prepare_batch when it ran over it"""
+        doc = self._docs.get(text)
+        return doc if doc is not None else nlp(text)
+    
     ################################################################################
     # Text extraction and preprocessing methods
     ################################################################################
     
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
+    def _extract_text(self, file_path: str, report: Optional[Dict] = None) -> str:
+        """Extract text from file based on file extension, PDFs fill report as iter_pdf_pages does."""
+        file_extension = os.path.splitext(file_path)[1].lower()
+        
+        if file_extension == '.pdf':
+            if PdfReader is None:
+                raise ImportError("PyPDF2 is required for PDF parsing but not installed")
+            return self._extract_text_from_pdf(file_path, report)
+        elif file_extension in ['.txt', '.text']:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        else:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+    
+    def _extract_text_from_pdf(self, pdf_path: str, report: Optional[Dict] = None) -> str:
         """Extract text from PDF file with error handling."""
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
+            pages = self.iter_pdf_pages(pdf_path, report=report)
+            text = "".join(page_text + "\n\n" for page_text in pages if page_text)
             
             # Handle empty text
             if not text.strip():
@@ -341,6 +651,55 @@ class AdvancedResumeParser:
             logger.error(f"Error extracting text from PDF: {e}", exc_info=True)
             raise
     
+    def iter_pdf_pages(self, pdf_path: str, max_pages: Optional[int] = None,
+                       max_chars: Optional[int] = None, workers: Optional[int] = None,
+                       report: Optional[Dict] = None):
+        """
+        Yield the text of each page of a PDF, in page order.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            max_pages: Stop after this many pages, defaults to pdf_max_pages,
+                       0 for no limit
+            max_chars: Stop once this many characters were yielded, the last
+                       page is cut short; defaults to pdf_max_chars, 0 for
+                       no limit
+            workers: Processes extracting page ranges, defaults to pdf_workers
+            report: Dict filled with the PDF's page_count, the pages_read and
+                    the budget that stopped the read early, truncated_by
+                    ('max_pages', 'max_chars' or None)
+            
+        Yields:
+            Text of each page, '' for pages without text
+        
+        The file is read from disk as pages need it instead of loaded whole,
+        and pages past the budget are never parsed, so embedded scans and
+        long documents cost nothing beyond the pages used. With workers > 1
+        PDFs longer than PDF_PAGES_PER_TASK pages are split into ranges
+        extracted in parallel; only as many ranges as workers run ahead of
+        the page being yielded.
+        """
+        max_pages = (self.pdf_max_pages if max_pages is None else max_pages) or None
+        max_chars = (self.pdf_max_chars if max_chars is None else max_chars) or None
+        workers = self.pdf_workers if workers is None else workers
+        
+        report = {} if report is None else report
+        report.update(page_count=None, pages_read=0, truncated_by=None)
+        
+        chars = 0
+        for page_text in _pdf_page_texts(pdf_path, max_pages, workers, report):
+            report['pages_read'] += 1
+            if max_chars is not None and chars + len(page_text) >= max_chars:
+                if chars + len(page_text) > max_chars or report['pages_read'] < report['page_count']:
+                    _report_truncation(pdf_path, report, 'max_chars')
+                yield page_text[:max_chars - chars]
+                return
+            chars += len(page_text)
+            yield page_text
+        
+        if report['pages_read'] < report['page_count']:
+            _report_truncation(pdf_path, report, 'max_pages')
+    
     def _normalize_text(self, text: str) -> str:
         """Normalize text by removing excessive whitespace and normalizing Unicode."""
         # Normalize Unicode
@@ -391,11 +750,11 @@ class AdvancedResumeParser:
         
         # Ensure sections are properly separated
         for section_pattern in self.section_patterns.values():
-            text = re.sub(section_pattern, lambda m: f"\n\n{m.group(0)}", text)
+            text = section_pattern.sub(lambda m: f"\n\n{m.group(0)}", text)
         
         # Normalize section headers (ensure they're followed by newline)
         for pattern in self.section_patterns.values():
-            text = re.sub(pattern, lambda m: m.group(0) if m.group(0).endswith('\n') else m.group(0) + '\n', text)
+            text = pattern.sub(lambda m: m.group(0) if m.group(0).endswith('\n') else m.group(0) + '\n', text)
         
         return text
     
@@ -405,9 +764,11 @@ class AdvancedResumeParser:
             return text
             
         try:
-            if HAS_SPACY and nlp:
+            nlp = get_nlp()
+            nltk = get_nltk() if nlp is None else None
+            if nlp:
                 # Use spaCy for NLP preprocessing
-                doc = nlp(text[:100000])  # Limit to prevent memory issues with very large texts
+                doc = self._nlp_doc(nlp, text[:100000])  # Limit to prevent memory issues with very large texts
                 
                 # Entity recognition for better section detection
                 entities = [(ent.text, ent.label_) for ent in doc.ents]
@@ -419,10 +780,10 @@ class AdvancedResumeParser:
                         # This is subtle and doesn't modify the actual text structure
                         text = text.replace(entity, entity)  # Placeholder, actual NLP use is handled in specific parsers
             
-            elif HAS_NLTK:
+            elif nltk:
                 # Use NLTK for preprocessing
-                sentences = sent_tokenize(text)
-                tokens = [word_tokenize(sentence) for sentence in sentences]
+                sentences = nltk.sent_tokenize(text)
+                tokens = [nltk.word_tokenize(sentence) for sentence in sentences]
                 
                 # POS tagging for better entity recognition
                 pos_tags = [nltk.pos_tag(sentence_tokens) for sentence_tokens in tokens]
@@ -457,12 +818,13 @@ class AdvancedResumeParser:
         sections = {}
         section_boundaries = []
         
-        # Find all section headings and their positions
-        for section_name, pattern in self.section_patterns.items():
-            for match in re.finditer(pattern, text, re.MULTILINE):
-                # Store the starting position of the section heading
-                position = match.end()
-                section_boundaries.append((position, section_name))
+        # Find all section headings and their positions, in one scan
+        for match in self.personal_info_pattern.finditer(text):
+            section_boundaries.append((match.end(), 'personal_info'))
+        for match in self.section_heading_pattern.finditer(text):
+            # Sections start where their heading ends
+            section_name = match.lastgroup
+            section_boundaries.append((match.end(section_name), section_name))
         
         # Sort boundaries by position
         section_boundaries.sort()
@@ -508,7 +870,8 @@ class AdvancedResumeParser:
                     unassigned_text = unassigned_text.replace(section_content, '')
                 
                 # Use NLP to identify additional sections
-                if HAS_SPACY and nlp:
+                nlp = get_nlp()
+                if nlp:
                     doc = nlp(unassigned_text[:100000])  # Limit size to prevent memory issues
                     
                     # Identify potential sections based on linguistic patterns
@@ -663,12 +1026,12 @@ class AdvancedResumeParser:
         search_text = personal_text + "\n" + contact_text + "\n" + text[:1000]
         
         # Extract email
-        email_match = re.search(self.patterns['email'], search_text)
+        email_match = self.patterns['email'].search(search_text)
         if email_match:
             info['email'] = email_match.group(0)
         
         # Extract phone
-        phone_match = re.search(self.patterns['phone'], search_text)
+        phone_match = self.patterns['phone'].search(search_text)
         if phone_match:
             # Clean and format phone number
             phone = phone_match.group(0)
@@ -676,17 +1039,17 @@ class AdvancedResumeParser:
             info['phone'] = phone
         
         # Extract LinkedIn
-        linkedin_match = re.search(self.patterns['linkedin'], search_text)
+        linkedin_match = self.patterns['linkedin'].search(search_text)
         if linkedin_match:
             info['linkedin'] = f"linkedin.com/in/{linkedin_match.group(1)}"
         
         # Extract GitHub
-        github_match = re.search(self.patterns['github'], search_text)
+        github_match = self.patterns['github'].search(search_text)
         if github_match:
             info['github'] = f"github.com/{github_match.group(1)}"
         
         # Extract website
-        website_match = re.search(self.patterns['website'], search_text)
+        website_match = self.patterns['website'].search(search_text)
         if website_match and not any(domain in website_match.group(0) for domain in ['linkedin.com', 'github.com']):
             info['website'] = website_match.group(0)
         
@@ -694,20 +1057,22 @@ class AdvancedResumeParser:
         name = ""
         
         # Method 1: Look for name at the beginning of the document
-        name_match = re.search(self.patterns['name'], text[:500])
+        name_match = self.patterns['name'].search(text[:500])
         if name_match:
             name = name_match.group(1)
         
         # Method 2: Use NLP if available
         if not name and self.use_nlp:
-            if HAS_SPACY and nlp:
-                doc = nlp(text[:1000])
+            nlp = get_nlp()
+            nltk = get_nltk() if nlp is None else None
+            if nlp:
+                doc = self._nlp_doc(nlp, text[:1000])
                 for ent in doc.ents:
                     if ent.label_ == 'PERSON':
                         name = ent.text
                         break
-            elif HAS_NLTK:
-                tokens = word_tokenize(text[:1000])
+            elif nltk:
+                tokens = nltk.word_tokenize(text[:1000])
                 pos_tags = nltk.pos_tag(tokens)
                 chunked = nltk.ne_chunk(pos_tags)
                 for chunk in chunked:
@@ -725,7 +1090,7 @@ class AdvancedResumeParser:
         info['name'] = name
         
         # Extract location
-        location_match = re.search(self.patterns['location'], search_text)
+        location_match = self.patterns['location'].search(search_text)
         if location_match:
             info['location'] = location_match.group(0).strip()
         
@@ -752,7 +1117,7 @@ class AdvancedResumeParser:
         objective = paragraphs[0] if paragraphs else ""
         
         # Clean up any bullet points
-        objective = re.sub(self.patterns['bullet_point_start'], '', objective)
+        objective = self.patterns['bullet_point_start'].sub('', objective)
         
         # Limit length and clean up
         if len(objective) > 500:
@@ -796,7 +1161,7 @@ class AdvancedResumeParser:
             education_item = self.section_templates['education'].copy()
             
             # Extract degree
-            degree_match = re.search(self.patterns['education_degree'], entry)
+            degree_match = self.patterns['education_degree'].search(entry)
             if degree_match:
                 education_item['degree'] = degree_match.group(0).strip()
             
@@ -814,7 +1179,7 @@ class AdvancedResumeParser:
                         break
             
             # Extract date range
-            date_match = re.search(self.patterns['date_range'], entry)
+            date_match = self.patterns['date_range'].search(entry)
             if date_match:
                 dates = date_match.group(0).split('to')
                 if len(dates) == 2:
@@ -822,7 +1187,7 @@ class AdvancedResumeParser:
                     education_item['endDate'] = dates[1].strip()
                 else:
                     # Try shorter date pattern (e.g., "2018-2022")
-                    date_match = re.search(self.patterns['date_range_short'], entry)
+                    date_match = self.patterns['date_range_short'].search(entry)
                     if date_match:
                         dates = re.split(r'[-–—]', date_match.group(0))
                         if len(dates) == 2:
@@ -830,12 +1195,12 @@ class AdvancedResumeParser:
                             education_item['endDate'] = dates[1].strip()
             
             # Extract GPA
-            gpa_match = re.search(self.patterns['gpa'], entry)
+            gpa_match = self.patterns['gpa'].search(entry)
             if gpa_match:
                 education_item['gpa'] = gpa_match.group(1)
             
             # Extract location
-            location_match = re.search(self.patterns['location'], entry)
+            location_match = self.patterns['location'].search(entry)
             if location_match:
                 education_item['location'] = location_match.group(0).strip()
             
@@ -918,7 +1283,7 @@ class AdvancedResumeParser:
                             experience_item['company'] = lines[1].strip()
             
             # Extract date range
-            date_match = re.search(self.patterns['date_range'], entry)
+            date_match = self.patterns['date_range'].search(entry)
             if date_match:
                 date_text = date_match.group(0)
                 
@@ -939,13 +1304,13 @@ class AdvancedResumeParser:
                     experience_item['endDate'] = dates[1].strip()
             
             # Extract location
-            location_match = re.search(self.patterns['location'], entry)
+            location_match = self.patterns['location'].search(entry)
             if location_match:
                 experience_item['location'] = location_match.group(0).strip()
             
             # Extract responsibilities (bullet points)
             responsibilities = []
-            for bullet_match in re.finditer(self.patterns['bullet_point'], entry):
+            for bullet_match in self.patterns['bullet_point'].finditer(entry):
                 responsibility = bullet_match.group(1).strip()
                 if responsibility:
                     responsibilities.append(responsibility)
@@ -954,7 +1319,7 @@ class AdvancedResumeParser:
             if not responsibilities and len(lines) > 2:
                 for line in lines[2:]:
                     line = line.strip()
-                    if line and not re.search(self.patterns['date_range'], line) and line != experience_item['location']:
+                    if line and not self.patterns['date_range'].search(line) and line != experience_item['location']:
                         responsibilities.append(line)
             
             experience_item['responsibilities'] = responsibilities
@@ -1009,20 +1374,18 @@ class AdvancedResumeParser:
                 project_item['github_link'] = github_match.group(0)
             
             # Extract timeframe
-            date_match = re.search(self.patterns['date_range'], entry)
+            date_match = self.patterns['date_range'].search(entry)
             if date_match:
                 project_item['timeframe'] = date_match.group(0)
             
             # Extract technologies used
-            tech_keywords = []
-            for keyword in self.tech_keywords:
-                if re.search(r'\b' + re.escape(keyword.lower()) + r'\b', entry.lower()):
-                    tech_keywords.append(keyword)
+            found = self.tech_matcher.found(entry)
+            tech_keywords = [keyword for keyword in self.tech_keywords if keyword in found]
             project_item['technologies'] = tech_keywords
             
             # Extract responsibilities/description (bullet points)
             responsibilities = []
-            for bullet_match in re.finditer(self.patterns['bullet_point'], entry):
+            for bullet_match in self.patterns['bullet_point'].finditer(entry):
                 responsibility = bullet_match.group(1).strip()
                 if responsibility:
                     responsibilities.append(responsibility)
@@ -1031,7 +1394,7 @@ class AdvancedResumeParser:
             if not responsibilities and len(lines) > 1:
                 for line in lines[1:]:
                     line = line.strip()
-                    if line and not re.search(self.patterns['date_range'], line) and line != project_item['github_link']:
+                    if line and not self.patterns['date_range'].search(line) and line != project_item['github_link']:
                         responsibilities.append(line)
             
             project_item['responsibilities'] = responsibilities
@@ -1143,9 +1506,8 @@ class AdvancedResumeParser:
         
         for search_text in search_texts:
             # Extract technologies using predefined list
-            for tech in self.tech_keywords:
-                if re.search(r'\b' + re.escape(tech.lower()) + r'\b', search_text.lower()):
-                    technologies.add(tech)
+            found = self.tech_matcher.found(search_text)
+            technologies.update(tech for tech in self.tech_keywords if tech in found)
             
             # Extract skill lists
             skill_lists = re.finditer(r'(?i)(skills|technologies|technical|programming|software)(?:[:\s])(.*?)(?=\n\n|\n[A-Z]|$)', search_text)
@@ -1239,7 +1601,7 @@ class AdvancedResumeParser:
         
         # If no certifications found with patterns, look for bullet point entries
         if not certifications:
-            bullet_matches = re.finditer(self.patterns['bullet_point'], text)
+            bullet_matches = self.patterns['bullet_point'].finditer(text)
             
             for bullet_match in bullet_matches:
                 item = bullet_match.group(1).strip()
@@ -1276,6 +1638,13 @@ class AdvancedResumeParser:
                 if any(keyword in paragraph.lower() for keyword in ['skill', 'technology', 'competency', 'expertise']):
                     skills_text += paragraph + '\n\n'
         
+        # Keywords present in each text, every text is scanned once
+        found_in = {}
+        def found(search_text):
+            if search_text not in found_in:
+                found_in[search_text] = self.skill_matcher.found(search_text)
+            return found_in[search_text]
+        
         # Extract skills from different categories
         for category, keywords in self.skill_categories.items():
             category_skills = []
@@ -1298,10 +1667,10 @@ class AdvancedResumeParser:
             
             # Look for skills from this category in the text
             for skill in keywords:
-                if re.search(r'\b' + re.escape(skill.lower()) + r'\b', category_text.lower()):
+                if skill in found(category_text):
                     category_skills.append(skill)
                 # Also check full text for important skills
-                elif category in ['Programming Languages', 'Frameworks', 'Tools'] and re.search(r'\b' + re.escape(skill.lower()) + r'\b', text.lower()):
+                elif category in ['Programming Languages', 'Frameworks', 'Tools'] and skill in found(text):
                     category_skills.append(skill)
             
             # Add non-empty skill categories
@@ -1315,7 +1684,7 @@ class AdvancedResumeParser:
         general_skills = []
         
         # Extract skills from bullet points
-        bullet_matches = re.finditer(self.patterns['bullet_point'], skills_text)
+        bullet_matches = self.patterns['bullet_point'].finditer(skills_text)
         for bullet_match in bullet_matches:
             skill = bullet_match.group(1).strip()
             # Make sure it's a reasonable skill (not too long or short)
@@ -1358,7 +1727,7 @@ class AdvancedResumeParser:
         entries = []
 
         # Approach 1: Split by date range patterns
-        date_matches = list(re.finditer(self.patterns['date_range'], text))
+        date_matches = list(self.patterns['date_range'].finditer(text))
         if date_matches:
             # Split text at each date match
             start_idx = 0
@@ -1402,7 +1771,8 @@ class AdvancedResumeParser:
         
         return remove_empty(data)
 
-    def _compile_tech_keywords(self) -> List[str]:
+    @classmethod
+    def _compile_tech_keywords(cls) -> List[str]:
         """Compile a list of common technology keywords."""
         return [
             # Programming Languages
@@ -1433,7 +1803,8 @@ class AdvancedResumeParser:
             'Blockchain', 'Ethereum', 'Solidity', 'Web3'
         ]
 
-    def _compile_skill_categories(self) -> Dict[str, List[str]]:
+    @classmethod
+    def _compile_skill_categories(cls) -> Dict[str, List[str]]:
         """Compile categorized skill keywords."""
         return {
             'Programming Languages': [
@@ -1469,7 +1840,8 @@ class AdvancedResumeParser:
             ]
         }
 
-    def _compile_job_titles(self) -> List[str]:
+    @classmethod
+    def _compile_job_titles(cls) -> List[str]:
         """Compile common job titles for better role extraction."""
         return [
             'Software Engineer', 'Senior Software Engineer', 'Software Developer', 'Web Developer',
@@ -1480,7 +1852,8 @@ class AdvancedResumeParser:
             'CTO', 'CIO', 'IT Director', 'Solutions Architect', 'UX Designer', 'UI Designer'
         ]
 
-    def _compile_education_keywords(self) -> List[str]:
+    @classmethod
+    def _compile_education_keywords(cls) -> List[str]:
         """Compile common education institution and degree keywords."""
         return [
             'University', 'College', 'Institute', 'School', 'Academy', 
@@ -1488,7 +1861,8 @@ class AdvancedResumeParser:
             'B.Tech', 'M.Tech', 'B.A.', 'M.A.', 'B.Sc.', 'M.Sc.', 'B.E.', 'M.E.'
         ]
 
-    def _compile_language_data(self) -> Dict[str, Dict[str, str]]:
+    @classmethod
+    def _compile_language_data(cls) -> Dict[str, Dict[str, str]]:
         """Compile language data with ISO codes and proficiency levels."""
         return {
             'English': {'iso_code': 'en', 'proficiency_levels': ['Native', 'Fluent', 'Professional']},
@@ -1521,6 +1895,134 @@ class AdvancedResumeParser:
         logger.info(f"Saved parsed resume data to {output_path}")
 
 
+def _extract_pdf_pages(pdf_path, start, stop):
+    """Text of pages start to stop of a PDF, runs in a page range worker"""
+    with open(pdf_path, 'rb') as f:
+        reader = PdfReader(f)
+        return [reader.pages[number].extract_text() or '' for number in range(start, stop)]
+
+
+def _report_truncation(pdf_path, report, budget):
+    report['truncated_by'] = budget
+    logger.warning(
+        f"Read {report['pages_read']} of {report['page_count']} pages of {pdf_path}, "
+        f"the rest is past the PDF {budget} budget"
+    )
+
+
+def _pdf_page_texts(pdf_path, max_pages, workers, report):
+    with open(pdf_path, 'rb') as f:
+        # Given the open file PdfReader seeks to the objects it needs, given
+        # the path it would read the whole file into memory first
+        reader = PdfReader(f)
+        page_count = report['page_count'] = len(reader.pages)
+        if max_pages is not None:
+            page_count = min(page_count, max_pages)
+        
+        if workers <= 1 or page_count <= PDF_PAGES_PER_TASK:
+            for number in range(page_count):
+                yield reader.pages[number].extract_text() or ''
+            return
+    
+    ranges = iter([
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ])
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        running = deque(pool.submit(_extract_pdf_pages, pdf_path, *page_range) for page_range in islice(ranges, workers))
+        while running:
+            page_texts = running.popleft().result()
+            page_range = next(ranges, None)
+            if page_range is not None:
+                running.append(pool.submit(_extract_pdf_pages, pdf_path, *page_range))
+            yield from page_texts
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# The parser of a parse_many worker process, created once by _init_worker
+_worker_parser = None
+
+
+def _init_worker(parser_options):
+    global _worker_parser
+    try:
+        preload()
+    except ModelUnavailable as e:
+        # An initializer that raises breaks the whole pool. The missing model
+        # is left to the lazy loaders, which never download offline and
+        # report None, so parses take the non-NLP path
+        logger.warning(f"Parsing without NLP models in worker {os.getpid()}: {e}")
+    _worker_parser = AdvancedResumeParser(**parser_options)
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _is_path(item):
+    if isinstance(item, os.PathLike):
+        return True
+    if not isinstance(item, str) or '\n' in item:
+        return False
+    # A missing resume file is reported as failed rather than parsed as text
+    return os.path.splitext(item)[1].lower() in RESUME_EXTENSIONS or os.path.isfile(item)
+
+
+def _parse_batch(parser, batch, output_format, timeout):
+    """Parse [(index, path or text)] with parser, returns one result dict per item"""
+    results = []
+    texts = {}
+    for index, item in batch:
+        result = {"index": index, "status": "ok", "data": None, "error": None, "extraction": None}
+        results.append(result)
+        extraction = {}
+        try:
+            with _time_limit(timeout):
+                texts[index] = parser._extract_text(os.fspath(item), extraction) if _is_path(item) else item
+            if extraction.get('truncated_by'):
+                result["extraction"] = extraction
+        except ParseTimeout as e:
+            result["status"], result["error"] = "timeout", str(e)
+        except Exception as e:
+            result["status"], result["error"] = "failed", str(e)
+    
+    try:
+        # The batch step gets the time its resumes would have had
+        with _time_limit(timeout and timeout * len(texts)):
+            parser.prepare_batch(list(texts.values()))
+    except ParseTimeout:
+        # Each resume is then preprocessed on its own, under its own limit
+        logger.warning(f"Batch preparation timed out, parsing {len(texts)} resumes one by one")
+        parser.prepare_batch([])
+    
+    try:
+        for result in results:
+            if result["index"] not in texts:
+                continue
+            try:
+                with _time_limit(timeout):
+                    result["data"] = parser.parse_text(texts[result["index"]], output_format)
+            except ParseTimeout as e:
+                result["status"], result["error"] = "timeout", str(e)
+    finally:
+        parser.prepare_batch([])
+    return results
+
+
+def _parse_batch_in_worker(batch, output_format, timeout):
+    return _parse_batch(_worker_parser, batch, output_format, timeout)
+
+
+
 # Example usage
 if __name__ == "__main__":
     parser = AdvancedResumeParser(debug_mode=True, output_dir='./output')
@@ -0,0 +1,127 @@
+"""
+
+events.py
+
+Description:
+Small publish/subscribe bus for build progress. The job queue publishes a
+job's stages (queued, running, rendered, compiling, done or failed, with
+timings) on a channel named after the job, and the /jobs/<id>/events
+endpoint streams them to the browser as Server-Sent Events.
+
+Every event on a channel gets an increasing id and channels keep their
+history, so a client that connects late or reconnects with Last-Event-ID
+gets the stages it missed.
+
+Backends:
+    MemoryEventBus  in-process, for a single web process
+    FileEventBus    one JSONL file per channel, shared by every process on
+                    the host (several gunicorn workers, local job workers)
+
+Usage:
+    bus = MemoryEventBus()
+    bus.publish(job_id, {"stage": "compiling"})
+    for event in bus.wait(job_id, after=0, timeout=15):
+        print(event["id"], event["stage"])
+
+"""
+
+import os
+import re
+import json
+import time
+import threading
+
+
+_CHANNEL = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def check_channel(channel):
+    if not _CHANNEL.match(channel or ""):
+        raise ValueError(f"Invalid event channel '{channel}'")
+    return channel
+
+
+class MemoryEventBus:
+
+    def __init__(self, ttl=3600):
+        # Channels are dropped ttl seconds after their last event
+        self.ttl = ttl
+        self._channels = {}
+        self._updated = {}
+        self._condition = threading.Condition()
+
+    def publish(self, channel, event):
+        check_channel(channel)
+        with self._condition:
+            events = self._channels.setdefault(channel, [])
+            event = dict(event, id=len(events) + 1)
+            events.append(event)
+            self._updated[channel] = time.monotonic()
+            self._expire()
+            self._condition.notify_all()
+        return event
+
+    def events(self, channel, after=0):
+        """Events on channel with an id above after"""
+        with self._condition:
+            return list(self._channels.get(channel, [])[after:])
+
+    def wait(self, channel, after=0, timeout=None):
+        """Like events(), but blocks up to timeout seconds until there is one"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: len(self._channels.get(channel, [])) > after, timeout=timeout
+            )
+            return list(self._channels.get(channel, [])[after:])
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for channel in [c for c, updated in self._updated.items() if updated < cutoff]:
+            del self._channels[channel]
+            del self._updated[channel]
+
+
+class FileEventBus:
+
+    def __init__(self, folder, poll_interval=0.2):
+        self.folder = folder
+        self.poll_interval = poll_interval
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, channel):
+        return os.path.join(self.folder, f"{check_channel(channel)}.events")
+
+    def publish(self, channel, event):
+        # One write of one line on an O_APPEND file, concurrent publishers
+        # do not interleave
+        line = json.dumps(event) + "\n"
+        fd = os.open(self.path(channel), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o664)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        return event
+
+    def events(self, channel, after=0):
+        path = self.path(channel)
+        if not os.path.exists(path):
+            return []
+
+        events = []
+        with open(path, "r") as f:
+            for index, line in enumerate(f, 1):
+                if index <= after:
+                    continue
+                if not line.endswith("\n"):
+                    # Still being written, picked up on the next read
+                    break
+                events.append(dict(json.loads(line), id=index))
+        return events
+
+    def wait(self, channel, after=0, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            events = self.events(channel, after)
+            if events or (deadline is not None and time.monotonic() >= deadline):
+                return events
+            time.sleep(self.poll_interval)
@@ -0,0 +1,80 @@
+"""
+
+fragment_cache.py
+
+Description:
+In-memory cache of the LaTeX fragments the Generator renders for each CV
+section. A fragment is keyed by a hash of that section's data, the template
+and the generator version, so when a dashboard edit touches one section only
+that section is rendered again and the cached fragments for the others are
+spliced into the document as they are.
+
+Hits and misses are counted per section so the savings can be read from
+stats().
+
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cv_gen.generator import GENERATOR_VERSION
+
+
+class FragmentCache:
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._fragments = OrderedDict()
+        self._counters = {}
+
+    @staticmethod
+    def make_key(section, section_data, template=None):
+        key = hashlib.sha256()
+        for part in [
+            section,
+            json.dumps(section_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False),
+            str(template or ""),
+            GENERATOR_VERSION,
+        ]:
+            key.update(part.encode("utf-8"))
+            key.update(b"\0")
+        return key.hexdigest()
+
+    def render(self, section, section_data, template, render_fn):
+        """Return the cached fragment for this section's data, calling render_fn on a miss"""
+        key = self.make_key(section, section_data, template)
+
+        with self._lock:
+            counters = self._counters.setdefault(section, {"hits": 0, "misses": 0})
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                counters["hits"] += 1
+                self._fragments.move_to_end(key)
+                return fragment
+            counters["misses"] += 1
+
+        fragment = render_fn()
+
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._fragments),
+                "max_entries": self.max_entries,
+                "sections": {section: dict(counters) for section, counters in self._counters.items()},
+            }
@@ -0,0 +1,142 @@
+"""
+
+images.py
+
+Description:
+Normalizes uploaded profile images before they are embedded in a CV. Phone
+photos are several megabytes while the CV prints them 3.3cm wide, so
+pdflatex spent time decoding the full image on every build and embedded all
+of it in the PDF. The image is rotated upright from its EXIF orientation,
+cropped to a portrait-or-square frame, downsampled to the printed width at
+the target DPI and re-encoded as a baseline JPEG without metadata.
+
+Results are stored under a hash of the source content and the settings, so
+the same photo uploaded twice is only processed once.
+
+Pillow is optional; without it the original image is used unchanged.
+
+Usage:
+    path = normalize_image("instance/image_uploads/photo.png", "instance/image_uploads")
+
+"""
+
+import os
+import hashlib
+import logging
+import threading
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    logging.warning("Pillow not installed. Profile images will be embedded unprocessed.")
+    HAS_PIL = False
+
+
+logger = logging.getLogger(__name__)
+
+# Width of the profile image in the LaTeX templates
+PRINT_WIDTH_CM = 3.3
+
+# Crop limits as height / width: no taller than 4:3 portrait, no wider than square
+MAX_PORTRAIT_RATIO = 4 / 3
+MIN_PORTRAIT_RATIO = 1.0
+
+# Bump when the processing below changes, so cached images are redone
+NORMALIZE_VERSION = "1"
+
+
+def target_width(dpi, width_cm=PRINT_WIDTH_CM):
+    """Pixel width of an image printed width_cm wide at dpi"""
+    return max(1, round(width_cm / 2.54 * dpi))
+
+
+def normalized_name(src_path, dpi, quality, src_digest=None):
+    """Output filename: hash of the source content and the settings"""
+    if src_digest is None:
+        # SHA-256 of the source, ingest.py already has it for uploads
+        source = hashlib.sha256()
+        with open(src_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                source.update(chunk)
+        src_digest = source.hexdigest()
+
+    digest = hashlib.sha256()
+    digest.update(f"{src_digest}\0{NORMALIZE_VERSION}\0{dpi}\0{quality}".encode("utf-8"))
+    return f"{digest.hexdigest()}.jpg"
+
+
+def _crop(image):
+    width, height = image.size
+    if height > width * MAX_PORTRAIT_RATIO:
+        # Too tall: keep the top of the frame, that is where the face is
+        new_height = round(width * MAX_PORTRAIT_RATIO)
+        return image.crop((0, 0, width, new_height))
+    if height < width * MIN_PORTRAIT_RATIO:
+        # Too wide: keep the center
+        new_width = round(height / MIN_PORTRAIT_RATIO)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    return image
+
+
+# Striped locks so two requests uploading the same photo do not both process it
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def _lock_for(name):
+    return _locks[int(name[:8], 16) % len(_locks)]
+
+
+def normalize_image(src_path, dest_dir, dpi=300, quality=85, src_digest=None):
+    """
+    Return the path of the normalized copy of src_path in dest_dir.
+
+    src_digest is the SHA-256 of src_path when the caller knows it. Falls
+    back to src_path when Pillow is missing or the image cannot be read,
+    pdflatex then embeds it as before.
+    """
+    if not HAS_PIL:
+        return src_path
+
+    name = normalized_name(src_path, dpi, quality, src_digest)
+    dest_path = os.path.join(dest_dir, name)
+    if os.path.exists(dest_path):
+        return dest_path
+
+    with _lock_for(name):
+        if os.path.exists(dest_path):
+            return dest_path
+
+        tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with Image.open(src_path) as image:
+                image = ImageOps.exif_transpose(image)
+                image = _crop(image)
+
+                width = target_width(dpi)
+                if image.width > width:
+                    image = image.resize(
+                        (width, round(image.height * width / image.width)), Image.LANCZOS
+                    )
+
+                if image.mode in ("RGBA", "LA", "P"):
+                    # JPEG has no alpha, flatten transparent images on white
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+
+                image.save(tmp_path, "JPEG", quality=quality, optimize=True)
+                os.replace(tmp_path, dest_path)
+        except Exception as e:
+            logger.warning(f"Could not normalize image {src_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return src_path
+
+    # src_path may be gone already, only the result is measured
+    logger.info(f"Normalized {src_path} to {dest_path} ({os.path.getsize(dest_path)} bytes)")
+    return dest_path
@@ -0,0 +1,114 @@
+"""
+
+ingest.py
+
+Description:
+Stores uploaded files in one pass. The upload stream is copied to disk in
+chunks while its SHA-256 is computed and its size and type are checked, so
+an oversized or mislabeled file is rejected as soon as it shows, and nothing
+has to read the file again to verify or hash it.
+
+Files are stored as <sha256>.<extension>: the same file uploaded twice maps
+to one blob, and the second upload only costs the copy of the stream. The
+digest is returned with the path, so callers can use it as the file's
+identity in cache keys (see render_cache.py) without hashing it again.
+
+The type check looks at the first bytes against the signatures of the
+extension; text formats must not contain NUL bytes and must be valid UTF-8.
+
+Usage:
+    upload = ingest(request.files["file"].stream, "instance/uploads", "json", max_bytes=1024 * 1024)
+    upload.path, upload.digest, upload.size, upload.duplicate
+
+"""
+
+import os
+import hashlib
+import threading
+import codecs
+from collections import namedtuple
+
+
+# Large enough for one read syscall per chunk, small enough to keep requests lean
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the binary formats, any of them is accepted
+SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+    "docx": (b"PK\x03\x04",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+}
+
+TEXT_EXTENSIONS = {"json", "txt"}
+
+Upload = namedtuple("Upload", ["path", "digest", "size", "duplicate"])
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is too large or its content does not match its extension"""
+
+
+def check_signature(extension, head):
+    signatures = SIGNATURES.get(extension)
+    if signatures and not head.startswith(signatures):
+        raise UploadRejected(f"File content is not a valid .{extension} file")
+
+
+def ingest(stream, folder, extension, max_bytes=None, chunk_size=CHUNK_SIZE):
+    """
+    Copy stream into folder as <sha256>.<extension> and return an Upload.
+
+    Raises UploadRejected, with nothing left on disk, once more than
+    max_bytes have been read or the content does not match the extension.
+    """
+    extension = extension.lower()
+    digest = hashlib.sha256()
+    size = 0
+    text_decoder = codecs.getincrementaldecoder("utf-8")() if extension in TEXT_EXTENSIONS else None
+
+    tmp_path = os.path.join(folder, f".ingest-{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            first = True
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                if first:
+                    check_signature(extension, chunk)
+                    first = False
+
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadRejected(f"File is larger than {max_bytes} bytes")
+
+                if text_decoder is not None:
+                    if b"\0" in chunk:
+                        raise UploadRejected(f"File content is not a valid .{extension} file")
+                    try:
+                        text_decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        raise UploadRejected("File is not UTF-8 encoded text")
+
+                digest.update(chunk)
+                f.write(chunk)
+
+        if first:
+            raise UploadRejected("File is empty")
+        if text_decoder is not None:
+            try:
+                text_decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                raise UploadRejected("File is not UTF-8 encoded text")
+
+        path = os.path.join(folder, f"{digest.hexdigest()}.{extension}")
+        duplicate = os.path.exists(path)
+        # Same name means same bytes, replacing a stored blob is harmless and
+        # cannot race with something removing it
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return Upload(path, digest.hexdigest(), size, duplicate)
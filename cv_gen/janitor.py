@@ -0,0 +1,253 @@
+"""
+
+janitor.py
+
+Description:
+Removes expired build artifacts (uploads, .tex files, PDFs, job records) in
+a background thread instead of scanning the folders on every request.
+
+Files are recorded in an expiry index, a small sqlite table ordered by expiry
+time, when they are created. A sweep only reads the rows that have expired,
+so its cost does not grow with the number of files kept. Each folder is
+scanned once, the first time the janitor sees it, to adopt files created
+before the index existed.
+
+Retention is set per folder; a retention of 0 keeps the folder's files.
+A folder can also name the files the janitor manages with a predicate on
+the file name; other files there, such as static assets, are never
+adopted or removed.
+Every process of the app may run a janitor thread, a lock file makes sure
+only one of them sweeps at a time. Reclaimed files and bytes are counted per
+folder in the index, so the numbers cover all processes.
+
+Usage:
+    janitor = Janitor("instance/janitor.sqlite", {"instance/uploads": 86400}, interval=300)
+    janitor = Janitor(index_path, {"instance/pdf_outputs": 604800}, managed={"instance/pdf_outputs": is_key_filename})
+    janitor.start()
+    janitor.track("instance/uploads/<id>_cv.json")
+    janitor.stats()
+
+"""
+
+import os
+import time
+import fcntl
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_expires_at ON artifacts (expires_at);
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    adopted_at REAL,
+    files_reclaimed INTEGER NOT NULL DEFAULT 0,
+    bytes_reclaimed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class Janitor:
+
+    def __init__(self, index_path, retention, interval=300, batch_size=500, managed=None):
+        # retention maps a folder to the seconds its files are kept, managed
+        # a folder to a predicate on file names, folders without one manage all files
+        self.index_path = index_path
+        self.retention = {os.path.abspath(folder): seconds for folder, seconds in retention.items()}
+        self.managed = {os.path.abspath(folder): predicate for folder, predicate in (managed or {}).items()}
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.last_sweep = None
+
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.index_path, timeout=10)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def folder_of(self, path):
+        folder = os.path.dirname(os.path.abspath(path))
+        return folder if folder in self.retention else None
+
+    def manages(self, folder, path):
+        predicate = self.managed.get(folder)
+        return predicate is None or predicate(os.path.basename(path))
+
+    def track(self, path, now=None):
+        """Record path for removal once its folder's retention has passed"""
+        folder = self.folder_of(path)
+        if folder is None or not self.retention[folder] or not self.manages(folder, path):
+            return
+        self.start()
+
+        expires_at = (now or time.time()) + self.retention[folder]
+        try:
+            with self._connect() as db:
+                # A file written again gets a new expiry
+                db.execute(
+                    "INSERT OR REPLACE INTO artifacts (path, folder, expires_at) VALUES (?, ?, ?)",
+                    (os.path.abspath(path), folder, expires_at),
+                )
+        except sqlite3.Error as e:
+            # Losing one entry only means the file is kept, never fail the request
+            logger.warning(f"Could not track {path} for cleanup: {e}")
+
+    def adopt(self):
+        """Index the files of folders the janitor has not seen before, once per folder"""
+        with self._connect() as db:
+            adopted = {row[0] for row in db.execute("SELECT folder FROM folders WHERE adopted_at IS NOT NULL")}
+
+        for folder, seconds in self.retention.items():
+            if folder in adopted or not seconds or not os.path.isdir(folder):
+                continue
+
+            rows = []
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False) and self.manages(folder, entry.path):
+                        rows.append((entry.path, folder, entry.stat().st_mtime + seconds))
+
+            with self._connect() as db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO artifacts (path, folder, expires_at) VALUES (?, ?, ?)", rows
+                )
+                db.execute(
+                    "INSERT INTO folders (folder, adopted_at) VALUES (?, ?) "
+                    "ON CONFLICT (folder) DO UPDATE SET adopted_at = excluded.adopted_at",
+                    (folder, time.time()),
+                )
+            logger.info(f"Janitor adopted {len(rows)} files in {folder}")
+
+    def sweep(self, now=None):
+        """Remove expired files, returns (files, bytes) reclaimed or None if another process is sweeping"""
+        now = now or time.time()
+        with open(f"{self.index_path}.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+
+            total_files = total_bytes = 0
+            while True:
+                with self._connect() as db:
+                    rows = db.execute(
+                        "SELECT path, folder FROM artifacts WHERE expires_at <= ? ORDER BY expires_at LIMIT ?",
+                        (now, self.batch_size),
+                    ).fetchall()
+                if not rows:
+                    break
+
+                reclaimed = {}
+                for path, folder in rows:
+                    # Indexed before the folder named its files, forget it and keep the file
+                    if not self.manages(folder, path):
+                        continue
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.warning(f"Janitor could not remove {path}: {e}")
+                        continue
+                    files, size_total = reclaimed.get(folder, (0, 0))
+                    reclaimed[folder] = (files + 1, size_total + size)
+
+                with self._connect() as db:
+                    db.executemany(
+                        "DELETE FROM artifacts WHERE path = ? AND expires_at <= ?",
+                        [(path, now) for path, _ in rows],
+                    )
+                    for folder, (files, size_total) in reclaimed.items():
+                        db.execute(
+                            "INSERT INTO folders (folder, files_reclaimed, bytes_reclaimed) VALUES (?, ?, ?) "
+                            "ON CONFLICT (folder) DO UPDATE SET "
+                            "files_reclaimed = files_reclaimed + excluded.files_reclaimed, "
+                            "bytes_reclaimed = bytes_reclaimed + excluded.bytes_reclaimed",
+                            (folder, files, size_total),
+                        )
+
+                total_files += sum(files for files, _ in reclaimed.values())
+                total_bytes += sum(size_total for _, size_total in reclaimed.values())
+                if len(rows) < self.batch_size:
+                    break
+
+        self.last_sweep = now
+        if total_files:
+            logger.info(f"Janitor removed {total_files} files ({total_bytes} bytes)")
+        return total_files, total_bytes
+
+    def start(self):
+        """Start the sweeping thread"""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Threads do not survive a fork, a forked worker starts its own
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            self.adopt()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Janitor could not index existing files: {e}")
+
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Janitor sweep failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        with self._connect() as db:
+            tracked = dict(db.execute("SELECT folder, COUNT(*) FROM artifacts GROUP BY folder").fetchall())
+            reclaimed = {
+                folder: (files, size_total)
+                for folder, files, size_total in db.execute(
+                    "SELECT folder, files_reclaimed, bytes_reclaimed FROM folders"
+                )
+            }
+            next_expiry = db.execute("SELECT MIN(expires_at) FROM artifacts").fetchone()[0]
+
+        return {
+            "interval": self.interval,
+            "last_sweep": self.last_sweep,
+            "next_expiry": next_expiry,
+            "folders": {
+                os.path.relpath(folder): {
+                    "retention_seconds": seconds,
+                    "tracked": tracked.get(folder, 0),
+                    "files_reclaimed": reclaimed.get(folder, (0, 0))[0],
+                    "bytes_reclaimed": reclaimed.get(folder, (0, 0))[1],
+                }
+                for folder, seconds in self.retention.items()
+            },
+        }
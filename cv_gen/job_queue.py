@@ -0,0 +1,270 @@
+"""
+
+job_queue.py
+
+Description:
+Runs slow work such as CV builds outside the request. A job is a registered
+function name plus a JSON-serializable payload; submit() returns the job id
+right away and the job's state (queued, running, done or failed) is kept in
+a JobStore, one small JSON file per job, so every web worker of the app can
+answer a status request.
+
+Job functions are called as function(payload, progress); progress(stage,
+**data) reports an intermediate stage. With an event bus (see events.py) the
+queue publishes every stage on the job's channel, from queued through
+running and the function's own stages to done or failed.
+
+Backends:
+    eager   runs the job inside submit(), for tests and single-user setups
+    thread  runs jobs on a thread pool inside the web process
+    celery  sends jobs to Celery workers, needs CELERY_BROKER_URL and a
+            result backend when the workers do not share the job folder
+
+Usage:
+    job_queue = JobQueue(JobStore("instance/jobs"), backend="thread", workers=4, app=app, events=bus)
+    job_queue.register("build_cv", build_job)
+    job_id = job_queue.submit("build_cv", {"cv_data": {...}})
+    job_queue.status(job_id)    # {"id": ..., "status": "done", "result": {...}, "error": None}
+
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+BACKENDS = ("eager", "thread", "celery")
+
+# Celery task states mapped to job states
+CELERY_STATES = {
+    "PENDING": QUEUED,
+    "RECEIVED": QUEUED,
+    "RETRY": QUEUED,
+    "STARTED": RUNNING,
+    "SUCCESS": DONE,
+    "FAILURE": FAILED,
+    "REVOKED": FAILED,
+}
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobStore:
+    """Job records as JSON files in a folder shared by the app's processes"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, job_id):
+        if not _JOB_ID.match(job_id or ""):
+            return None
+        return os.path.join(self.folder, f"{job_id}.json")
+
+    def get(self, job_id):
+        path = self.path(job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, record):
+        path = self.path(record["id"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        # Readers never see a half written record
+        os.replace(tmp_path, path)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self.get(job_id) or {"id": job_id}
+            record.update(fields, updated_at=time.time())
+            self.put(record)
+            return record
+
+
+class JobQueue:
+
+    def __init__(self, store, backend="thread", workers=None, celery=None, app=None, events=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown job backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        if backend == "celery" and celery is None:
+            raise ValueError("The celery job backend needs a Celery app")
+
+        self.store = store
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.celery = celery
+        # Jobs run inside an app context so they can use current_app
+        self.app = app
+        # Optional event bus the job stages are published on
+        self.events = events
+
+        self._functions = {}
+        self._tasks = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def register(self, name, function):
+        """Make function(payload, progress) available to submit() as name"""
+        self._functions[name] = function
+        if self.backend == "celery":
+            self._tasks[name] = self._celery_task(name)
+
+    def _celery_task(self, name):
+        @self.celery.task(name=f"jobs.{name}")
+        def task(job_id, payload):
+            return self.run(job_id, name, payload)
+
+        return task
+
+    def _get_executor(self):
+        # Threads are started on first use so the queue survives a gunicorn
+        # --preload fork, like the compile pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="job-worker"
+                )
+            return self._executor
+
+    def submit(self, name, payload, **meta):
+        """
+        Queue function name with payload and return the job id.
+
+        meta is stored with the job record and returned by status(). With the
+        eager backend the job has finished when submit() returns.
+        """
+        if name not in self._functions:
+            raise KeyError(f"No job registered as '{name}'")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.store.put({
+            "id": job_id,
+            "name": name,
+            "status": QUEUED,
+            "meta": meta,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        self.publish(job_id, QUEUED, created_at=now)
+
+        if self.backend == "eager":
+            self.run(job_id, name, payload)
+        elif self.backend == "thread":
+            with self._lock:
+                self._pending += 1
+            self._get_executor().submit(self._run_pending, job_id, name, payload)
+        else:
+            self._tasks[name].apply_async(args=(job_id, payload), task_id=job_id)
+
+        return job_id
+
+    def _run_pending(self, job_id, name, payload):
+        try:
+            return self.run(job_id, name, payload)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def publish(self, job_id, stage, **data):
+        """Publish a stage of a job on the event bus, if there is one"""
+        if self.events is None:
+            return
+        try:
+            self.events.publish(job_id, dict(data, stage=stage, at=time.time()))
+        except Exception as e:
+            # Progress reporting must never fail the build
+            logger.warning(f"Could not publish {stage} event for job {job_id}: {e}")
+
+    def run(self, job_id, name, payload):
+        """Run a job and record its outcome, called by the backends"""
+        started_at = time.monotonic()
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+        self.publish(job_id, RUNNING)
+
+        def progress(stage, **data):
+            self.publish(job_id, stage, elapsed=time.monotonic() - started_at, **data)
+
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    result = self._functions[name](payload, progress)
+            else:
+                result = self._functions[name](payload, progress)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({name}) failed: {e}", exc_info=True)
+            record = self.store.update(job_id, status=FAILED, error=str(e))
+            self.publish(job_id, FAILED, elapsed=time.monotonic() - started_at, error=str(e))
+            return record
+
+        record = self.store.update(job_id, status=DONE, result=result)
+        self.publish(job_id, DONE, elapsed=time.monotonic() - started_at, result=result)
+        return record
+
+    def status(self, job_id):
+        """The job's record, or None for an unknown job id"""
+        record = self.store.get(job_id)
+        if self.backend != "celery" or (record is not None and record["status"] in FINISHED):
+            return record
+        if record is None and not _JOB_ID.match(job_id or ""):
+            return None
+
+        # The worker may not share the job folder, ask the result backend
+        async_result = self.celery.AsyncResult(job_id)
+        status = CELERY_STATES.get(async_result.state, QUEUED)
+        if record is None:
+            if async_result.state == "PENDING":
+                # Celery reports unknown task ids as pending
+                return None
+            record = {"id": job_id, "meta": {}, "result": None, "error": None}
+
+        if status == DONE and isinstance(async_result.result, dict):
+            return dict(record, **async_result.result)
+        if status == FAILED:
+            return dict(record, status=FAILED, error=str(async_result.result))
+        if status == QUEUED and record.get("status") == RUNNING:
+            # STARTED is only reported with task_track_started
+            status = RUNNING
+        return dict(record, status=status)
+
+    def wait(self, job_id, timeout=None, interval=0.1):
+        """Block until the job has finished or timeout passes, returns its record"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            record = self.status(job_id)
+            if record is None or record["status"] in FINISHED:
+                return record
+            if deadline is not None and time.monotonic() >= deadline:
+                return record
+            time.sleep(interval)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "pending": self._pending if self.backend == "thread" else None,
+        }
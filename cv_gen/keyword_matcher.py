@@ -0,0 +1,114 @@
+"""
+
+keyword_matcher.py
+
+Description:
+Finds every keyword of a fixed list in a text with one scan. The keywords
+are merged into a trie and rendered as a single regex, so keywords sharing a
+prefix ("React", "React Native") share its states, and each position of the
+text is tried once instead of once per keyword.
+
+A keyword matches like re.search(r'\\b' + re.escape(keyword.lower()) + r'\\b',
+text.lower()) does: case-insensitively, with a word boundary on both sides.
+At a given position the regex finds the longest keyword; the shorter
+keywords that are prefixes of it are then checked for their own trailing
+boundary, so overlapping keywords are all reported.
+
+Offsets index text.lower(), which is as long as text unless the text holds
+one of the few characters whose lowercase form is longer.
+
+Usage:
+    matcher = matcher_for(["Python", "React", "React Native", "C++"])
+    matcher.found(text)                     # {"React", "React Native"}
+    for hit in matcher.finditer(text):
+        hit.keyword, hit.start, hit.end
+
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+Hit = namedtuple("Hit", ["keyword", "start", "end"])
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _is_boundary(text, index):
+    """Same test as \\b at index in text"""
+    before = index > 0 and _WORD_CHAR.match(text[index - 1]) is not None
+    after = index < len(text) and _WORD_CHAR.match(text[index]) is not None
+    return before != after
+
+
+def _trie_pattern(node):
+    """Regex for the keywords below node; greedy, so longer keywords are tried first"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # A keyword ends here, the rest is optional
+        pattern = "(?:" + pattern + ")?" if len(branches) == 1 else pattern + "?"
+    return pattern
+
+
+class KeywordMatcher:
+
+    def __init__(self, keywords):
+        # Keywords are compared lowercased, one lowercase form may stand for several keywords
+        self.keywords = {}
+        for keyword in keywords:
+            if keyword:
+                self.keywords.setdefault(keyword.lower(), []).append(keyword)
+
+        trie = {}
+        for lowered in self.keywords:
+            node = trie
+            for char in lowered:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        # The keywords that are also a prefix of a longer one, checked after it matched
+        self._prefixes = {
+            lowered: sorted(
+                (other for other in self.keywords if other != lowered and lowered.startswith(other)),
+                key=len,
+            )
+            for lowered in self.keywords
+        }
+
+        # Zero-width, so the scan moves one character at a time and keywords
+        # starting inside another one are still found
+        self.pattern = re.compile(r"\b(?=(" + _trie_pattern(trie) + r")\b)") if self.keywords else None
+
+    def finditer(self, text):
+        """Yield a Hit for each occurrence of each keyword, by start offset then length"""
+        if self.pattern is None:
+            return
+        lowered_text = text.lower()
+        for match in self.pattern.finditer(lowered_text):
+            start = match.start()
+            longest = match.group(1)
+            for lowered in self._prefixes[longest]:
+                end = start + len(lowered)
+                if _is_boundary(lowered_text, end):
+                    for keyword in self.keywords[lowered]:
+                        yield Hit(keyword, start, end)
+            for keyword in self.keywords[longest]:
+                yield Hit(keyword, start, start + len(longest))
+
+    def found(self, text):
+        """Set of the keywords present in text"""
+        return {hit.keyword for hit in self.finditer(text)}
+
+
+@lru_cache(maxsize=32)
+def _matcher_for(keywords):
+    return KeywordMatcher(keywords)
+
+
+def matcher_for(keywords):
+    """Shared KeywordMatcher for a keyword list, compiled once per process"""
+    return _matcher_for(tuple(keywords))
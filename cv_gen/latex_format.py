@@ -0,0 +1,168 @@
+"""
+
+latex_format.py
+
+Description:
+Precompiles the static part of the Generator preamble into a pdflatex format
+(.fmt) using the mylatexformat package, so each CV build skips loading the
+~30 packages of the header.
+
+The preamble is split by the ``\\csname endofdump\\endcsname`` marker emitted by
+``Generator.add_header()``: everything before it is dumped into the format,
+everything after it is read on every run. The format name is derived from a
+hash of the dumped part and the TeX installation, so a changed header or an
+upgraded TeX distribution triggers a rebuild automatically.
+
+Usage:
+    fmt = ensure_format(cv_generator.add_header(), "instance/latex_formats")
+    compile_latex(tex_path, output_dir, fmt=fmt)
+
+"""
+
+import os
+import re
+import uuid
+import hashlib
+import logging
+import threading
+import subprocess
+from functools import lru_cache
+
+
+FORMAT_MARKER = r"\csname endofdump\endcsname"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_known_formats = {}
+_failed_formats = set()
+
+
+def split_preamble(header):
+    """Return the part of the header that can be dumped into a format, or None"""
+    if FORMAT_MARKER not in header:
+        return None
+    return header.split(FORMAT_MARKER, 1)[0]
+
+
+@lru_cache(maxsize=None)
+def tex_version(pdflatex):
+    """Identify the TeX installation behind the given pdflatex binary"""
+    try:
+        result = subprocess.run(
+            [pdflatex, "--version"], capture_output=True, text=True, timeout=10
+        )
+        return result.stdout.splitlines()[0] if result.stdout else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def format_name(header, pdflatex, template=None):
+    """Name of the format for the given header and TeX installation"""
+    digest = hashlib.sha256()
+    digest.update(split_preamble(header).encode("utf-8"))
+    digest.update(tex_version(pdflatex).encode("utf-8"))
+    prefix = re.sub(r"[^A-Za-z0-9_]", "", str(template or "")) or "default"
+    return f"{prefix}-{digest.hexdigest()[:16]}"
+
+
+def ensure_format(header, format_dir, pdflatex="/usr/bin/pdflatex", template=None, timeout=120):
+    """
+    Build the precompiled format for the header if it does not exist yet.
+
+    Returns the format path to pass as ``-fmt`` (without the .fmt extension),
+    or None if the header has no dump marker or the format could not be built,
+    in which case the caller should compile without a format.
+    """
+    if split_preamble(header) is None:
+        return None
+
+    name = format_name(header, pdflatex, template)
+    fmt_base = os.path.abspath(os.path.join(format_dir, name))
+
+    if name in _failed_formats:
+        return None
+    if name in _known_formats and os.path.exists(fmt_base + ".fmt"):
+        return fmt_base
+
+    with _lock:
+        if os.path.exists(fmt_base + ".fmt"):
+            _known_formats[name] = fmt_base
+            return fmt_base
+
+        if _build_format(header, format_dir, name, pdflatex, timeout):
+            _known_formats[name] = fmt_base
+            _remove_stale_formats(format_dir, name)
+            return fmt_base
+
+        _failed_formats.add(name)
+        return None
+
+
+def _build_format(header, format_dir, name, pdflatex, timeout):
+    """Dump the preamble into <name>.fmt with pdflatex -ini"""
+    os.makedirs(format_dir, exist_ok=True)
+
+    # Build under a unique job name and rename at the end, so concurrent
+    # processes building the same format never see a half written file
+    job_name = f"{name}-{uuid.uuid4().hex[:8]}"
+    source_path = os.path.join(format_dir, f"{job_name}.tex")
+
+    with open(source_path, "w") as source_file:
+        source_file.write(header)
+        source_file.write("\n\\end{document}\n")
+
+    logger.info(f"Building precompiled LaTeX format {name}")
+
+    try:
+        result = subprocess.run(
+            [
+                pdflatex,
+                "-ini",
+                "-interaction=nonstopmode",
+                f"-jobname={job_name}",
+                "&pdflatex",
+                "mylatexformat.ltx",
+                f"{job_name}.tex",
+            ],
+            cwd=format_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        built_path = os.path.join(format_dir, f"{job_name}.fmt")
+
+        if result.returncode != 0 or not os.path.exists(built_path):
+            logger.warning(f"Building LaTeX format {name} failed: {result.stdout[-2000:]}")
+            return False
+
+        os.replace(built_path, os.path.join(format_dir, f"{name}.fmt"))
+        logger.info(f"Precompiled LaTeX format {name} is ready")
+        return True
+
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Building LaTeX format {name} failed: {str(e)}")
+        return False
+
+    finally:
+        for ext in ["tex", "log", "fmt"]:
+            leftover = os.path.join(format_dir, f"{job_name}.{ext}")
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _remove_stale_formats(format_dir, name):
+    """Remove formats built from older versions of the same template header"""
+    prefix = name.rsplit("-", 1)[0] + "-"
+    for filename in os.listdir(format_dir):
+        # In-progress builds carry an extra job suffix and are left alone
+        if (
+            filename.startswith(prefix)
+            and filename.endswith(".fmt")
+            and len(filename) == len(name) + 4
+            and filename != f"{name}.fmt"
+        ):
+            try:
+                os.remove(os.path.join(format_dir, filename))
+            except OSError:
+                pass
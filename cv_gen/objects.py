@@ -1,65 +1,161 @@
+"""
 
+objects.py
+
+Description:
+Intermediate representation of a CV. The Generator builds the document tree
+once from the CV data and renderers turn it into output: renderers.py has the
+LaTeX renderer used for PDFs and an HTML renderer for the dashboard preview.
+
+Every node's decode(renderer) calls the renderer method named after the node,
+e.g. Section.decode(renderer) returns renderer.render_section(section), so a
+new output format is a new renderer class and no change here.
+
+Usage:
+    document = Generator(cv_data).build_document()
+    html = document.decode(HtmlRenderer())
+
+"""
 
 
 class CvObject:
 
-    def __init__(self , children):
-        self.children = []
+    def __init__(self, children=None):
+        self.children = children or []
+
+    def decode(self, renderer):
+        return getattr(renderer, f"render_{self.node_name()}")(self)
+
+    @classmethod
+    def node_name(cls):
+        # Section -> section, ListItem -> list_item
+        name = cls.__name__
+        return "".join(f"_{c.lower()}" if c.isupper() and i else c.lower() for i, c in enumerate(name))
 
-    def decode(self):
-        for child in self.children :
-            child.decode()
+    def __repr__(self):
+        return f"{type(self).__name__}({self.children!r})"
 
-class MultiChildCvObject (CvObject):
-    
-    def __init__(self , children):
+
+class MultiChildCvObject(CvObject):
+
+    def __init__(self, children):
         self.children = children
-    def decode(self):
-        for child in self.children :
-            child.decode()
-    
-class SingleChildCvObject (CvObject):
-    
-    def __init__(self , child):
+
+
+class SingleChildCvObject(CvObject):
+
+    def __init__(self, child):
         self.child = child
+        self.children = [child]
+
+
+class Document(MultiChildCvObject):
+    pass
+
+
+class Header(CvObject):
+    """Personal info shown at the top of the CV"""
+
+    def __init__(self, info, image_path=None):
+        super().__init__([Image(image_path)] if image_path else [])
+        self.info = info
+        self.image_path = image_path
+
+    def __repr__(self):
+        return f"Header({self.info!r}, image_path={self.image_path!r})"
 
-    def decode(self):
-        self.child.decode()
 
 class Section(MultiChildCvObject):
+    """
+    A top level CV section.
 
-    title = ""
-    children = []
-    
-    def __init__(self, title, children):
+    name is the section key in the CV data and data the raw content for that
+    key, which the fragment cache keys the rendered section on. Pass build
+    instead of children to construct the children lazily.
+    """
+
+    def __init__(self, name, title, children=None, data=None, build=None):
+        self.name = name
         self.title = title
-        self.children = children
-    
-    def decode(self):
+        self.data = data
+        self._children = children
+        self._build = build
+
+    @property
+    def children(self):
+        # Children are built on first use, a section the fragment cache
+        # already holds never needs them
+        if self._children is None:
+            self._children = self._build() if self._build else []
+        return self._children
+
+    def __repr__(self):
+        return f"Section({self.name!r}, {self.title!r})"
 
-        for child in self.children :
-            child.decode()
 
 class SubSection(MultiChildCvObject):
 
-    title = ""
-    children = []
-    
     def __init__(self, title, children):
         self.title = title
         self.children = children
 
-class Paragraph(SingleChildCvObject):
+
+class Entry(MultiChildCvObject):
+    """One dated item of a section, e.g. a job or a degree"""
+
+    def __init__(self, title, subtitle=None, dates=None, link=None, children=None):
+        self.title = title
+        self.subtitle = subtitle
+        self.dates = dates
+        self.link = link
+        self.children = children or []
+
+    def __repr__(self):
+        return f"Entry({self.title!r}, {self.subtitle!r}, {self.dates!r}, {self.children!r})"
+
+
+class Text(CvObject):
+
+    def __init__(self, text, bold=False):
+        super().__init__()
+        self.text = text
+        self.bold = bold
+
+    def __repr__(self):
+        return f"Text({self.text!r})"
+
+
+class Paragraph(MultiChildCvObject):
     pass
 
-class ListItem(SingleChildCvObject):
+
+class ListItem(MultiChildCvObject):
     pass
 
+
 class List(MultiChildCvObject):
-    pass
 
-class Link(SingleChildCvObject):
-    pass
+    def __init__(self, children, columns=1):
+        self.children = children
+        self.columns = columns
 
-class Image(SingleChildCvObject):
-    pass
+
+class Link(CvObject):
+
+    def __init__(self, url, text=None):
+        super().__init__()
+        self.url = url
+        self.text = text or url
+
+    def __repr__(self):
+        return f"Link({self.url!r}, {self.text!r})"
+
+
+class Image(CvObject):
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def __repr__(self):
+        return f"Image({self.path!r})"
@@ -0,0 +1,138 @@
+"""
+
+prefetch.py
+
+Description:
+Runs deferred work while the host has nothing else to do. With lazy
+compilation a saved CV only gets its PDF when someone opens it; the
+prefetcher builds those PDFs ahead of time, one at a time, whenever
+is_idle() reports that no build is pending or running, so prefetching never
+competes with a build somebody is waiting for.
+
+Items are kept in memory in the order they were added, keyed so an item
+added twice is only run once and can be dropped when it is built some other
+way. The function registered with register(function) is called as
+function(key, item) inside the app context; returning False means "not now"
+and puts the item back at the front to be retried on the next round.
+
+Usage:
+    prefetcher = Prefetcher(is_idle=lambda: admission.pending() == 0, app=app)
+    prefetcher.register(prefetch_pdf)
+    prefetcher.add(pdf_filename, payload)
+    prefetcher.discard(pdf_filename)
+
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+
+    def __init__(self, is_idle, app=None, interval=5, max_items=1000):
+        self.is_idle = is_idle
+        # Items run inside an app context so they can use current_app
+        self.app = app
+        self.interval = interval
+        self.max_items = max_items
+        self.function = None
+
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+        self.prefetched = 0
+        self.dropped = 0
+
+    def register(self, function):
+        """Set the function(key, item) that runs an item"""
+        self.function = function
+
+    def add(self, key, item):
+        """Queue item under key, the oldest item is dropped when the queue is full"""
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.dropped += 1
+        self.start()
+        self._wake.set()
+
+    def discard(self, key):
+        """Forget key, it was built another way"""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def start(self):
+        with self._lock:
+            if self._stopped or (self._thread is not None and self._pid == os.getpid()):
+                return
+            # Threads do not survive a fork, a forked worker starts its own
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="prefetcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def _next(self):
+        with self._lock:
+            if not self._items:
+                return None
+            return self._items.popitem(last=False)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.run_idle()
+            except Exception as e:
+                logger.error(f"Prefetch round failed: {e}", exc_info=True)
+
+    def run_idle(self):
+        """Run queued items for as long as the host stays idle, returns how many ran"""
+        ran = 0
+        while self.function is not None and self.is_idle():
+            entry = self._next()
+            if entry is None:
+                break
+            key, item = entry
+
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        done = self.function(key, item)
+                else:
+                    done = self.function(key, item)
+            except Exception as e:
+                logger.warning(f"Prefetch of {key} failed: {e}")
+                continue
+
+            if done is False:
+                with self._lock:
+                    self._items[key] = item
+                    self._items.move_to_end(key, last=False)
+                break
+            ran += 1
+            self.prefetched += 1
+        return ran
+
+    def stats(self):
+        with self._lock:
+            queued = len(self._items)
+        return {
+            "queued": queued,
+            "prefetched": self.prefetched,
+            "dropped": self.dropped,
+            "interval": self.interval,
+        }
@@ -0,0 +1,219 @@
+"""
+
+render_cache.py
+
+Description:
+Content-addressed cache of compiled CV PDFs. The key is a hash of the
+normalized CV data, the template, the generator version and the digest of
+the profile image, so uploading the same JSON twice or saving an unchanged CV
+returns the PDF that was already built instead of running the Generator and
+pdflatex again.
+
+Cached PDFs live in their own folder and are hard linked (or copied when the
+folders are on different filesystems) into the output folder on a hit, so
+evicting a cache entry never removes a PDF that is already being served.
+The cache is bounded by total size and evicts the least recently used files.
+
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from cv_gen.generator import GENERATOR_VERSION
+
+
+logger = logging.getLogger(__name__)
+
+# A PDF named after its key, which restore and rebuild can bring back
+_KEY_FILENAME = re.compile(r"^[0-9a-f]{64}\.pdf$")
+
+_digest_lock = threading.Lock()
+_file_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, memoized by path, size and mtime"""
+    if not path or not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _file_digests:
+            return _file_digests[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    with _digest_lock:
+        _file_digests[memo_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def remember_digest(path, digest):
+    """Record the SHA-256 of a file whose content was hashed as it was written"""
+    stat = os.stat(path)
+    with _digest_lock:
+        _file_digests[(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)] = digest
+
+
+def normalize_cv_data(cv_data):
+    """Canonical JSON of the CV data, without the image path (its digest is keyed separately)"""
+    data = dict(cv_data)
+    if isinstance(data.get("personal_info"), dict):
+        data["personal_info"] = {
+            key: value for key, value in data["personal_info"].items() if key != "image"
+        }
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def make_key(cv_data, template=None, image_path=None, image_digest=None):
+    """
+    Cache key for a CV build.
+
+    The image is identified by its content: pass image_digest when it is
+    already known, otherwise image_path (or the image in cv_data) is hashed.
+    """
+    if image_digest is None:
+        if image_path is None and isinstance(cv_data.get("personal_info"), dict):
+            image_path = cv_data["personal_info"].get("image")
+        image_digest = file_digest(image_path)
+
+    key = hashlib.sha256()
+    for part in [normalize_cv_data(cv_data), str(template or ""), GENERATOR_VERSION, image_digest or ""]:
+        key.update(part.encode("utf-8"))
+        key.update(b"\0")
+    return key.hexdigest()
+
+
+def is_key_filename(filename):
+    """True for <key>.pdf names, the PDFs that can be restored from the cache"""
+    return _KEY_FILENAME.match(filename) is not None
+
+
+class RenderCache:
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU index from the cache folder, oldest access first"""
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".pdf"):
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+                entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key, dest_path):
+        """
+        Materialize the cached PDF for key at dest_path.
+
+        Returns True on a hit. dest_path already existing counts as a hit.
+        """
+        if os.path.exists(dest_path):
+            with self._lock:
+                self.hits += 1
+            return True
+
+        cached_path = self._path(key)
+        try:
+            _link_or_copy(cached_path, dest_path)
+            # Touch the entry so the LRU order survives restarts
+            os.utime(cached_path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+            return False
+
+        with self._lock:
+            self.hits += 1
+            if key not in self._entries:
+                # Added by another process
+                self._entries[key] = os.path.getsize(cached_path)
+                self._total_bytes += self._entries[key]
+            self._entries.move_to_end(key)
+        return True
+
+    def put(self, key, pdf_path):
+        """Add a freshly compiled PDF to the cache and evict to stay within max_bytes"""
+        if not os.path.exists(pdf_path):
+            return
+
+        cached_path = self._path(key)
+        if not os.path.exists(cached_path):
+            tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            _link_or_copy(pdf_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+
+        size = os.path.getsize(cached_path)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._total_bytes += size
+            evicted = self._evict()
+
+        for evicted_key in evicted:
+            try:
+                os.remove(self._path(evicted_key))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            evicted.append(key)
+        if evicted:
+            logger.info(f"Render cache evicted {len(evicted)} PDFs")
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        shutil.copyfile(src, dst)
@@ -0,0 +1,261 @@
+"""
+
+renderers.py
+
+Description:
+Renderers for the CV document tree in objects.py. LatexRenderer produces the
+LaTeX that is compiled into the PDF, using the Generator's template registry
+and fragment cache. HtmlRenderer produces a standalone HTML page for the
+dashboard's live preview, which takes milliseconds instead of a pdflatex run.
+Both walk the same nodes, so the preview shows what the PDF will.
+
+Usage:
+    document = cv_generator.build_document()
+    latex = document.decode(LatexRenderer(cv_generator))
+    html = document.decode(HtmlRenderer(template="modern"))
+
+"""
+
+import html
+from urllib.parse import urlsplit
+
+from cv_gen.template_registry import escape_hash
+
+
+class Renderer:
+
+    def iter_document(self, document):
+        for child in document.children:
+            yield child.decode(self)
+
+    def render_document(self, document):
+        return "".join(self.iter_document(document))
+
+    def render_children(self, node):
+        return "".join(child.decode(self) for child in node.children)
+
+
+class LatexRenderer(Renderer):
+    """
+    Renders the LaTeX compiled into the PDF.
+
+    The preamble, the personal info and the closing come from the Generator's
+    template, sections are rendered node by node here, with the environments
+    the template's preamble defines. Rendered sections go through the
+    Generator's fragment cache.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def iter_document(self, document):
+        yield self.generator.add_header()
+        yield from super().iter_document(document)
+        yield self.generator.add_footer()
+
+    def render_header(self, header):
+        return self.generator.render_section(
+            "personal_info",
+            [header.info, header.image_path],
+            lambda: self.generator.render(
+                "personal_info", image_path=header.image_path, info=header.info
+            ),
+        )
+
+    def render_section(self, section):
+        return self.generator.render_section(
+            section.name,
+            section.data,
+            lambda: (
+                f"\n\\section{{{escape_hash(section.title)}}}\n\\vspace{{\\MainHeaderSpace}}\n"
+                + self.render_children(section)
+                + "\\vspace{\\mainsectionsspace}\n"
+            ),
+        )
+
+    def render_sub_section(self, sub_section):
+        return f"\\subsection{{{escape_hash(sub_section.title)}}}\n" + self.render_children(sub_section)
+
+    def render_entry(self, entry):
+        heading = f"\\textbf{{{escape_hash(entry.title or '')}}}"
+        if entry.subtitle:
+            heading += f", {escape_hash(entry.subtitle)}"
+
+        meta = escape_hash(entry.dates) if entry.dates else ""
+        if entry.link is not None:
+            meta = entry.link.decode(self)
+
+        latex = f"\\begin{{twocolentry}}{{\n    {meta}\n}}\n    {heading}\n\\end{{twocolentry}}\n"
+        if entry.children:
+            latex += (
+                "\\vspace{\\SecHeaderSpace}\n\\begin{onecolentry}\n"
+                + self.render_children(entry)
+                + "\\end{onecolentry}\n"
+            )
+        return latex + "\\vspace{\\SecAfterHeaderSpace}\n"
+
+    def render_paragraph(self, paragraph):
+        return f"\\begin{{onecolentry}}\n{self.render_children(paragraph)}\n\\end{{onecolentry}}\n"
+
+    def render_list(self, node):
+        if node.columns > 1:
+            return (
+                f"{{\\normalsize\n\\begin{{multicols}}{{{int(node.columns)}}}\n"
+                "\\begin{itemize}[leftmargin=*, labelsep=0.1cm, topsep=0pt]\n"
+                + self.render_children(node)
+                + "\\end{itemize}\n\\end{multicols}\n}\n"
+            )
+        return "\\begin{highlights}\n" + self.render_children(node) + "\\end{highlights}\n"
+
+    def render_list_item(self, item):
+        return f"    \\item {self.render_children(item)}\n"
+
+    def render_text(self, text):
+        escaped = escape_hash(text.text)
+        return f"\\textbf{{{escaped}}}" if text.bold else escaped
+
+    def render_link(self, link):
+        return f"\\href{{{link.url}}}{{{escape_hash(link.text)}}}"
+
+    def render_image(self, image):
+        return f"\\includegraphics[width=3.3cm]{{{image.path}}}"
+
+
+# Only these link targets are rendered as links in the preview: absolute URLs
+# with one of these schemes, or paths on this site
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
+
+
+def is_safe_url(url):
+    url = str(url or "").strip()
+    if not url:
+        return False
+    parsed = urlsplit(url)
+    if parsed.scheme:
+        return parsed.scheme.lower() in SAFE_URL_SCHEMES
+    # "//host/..." is protocol-relative and leaves the site
+    return url.startswith("/") and not url.startswith("//") and not parsed.netloc and "\\" not in url
+
+HTML_STYLE = """
+body { margin: 0; background: #f4f4f4; }
+.cv { box-sizing: border-box; max-width: 816px; min-height: 1056px; margin: 16px auto; padding: 2cm;
+      background: #fff; color: #000; font: 10pt/1.4 Charter, "Bitstream Charter", Georgia, serif; }
+.cv a { color: inherit; }
+.cv-header { display: flex; align-items: center; gap: 24px; margin-bottom: 0.3cm; }
+.cv-header img { width: 3.3cm; }
+.cv-header h1 { margin: 0 0 6px; font-size: 25pt; font-weight: normal; }
+.cv-contact { margin: 0; padding: 0; list-style: none; }
+.cv-contact li { display: inline; }
+.cv-contact li + li:before { content: " | "; }
+.cv-section h2 { margin: 0.3cm 0 0.25cm; font-size: 12pt; border-bottom: 1px solid #000; }
+.cv-entry { margin-bottom: 0.25cm; }
+.cv-entry-head { display: flex; justify-content: space-between; gap: 16px; }
+.cv-entry-meta { white-space: nowrap; }
+.cv-list { margin: 0.1cm 0; padding-left: 10pt; }
+.cv p { margin: 0.1cm 0; }
+.cv-template-modern { font-family: "Helvetica Neue", Arial, sans-serif; }
+.cv-template-modern .cv-section h2 { color: rgb(0, 79, 144); border-color: rgb(0, 79, 144); }
+.cv-template-modern a { color: rgb(0, 79, 144); }
+.cv-template-minimalist .cv-section h2 { font-variant: small-caps; font-weight: normal; border: none; }
+"""
+
+
+class HtmlRenderer(Renderer):
+    """
+    Renders a standalone HTML page.
+
+    image_url maps the profile image path from the CV data to a URL the
+    browser can load, return None to leave the image out.
+    """
+
+    def __init__(self, template=None, image_url=None, title="CV Preview"):
+        self.template = template
+        self.image_url = image_url or (lambda path: path)
+        self.title = title
+
+    def iter_document(self, document):
+        yield (
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{html.escape(self.title)}</title>\n<style>{HTML_STYLE}</style>\n"
+            f'</head>\n<body>\n<main class="cv cv-template-{html.escape(self.template or "professional")}">\n'
+        )
+        yield from super().iter_document(document)
+        yield "</main>\n</body>\n</html>\n"
+
+    def render_header(self, header):
+        info = header.info or {}
+        contact = [
+            html.escape(info.get("location", "")),
+            self._link(f"mailto:{info.get('email', '')}", info.get("email", "")),
+            self._link(f"tel:{info.get('phone', '')}", info.get("phone", "")),
+            self._link(info.get("linkedin", ""), "LinkedIn"),
+            self._link(info.get("github", ""), "Github"),
+        ]
+        items = "".join(f"<li>{item}</li>" for item in contact if item)
+        return (
+            '<header class="cv-header">'
+            + self.render_children(header)
+            + f"<div><h1>{html.escape(info.get('name', ''))}</h1>"
+            + f'<ul class="cv-contact">{items}</ul></div>'
+            + "</header>\n"
+        )
+
+    def render_section(self, section):
+        title = f"<h2>{html.escape(section.title)}</h2>" if section.title else ""
+        return (
+            f'<section class="cv-section cv-section-{html.escape(section.name)}">'
+            + title
+            + self.render_children(section)
+            + "</section>\n"
+        )
+
+    def render_sub_section(self, sub_section):
+        return f"<h3>{html.escape(sub_section.title)}</h3>" + self.render_children(sub_section)
+
+    def render_entry(self, entry):
+        heading = f"<strong>{html.escape(entry.title or '')}</strong>"
+        if entry.subtitle:
+            heading += f", {html.escape(entry.subtitle)}"
+
+        meta = html.escape(entry.dates) if entry.dates else ""
+        if entry.link is not None:
+            meta = entry.link.decode(self)
+
+        return (
+            '<div class="cv-entry"><div class="cv-entry-head">'
+            + f'<span class="cv-entry-title">{heading}</span>'
+            + f'<span class="cv-entry-meta">{meta}</span>'
+            + "</div>"
+            + self.render_children(entry)
+            + "</div>\n"
+        )
+
+    def render_paragraph(self, paragraph):
+        return f"<p>{self.render_children(paragraph)}</p>"
+
+    def render_list(self, node):
+        style = f' style="columns: {int(node.columns)}"' if node.columns > 1 else ""
+        return f'<ul class="cv-list"{style}>{self.render_children(node)}</ul>'
+
+    def render_list_item(self, item):
+        return f"<li>{self.render_children(item)}</li>"
+
+    def render_text(self, text):
+        escaped = html.escape(str(text.text))
+        return f"<strong>{escaped}</strong>" if text.bold else escaped
+
+    def render_link(self, link):
+        return self._link(link.url, link.text)
+
+    def render_image(self, image):
+        url = self.image_url(image.path)
+        if not url:
+            return ""
+        return f'<img src="{html.escape(url)}" alt="">'
+
+    def _link(self, url, text):
+        if not text:
+            return ""
+        if not is_safe_url(url):
+            return html.escape(str(text))
+        return f'<a href="{html.escape(url)}" target="_blank" rel="noopener">{html.escape(str(text))}</a>'
@@ -0,0 +1,156 @@
+r"""
+
+template_registry.py
+
+Description:
+Registry of the LaTeX templates a CV can be rendered with. Every template is
+a folder under latex_templates/ holding one Jinja2 file per part of the
+document: the preamble (header), the personal info and the closing (footer).
+The sections in between are rendered from the document tree by
+renderers.LatexRenderer with the environments the preamble defines. A
+template only has to provide the parts it changes, anything missing is taken
+from the default template, and parts can extend the default's with
+\BLOCK{ extends } and override its blocks.
+
+The Jinja2 environment uses LaTeX-safe delimiters so the templates stay
+valid-looking LaTeX:
+
+    \BLOCK{ for item in items }  ...  \BLOCK{ endfor }
+    \VAR{ item.title }
+    \#{ a comment }
+
+Templates are compiled once and kept by the environment; with a cache_dir
+the compiled bytecode is also stored on disk so new processes skip parsing.
+
+Usage:
+    registry = TemplateRegistry(cache_dir="instance/template_cache")
+    registry.load_all()
+    name = registry.resolve("Modern")          # -> "modern"
+    latex = registry.render(name, "personal_info", info={...}, image_path=None)
+
+"""
+
+import os
+import hashlib
+import logging
+import threading
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, StrictUndefined
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "latex_templates")
+DEFAULT_TEMPLATE = "professional"
+
+# Document parts, in the order they appear in a CV
+PARTS = [
+    "header",
+    "personal_info",
+    "footer",
+]
+
+
+def escape_hash(value):
+    """Escape # so it is printed rather than read as a macro parameter"""
+    return str(value).replace("#", "\\#")
+
+
+class TemplateRegistry:
+
+    def __init__(self, templates_dir=TEMPLATES_DIR, cache_dir=None, default=DEFAULT_TEMPLATE):
+        self.templates_dir = templates_dir
+        self.default = default
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            block_start_string=r"\BLOCK{",
+            block_end_string="}",
+            variable_start_string=r"\VAR{",
+            variable_end_string="}",
+            comment_start_string=r"\#{",
+            comment_end_string="}",
+            autoescape=False,
+            undefined=StrictUndefined,
+            # Templates ship with the code, there is nothing to reload
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else None,
+        )
+
+        self.env.filters["latex_hash"] = escape_hash
+
+        self._names = sorted(
+            name
+            for name in os.listdir(templates_dir)
+            if os.path.isdir(os.path.join(templates_dir, name))
+        )
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+
+    def names(self):
+        """Names of the available templates"""
+        return list(self._names)
+
+    def resolve(self, template):
+        """Map a template name (any case) to a registered template, falling back to the default"""
+        if template is None:
+            return self.default
+
+        name = str(template).strip().lower()
+        if name in self._names:
+            return name
+
+        logger.warning(f"Unknown LaTeX template {template!r}, using {self.default!r}")
+        return self.default
+
+    def get(self, template, part):
+        """Compiled Jinja2 template for one part of the document"""
+        return self.env.select_template(
+            [f"{self.resolve(template)}/{part}.tex", f"{self.default}/{part}.tex"]
+        )
+
+    def render(self, template, part, **context):
+        return self.get(template, part).render(**context)
+
+    def load_all(self):
+        """Compile every part of every template up front"""
+        for name in self._names:
+            for part in PARTS:
+                self.get(name, part)
+                self.fingerprint(name)
+
+    def fingerprint(self, template):
+        """Hash of the files a template renders with, so caches notice template edits"""
+        name = self.resolve(template)
+        with self._lock:
+            if name in self._fingerprints:
+                return self._fingerprints[name]
+
+        digest = hashlib.sha256()
+        for folder in sorted({self.default, name}):
+            folder_path = os.path.join(self.templates_dir, folder)
+            for filename in sorted(os.listdir(folder_path)):
+                digest.update(f"{folder}/{filename}".encode("utf-8"))
+                with open(os.path.join(folder_path, filename), "rb") as f:
+                    digest.update(f.read())
+
+        with self._lock:
+            self._fingerprints[name] = digest.hexdigest()[:16]
+        return self._fingerprints[name]
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry():
+    """Process-wide registry without a bytecode cache, used when none is passed in"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = TemplateRegistry()
+        return _default_registry
@@ -8,19 +8,28 @@ from flask import (
     jsonify,
     Blueprint,
     current_app,
+    make_response,
+    Response,
+    stream_with_context,
 )
 
 # from models import CVData, Template, Language , Technology
 import db_access
-from extensions import db
+from extensions import db, get_job_queue
+from jobs import job_response
 from flask_login import login_required, current_user
 from forms import CVForm
 from routes.route_path import RoutePath
-import uuid
 import os
 import json
-import subprocess
-import cv_gen.generator as generator
+import builds
+import delivery
+from cv_gen.renderers import HtmlRenderer
+from cv_gen.admission import CompileBusy
+from cv_gen.job_queue import FAILED
+from cv_gen.ingest import UploadRejected
+from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from datetime import datetime
 from openai import OpenAI
 
@@ -83,46 +92,20 @@ def save_cv_from_json_data(data, user_id):
 
     print(json.dumps(transformed, indent=4))
 
-    # Generate UUID
-    unique_id = str(uuid.uuid4())
-
-    # Generate Json file
-    json_file = os.path.join(current_app.config["UPLOAD_FOLDER"], f"{unique_id}.json")
-    with open(json_file, "w") as f:
-        json.dump(transformed, f)
-
-    # Generate LaTeX file
-    latex_output_path = os.path.join(
-        current_app.config["LATEX_OUTPUT_FOLDER"], f"{unique_id}.tex"
-    )
-    cv_generator = generator.Generator(json_file)
-    cv_str = cv_generator.make_cv()
-
-    with open(latex_output_path, "w") as tex_file:
-        tex_file.write(cv_str)
-
-    subprocess.run(
-        [
-            "/usr/bin/pdflatex",
-            "-interaction=nonstopmode",
-            "-output-directory",
-            current_app.config["PDF_OUTPUT_FOLDER"],
-            latex_output_path,
-        ],
-        capture_output=True,
-        text=True,
-    )
-
-    # Clean up auxiliary files
-    base_filename = os.path.splitext(os.path.basename(latex_output_path))[0]
-    for ext in ["aux", "log", "out"]:
-        aux_file = os.path.join(
-            current_app.config["PDF_OUTPUT_FOLDER"], f"{base_filename}.{ext}"
-        )
-        if os.path.exists(aux_file):
-            os.remove(aux_file)
-
-    pdf_filename = f"{unique_id}.pdf"
+    # The Generator takes the transformed data directly.
+    # Sections that did not change since the last save come from the fragment cache
+    cv_generator = builds.new_generator(transformed, template=data.get("template_id"))
+
+    # The LaTeX is saved with the CV. The PDF is built on the job queue; it is
+    # named by its render cache key, so the CV record can point at it before
+    # the job has run
+    latex_filename = builds.save_latex(cv_generator)
+    if current_app.config["LAZY_COMPILE"]:
+        # Built when it is first opened, see builds.materialize_pdf
+        job_id = None
+        pdf_filename = builds.defer_build(cv_generator)
+    else:
+        job_id, pdf_filename = builds.build_once(cv_generator)
 
     cv_data = db_access.create_cv(
         user_id,
@@ -130,13 +113,13 @@ def save_cv_from_json_data(data, user_id):
         data["template_id"],
         transformed,
         pdf_filename,
-        json_file,
-        latex_output_path,
+        None,
+        latex_filename,
     )
 
     print("SAVED CV DATA : ", cv_data)
 
-    return cv_data, pdf_filename
+    return cv_data, pdf_filename, job_id
 
 
 @dashboard.route("/dashboard")
@@ -357,6 +340,60 @@ def ai_recommend():
     ), 200
 
 
+def busy_response(error):
+    # Saturated build queue: answer right away and tell the client when to retry
+    response = jsonify(
+        {
+            "success": False,
+            "error": "The server is busy generating other CVs, please try again shortly",
+            "retry_after": error.retry_after,
+        }
+    )
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+# Seconds before a browser waiting on a PDF build asks again
+PDF_PENDING_RETRY = 2
+
+PDF_PENDING_PAGE = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="{PDF_PENDING_RETRY}">
+<title>Generating PDF</title>
+</head>
+<body>
+<p>Your PDF is being generated, this page reloads once it is ready.</p>
+</body>
+</html>
+"""
+
+
+def pending_pdf_response(job_id):
+    """
+    202 for a PDF whose build is queued, so the request does not hold a
+    worker while it runs. Scripts get the job, as /upload returns it, to
+    follow with waitForJob; a browser opening the URL gets a page that
+    reloads until the PDF is there.
+    """
+    record = get_job_queue(current_app).status(job_id)
+    if record is None or record["status"] == FAILED:
+        current_app.logger.error(f"Build job {job_id} failed: {record}")
+        return jsonify({"success": False, "error": "PDF generation failed"}), 500
+
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        response = jsonify(job_response(record))
+    else:
+        response = make_response(PDF_PENDING_PAGE)
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.status_code = 202
+    response.headers["Retry-After"] = str(PDF_PENDING_RETRY)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @dashboard.route("/save_cv", methods=["POST"])
 @login_required
 def save_cv():
@@ -377,6 +414,7 @@ def save_cv():
         cv_id = raw_data.get("cv_id")
         template_id = raw_data.get("template_id", 1)
         pdf_filename = ""
+        job_id = None
 
         if cv_id:
             # Update existing CV
@@ -387,7 +425,7 @@ def save_cv():
 
         else:
             # Create new CV
-            cv_data, pdf_filename = save_cv_from_json_data(raw_data, current_user.id)
+            cv_data, pdf_filename, job_id = save_cv_from_json_data(raw_data, current_user.id)
 
         # Save PDF to database
         return (
@@ -396,11 +434,19 @@ def save_cv():
                     "success": True,
                     "cv_id": cv_data.id,
                     "pdf_url": url_for("dashboard.get_pdf", filename=pdf_filename),
+                    "pdf_status": builds.pdf_status(cv_data),
+                    "job_id": job_id,
+                    "status_url": url_for("jobs.job_status", job_id=job_id) if job_id else None,
+                    "events_url": url_for("jobs.job_events", job_id=job_id) if job_id else None,
                 }
             ),
-            200,
+            202 if job_id else 200,
         )
 
+    except CompileBusy as e:
+        current_app.logger.warning(f"Save rejected: {str(e)}")
+        return busy_response(e)
+
     except Exception as e:
         current_app.logger.error(f"Error saving CV: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -409,7 +455,25 @@ def save_cv():
 @dashboard.route("/get_pdf/<filename>")
 @login_required
 def get_pdf(filename):
-    return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], filename)
+    response = delivery.send_pdf(filename)
+    if response is not None:
+        return response
+
+    # Saved lazily or expired, build it if it is one of the user's CVs
+    cv_data = db_access.get_cv_by_pdf_name(filename, current_user.id)
+    if not cv_data:
+        return jsonify({"success": False, "error": "PDF not found"}), 404
+    try:
+        pdf_filename, job_id = builds.materialize_pdf(cv_data)
+    except CompileBusy as e:
+        return busy_response(e)
+    if job_id is not None:
+        return pending_pdf_response(job_id)
+
+    response = delivery.send_pdf(pdf_filename)
+    if response is None:
+        return jsonify({"success": False, "error": "PDF generation failed"}), 500
+    return response
 
 
 @dashboard.route("/preview_pdf_dashboard")
@@ -428,15 +492,75 @@ def preview_pdf_dashboard():
         return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], "no_cv.pdf")
 
     try:
-        
-        return send_from_directory(
-            current_app.config["PDF_OUTPUT_FOLDER"], cv_data.cv_pdf_name
-        )
+        pdf_filename, job_id = builds.materialize_pdf(cv_data)
+        if job_id is not None:
+            return pending_pdf_response(job_id)
+        # The URL names the CV, not the PDF, so it is only cached until revalidated
+        response = delivery.send_pdf(pdf_filename, immutable=False)
+        if response is None:
+            return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], "no_cv.pdf")
+        return response
     except Exception as e:
         flash(f"Error generating PDF: {str(e)}")
         return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], "no_cv.pdf")
 
 
+def render_html_preview(cv_json, template_id):
+    """Render CV data (as stored by save_cv) to an HTML page, no pdflatex involved"""
+
+    def image_url(path):
+        # Only profile images uploaded through the dashboard can be shown. The
+        # path comes from the posted data, so only its file name is looked up,
+        # and only inside IMAGE_UPLOAD_FOLDER
+        filename = os.path.basename(path or "")
+        image_path = safe_join(os.path.abspath(current_app.config["IMAGE_UPLOAD_FOLDER"]), filename)
+        if not filename or image_path is None or not os.path.isfile(image_path):
+            return None
+        return url_for("dashboard.get_uploaded_file", filename=filename)
+
+    cv_generator = builds.new_generator(cv_json, template=template_id)
+    renderer = HtmlRenderer(template=cv_generator.template, image_url=image_url)
+    return cv_generator.build_document().decode(renderer)
+
+
+def html_preview_response(html):
+    response = make_response(html)
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@dashboard.route("/preview_html", methods=["POST"])
+@login_required
+def preview_html():
+    """Live preview of the unsaved form data"""
+    raw_data = request.get_json()
+    if not raw_data:
+        return jsonify({"success": False, "error": "No data received"}), 400
+
+    try:
+        transformed = transform_cv_structure(raw_data)
+        return html_preview_response(
+            render_html_preview(transformed, raw_data.get("template_id", 1))
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error rendering HTML preview: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@dashboard.route("/preview_html_dashboard")
+@login_required
+def preview_html_dashboard():
+    """HTML preview of a saved CV"""
+    cv_id = request.args.get("cv_id", type=int)
+
+    cv_data = db_access.get_cv_by_id(cv_id) if cv_id else None
+    if not cv_data or cv_data.user_id != current_user.id:
+        return jsonify({"success": False, "error": "CV not found"}), 404
+
+    return html_preview_response(render_html_preview(cv_data.data, cv_data.template_id))
+
+
 @dashboard.route("/download_pdf_dashboard")
 @login_required
 def download_pdf_dashboard():
@@ -453,18 +577,104 @@ def download_pdf_dashboard():
         return redirect(url_for("dashboard.dashboard_index"))
 
     try:
-
-        return send_from_directory(
-            current_app.config["PDF_OUTPUT_FOLDER"],
-            cv_data.cv_pdf_name,
+        pdf_filename, job_id = builds.materialize_pdf(cv_data)
+        if job_id is not None:
+            return pending_pdf_response(job_id)
+        response = delivery.send_pdf(
+            pdf_filename,
             as_attachment=True,
             download_name=f"{cv_data.name.replace(' ', '_')}.pdf",
+            immutable=False,
         )
+        if response is None:
+            return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], "no_cv.pdf")
+        return response
     except Exception as e:
         flash(f"Error generating PDF: {str(e)}")
         return send_from_directory(current_app.config["PDF_OUTPUT_FOLDER"], "no_cv.pdf")
 
 
+def queue_export_builds(cvs, template_names):
+    """
+    Queue the builds of the PDFs an export is missing, before it starts streaming.
+
+    Returns {cv id: (pdf_filename, job_id)}, job_id is None when the PDF is
+    already there. Builds go through the job queue, so they share the pending
+    limit and coalesce with other requests for the same PDF; raises
+    CompileBusy when the host is saturated.
+    """
+    pdfs = {}
+    for cv in cvs:
+        if cv.cv_pdf_name and builds.restore_pdf(cv.cv_pdf_name):
+            pdfs[cv.id] = (cv.cv_pdf_name, None)
+            continue
+        # A PDF the render cache still has is restored by the job without pdflatex
+        cv_generator = builds.new_generator(cv.data, template=template_names.get(cv.template_id))
+        job_id, pdf_filename = builds.build_once(cv_generator)
+        pdfs[cv.id] = (pdf_filename, job_id)
+    return pdfs
+
+
+def export_entries(cvs, pdfs, template_names, include_sources=False):
+    """ZIP entries for export_all: each CV's PDF, once its queued build is done, and optionally its sources"""
+    pdf_folder = current_app.config["PDF_OUTPUT_FOLDER"]
+    used_names = set()
+
+    for cv in cvs:
+        name = secure_filename(cv.name) or f"cv_{cv.id}"
+        if name in used_names:
+            name = f"{name}_{cv.id}"
+        used_names.add(name)
+
+        pdf_filename, job_id = pdfs[cv.id]
+        if job_id is not None and not builds.wait_for_build(job_id):
+            # The archive is already being sent, leave this CV out
+            current_app.logger.error(f"Export of CV {cv.id} failed: build job {job_id} did not finish")
+            continue
+
+        yield f"{name}.pdf", os.path.join(pdf_folder, pdf_filename)
+
+        if include_sources:
+            yield f"{name}.json", json.dumps(cv.data, indent=2).encode("utf-8")
+            cv_generator = builds.new_generator(cv.data, template=template_names.get(cv.template_id))
+            yield f"{name}.tex", cv_generator.make_cv().encode("utf-8")
+
+
+@dashboard.route("/dashboard/export_all")
+@login_required
+def export_all():
+    """
+    ZIP of the PDFs of all the user's CVs, ?sources=1 adds their JSON and LaTeX.
+
+    The archive is streamed while it is written. PDFs that are no longer
+    around are queued as builds first, answering 503 when the host is
+    saturated, and each is added once its build is done.
+    """
+    cvs = db_access.get_user_cvs(current_user.id)
+    if not cvs:
+        return jsonify({"success": False, "error": "No CVs to export"}), 404
+
+    # One query for the template names instead of one per CV
+    template_names = {t.id: t.name for t in db_access.get_all_templates(active_only=False)}
+    try:
+        pdfs = queue_export_builds(cvs, template_names)
+    except CompileBusy as e:
+        current_app.logger.warning(f"Export rejected: {str(e)}")
+        return busy_response(e)
+
+    include_sources = request.args.get("sources", "0").lower() in ("1", "true", "yes")
+    entries = export_entries(cvs, pdfs, template_names, include_sources)
+    response = Response(
+        stream_with_context(delivery.stream_zip(entries)),
+        mimetype="application/zip",
+    )
+    response.headers["Content-Disposition"] = "attachment; filename=cvs.zip"
+    response.headers["Cache-Control"] = "no-store"
+    # Let nginx pass chunks on as they are written
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @dashboard.route("/delete_cv/<int:cv_id>", methods=["DELETE"])
 @login_required
 def delete_cv(cv_id):
@@ -494,12 +704,23 @@ def upload_profile_image():
         return jsonify({"success": False, "error": "No selected file"}), 400
 
     if file:
-        # Create unique filename
-        filename = f"{current_user.id}_{uuid.uuid4()}.{file.filename.rsplit('.', 1)[1].lower()}"
-        file_path = os.path.join(current_app.config["IMAGE_UPLOAD_FOLDER"], filename)
-
-        # Save file
-        file.save(file_path)
+        # Stored under its content hash, the same photo is kept once; the
+        # original expires with the uploads, the normalized copy is kept
+        try:
+            upload = builds.ingest_upload(
+                file,
+                current_app.config["UPLOAD_FOLDER"],
+                current_app.config["IMAGE_MAX_BYTES"],
+            )
+        except UploadRejected as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        # Crop and downsample to the printed size before embedding
+        try:
+            file_path = builds.normalize_profile_image(upload.path, upload.digest)
+        except UploadRejected as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        filename = os.path.basename(file_path)
 
         return (
             jsonify(
@@ -520,4 +741,4 @@ def upload_profile_image():
 @dashboard.route("/uploads/<filename>")
 @login_required
 def get_uploaded_file(filename):
-    return send_from_directory(current_app.config["IMAGE_UPLOAD_FOLDER"], filename)
+    return delivery.send_artifact(current_app.config["IMAGE_UPLOAD_FOLDER"], filename)
@@ -91,6 +91,14 @@ def get_cv_by_id(cv_id , user_id=None):
         return None
     return cv_data
 
+def get_cv_by_pdf_name(pdf_name, user_id):
+    """Get the user's most recent CV whose PDF is pdf_name"""
+    return (
+        CVData.query.filter_by(cv_pdf_name=pdf_name, user_id=user_id)
+        .order_by(CVData.last_updated.desc())
+        .first()
+    )
+
 def get_user_cvs(user_id, active_only=True):
     """Get all CVs for a specific user"""
     query = CVData.query.filter_by(user_id=user_id)
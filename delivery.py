@@ -0,0 +1,231 @@
+import os
+import re
+import time
+import zipfile
+from urllib.parse import quote
+from flask import current_app
+from flask import request
+from flask import make_response
+from flask import send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as werkzeug_send_file
+import builds
+
+
+OFFLOAD_MODES = ("python", "nginx", "sendfile")
+
+# PDFs are named by their render cache key, a SHA-256 of everything that goes
+# into the build, so a name never points to a different PDF
+_CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})\.pdf$")
+
+# One year, the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Read size when copying a file into a streamed archive
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Already compressed formats, deflating them again only costs CPU
+STORED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif")
+
+
+def send_artifact(
+    folder, filename, mimetype=None, as_attachment=False, download_name=None, etag=True, weak_etag=False
+):
+    """
+    Send filename from folder, or have the front server send it.
+
+    Call it once the request is allowed to see the file. With FILE_OFFLOAD
+    set to python the app streams the file through Werkzeug, which answers
+    Range requests by seeking and hands the file to the server's
+    wsgi.file_wrapper (sendfile under gunicorn). nginx and sendfile only
+    stat the file and return its headers with an empty body:
+
+        nginx     X-Accel-Redirect: <FILE_OFFLOAD_PREFIX>/<folder name>/<filename>,
+                  served by an internal location per folder, e.g.
+
+                      location /_protected/pdf_outputs/ {
+                          internal;
+                          alias /srv/cvflow/instance/pdf_outputs/;
+                      }
+
+        sendfile  X-Sendfile: <absolute path>
+
+    The front server then handles Range and streams the bytes, so a worker
+    is not held for the whole transfer.
+
+    etag is passed on to Werkzeug; with weak_etag the string etag is sent as
+    a weak validator instead.
+    """
+    offload = current_app.config["FILE_OFFLOAD"]
+    if offload not in OFFLOAD_MODES:
+        raise ValueError(f"Unknown FILE_OFFLOAD '{offload}', expected one of {', '.join(OFFLOAD_MODES)}")
+
+    folder = os.path.abspath(folder)
+    if offload == "python":
+        if not weak_etag:
+            return send_from_directory(
+                folder,
+                filename,
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                conditional=True,
+                etag=etag,
+            )
+        # Werkzeug only sets strong ETags, so the conditional checks run
+        # here once the weak one is set
+        response = send_from_directory(
+            folder,
+            filename,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=False,
+            etag=False,
+        )
+        response.set_etag(etag, weak=True)
+        return response.make_conditional(
+            request.environ, accept_ranges=True, complete_length=response.content_length
+        )
+
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    # Only a 304 is decided here, Range is left to the front server
+    response = werkzeug_send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=False,
+        etag=False if weak_etag else etag,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+    )
+    if weak_etag:
+        response.set_etag(etag, weak=True)
+    if response.make_conditional(request.environ).status_code == 304:
+        response.headers.pop("X-Sendfile", None)
+        return response
+
+    if offload == "nginx":
+        del response.headers["X-Sendfile"]
+        prefix = current_app.config["FILE_OFFLOAD_PREFIX"].rstrip("/")
+        response.headers["X-Accel-Redirect"] = quote(
+            f"{prefix}/{os.path.basename(folder)}/{os.path.relpath(path, folder)}"
+        )
+    return response
+
+
+def pdf_etag(filename):
+    """
+    ETag of a content addressed PDF name, None for any other name.
+
+    It is sent as a weak validator: the key names what went into the build,
+    but a PDF rebuilt for it after expiring is not byte for byte the same,
+    pdflatex embeds the build time and a random document ID.
+    """
+    match = _CONTENT_ADDRESSED.match(filename)
+    return match.group(1) if match else None
+
+
+def pdf_cache_control(immutable, private):
+    scope = "private" if private else "public"
+    if immutable:
+        return f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    # The URL may point to another PDF later, caches revalidate every time
+    return f"{scope}, no-cache"
+
+
+def send_pdf(filename, as_attachment=False, download_name=None, immutable=True, private=True):
+    """
+    Serve a PDF from PDF_OUTPUT_FOLDER with caching headers.
+
+    Content addressed names get their key as a weak ETag, and a request
+    revalidating it is answered 304 before the file is even looked at. With
+    immutable the PDF may be cached for a year without revalidation; pass
+    immutable=False for URLs that can later serve another PDF, such as a CV
+    id. Other names are revalidated against Flask's own ETag.
+
+    Returns None when the PDF does not exist and cannot be restored.
+    """
+    etag = pdf_etag(filename)
+    if etag is None:
+        immutable = False
+    cache_control = pdf_cache_control(immutable, private)
+
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = cache_control
+        return response
+
+    if not builds.restore_pdf(filename):
+        return None
+
+    response = send_artifact(
+        current_app.config["PDF_OUTPUT_FOLDER"],
+        filename,
+        mimetype="application/pdf",
+        as_attachment=as_attachment,
+        download_name=download_name,
+        etag=etag if etag is not None else True,
+        weak_etag=etag is not None,
+    )
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+class _ZipOutput:
+    """Write-only file that keeps what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive of entries as it is written.
+
+    entries yields (name, source) pairs, source being a file path or bytes.
+    Files are copied in chunks and nothing but the entry being written is
+    held in memory, so entries can be produced lazily (compiled on demand,
+    for instance) while the start of the archive is already sent.
+    """
+    return (chunk for chunk in _zip_chunks(entries) if chunk)
+
+
+def _zip_chunks(entries):
+    output = _ZipOutput()
+    # Without tell() and seek() ZipFile writes sizes after each entry
+    with zipfile.ZipFile(output, mode="w") as archive:
+        for name, source in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            stored = name.lower().endswith(STORED_EXTENSIONS)
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+
+            with archive.open(info, mode="w") as member:
+                if isinstance(source, bytes):
+                    member.write(source)
+                else:
+                    with open(source, "rb") as f:
+                        for chunk in iter(lambda: f.read(ZIP_CHUNK_SIZE), b""):
+                            member.write(chunk)
+                            yield output.drain()
+            yield output.drain()
+    yield output.drain()
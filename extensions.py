@@ -10,6 +10,15 @@ import logging
 from celery import Celery
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from cv_gen.compile_pool import CompilePool
+from cv_gen.admission import AdmissionControl
+from cv_gen.render_cache import RenderCache, is_key_filename
+from cv_gen.fragment_cache import FragmentCache
+from cv_gen.template_registry import TemplateRegistry
+from cv_gen.job_queue import JobQueue, JobStore
+from cv_gen.events import MemoryEventBus, FileEventBus
+from cv_gen.janitor import Janitor
+from cv_gen.prefetch import Prefetcher
 
 
 # Database
@@ -58,6 +67,9 @@ def setup_logging(app):
     # Initialize logging when app starts
 
 def get_celery(app):
+    if 'celery' in app.extensions:
+        return app.extensions['celery']
+
     celery = None  # Initialize with None by default
     
     if app.config.get('CELERY_BROKER_URL'):
@@ -72,9 +84,139 @@ def get_celery(app):
             celery.conf.timezone = app.config.get('CELERY_TIMEZONE', 'UTC')
         except ImportError:
             app.logger.warning("Celery not installed. Celery integration disabled.")
-    
+
+    app.extensions['celery'] = celery
     return celery
 
+# Slack past the slot wait and the pdflatex timeout for queueing and bookkeeping
+BUILD_WAIT_MARGIN = 10
+
+def build_wait(app):
+    """Seconds a build can take: waiting for an admission slot, then pdflatex, plus a margin"""
+    return app.config['PDFLATEX_SLOT_WAIT'] + app.config['PDFLATEX_TIMEOUT'] + BUILD_WAIT_MARGIN
+
+def get_compile_pool(app):
+    """Return the app's pdflatex worker pool, creating it on first use"""
+    if 'compile_pool' not in app.extensions:
+        app.extensions['compile_pool'] = CompilePool(
+            workers=app.config.get('PDFLATEX_WORKERS'),
+            max_queue=app.config.get('PDFLATEX_QUEUE_SIZE'),
+            timeout=app.config['PDFLATEX_TIMEOUT'],
+            pdflatex=app.config['PDFLATEX_PATH'],
+            admission=get_admission(app),
+            slot_timeout=app.config['PDFLATEX_SLOT_WAIT'],
+            scratch_root=app.config['BUILD_SCRATCH_ROOT']
+        )
+
+    return app.extensions['compile_pool']
+
+def get_admission(app):
+    """Return the host-wide admission control for LaTeX builds"""
+    if 'admission' not in app.extensions:
+        app.extensions['admission'] = AdmissionControl(
+            app.config['ADMISSION_FOLDER'],
+            slots=app.config['PDFLATEX_GLOBAL_SLOTS'],
+            max_pending=app.config['PDFLATEX_MAX_PENDING'],
+            # A ticket older than a whole build belongs to a dead worker
+            stale_after=build_wait(app)
+        )
+
+    return app.extensions['admission']
+
+def get_render_cache(app):
+    """Return the app's content-addressed PDF cache"""
+    if 'render_cache' not in app.extensions:
+        app.extensions['render_cache'] = RenderCache(
+            app.config['RENDER_CACHE_FOLDER'],
+            max_bytes=app.config['RENDER_CACHE_MAX_BYTES']
+        )
+
+    return app.extensions['render_cache']
+
+def get_fragment_cache(app):
+    """Return the app's per-section LaTeX fragment cache"""
+    if 'fragment_cache' not in app.extensions:
+        app.extensions['fragment_cache'] = FragmentCache(
+            max_entries=app.config['FRAGMENT_CACHE_SIZE']
+        )
+
+    return app.extensions['fragment_cache']
+
+def get_template_registry(app):
+    """Return the app's LaTeX template registry, compiled once per process"""
+    if 'template_registry' not in app.extensions:
+        registry = TemplateRegistry(cache_dir=app.config['TEMPLATE_CACHE_FOLDER'])
+        registry.load_all()
+        app.extensions['template_registry'] = registry
+
+    return app.extensions['template_registry']
+
+def get_event_bus(app):
+    """Return the app's pub/sub bus for build progress events"""
+    if 'event_bus' not in app.extensions:
+        if app.config['EVENT_BACKEND'] == 'file':
+            bus = FileEventBus(app.config['JOB_FOLDER'])
+        else:
+            if app.config['JOB_BACKEND'] == 'celery':
+                app.logger.warning("EVENT_BACKEND is memory, progress events from Celery workers will not reach the web process.")
+            bus = MemoryEventBus()
+        app.extensions['event_bus'] = bus
+
+    return app.extensions['event_bus']
+
+def get_job_queue(app):
+    """Return the app's background job queue for CV builds"""
+    if 'job_queue' not in app.extensions:
+        backend = app.config['JOB_BACKEND']
+        celery = get_celery(app) if backend == 'celery' else None
+        if backend == 'celery' and celery is None:
+            app.logger.warning("JOB_BACKEND is celery but CELERY_BROKER_URL is not set. Using the thread backend.")
+            backend = 'thread'
+
+        app.extensions['job_queue'] = JobQueue(
+            JobStore(app.config['JOB_FOLDER']),
+            backend=backend,
+            workers=app.config['JOB_WORKERS'],
+            celery=celery,
+            app=app,
+            events=get_event_bus(app)
+        )
+
+    return app.extensions['job_queue']
+
+def get_janitor(app):
+    """Return the app's janitor, which removes expired artifacts in the background"""
+    if 'janitor' not in app.extensions:
+        hour = 60 * 60
+        app.extensions['janitor'] = Janitor(
+            app.config['JANITOR_INDEX'],
+            {
+                app.config['UPLOAD_FOLDER']: app.config['UPLOAD_RETENTION_HOURS'] * hour,
+                app.config['LATEX_OUTPUT_FOLDER']: app.config['LATEX_OUTPUT_RETENTION_HOURS'] * hour,
+                app.config['PDF_OUTPUT_FOLDER']: app.config['PDF_OUTPUT_RETENTION_HOURS'] * hour,
+                app.config['IMAGE_UPLOAD_FOLDER']: app.config['IMAGE_UPLOAD_RETENTION_HOURS'] * hour,
+                app.config['JOB_FOLDER']: app.config['JOB_RETENTION_HOURS'] * hour,
+            },
+            interval=app.config['JANITOR_INTERVAL'],
+            # Only PDFs named by their render cache key can be restored once
+            # removed; no_cv.pdf and older uuid named PDFs are kept
+            managed={app.config['PDF_OUTPUT_FOLDER']: is_key_filename},
+        )
+
+    return app.extensions['janitor']
+
+def get_prefetcher(app):
+    """Return the app's prefetcher, which builds lazily saved PDFs while no build is pending"""
+    if 'prefetcher' not in app.extensions:
+        admission = get_admission(app)
+        app.extensions['prefetcher'] = Prefetcher(
+            lambda: admission.pending() == 0 and admission.running() == 0,
+            app=app,
+            interval=app.config['LAZY_COMPILE_PREFETCH_INTERVAL']
+        )
+
+    return app.extensions['prefetcher']
+
 def get_limiter(app):
     # Initialize Flask-Limiter if available
     try:
@@ -96,8 +238,14 @@ def check_required_directories(app):
     required_directories = {
         'UPLOAD_FOLDER': 0o775,
         'LATEX_OUTPUT_FOLDER': 0o775,
+        'CV_LATEX_FOLDER': 0o775,
         'PDF_OUTPUT_FOLDER': 0o775,
         'IMAGE_UPLOAD_FOLDER': 0o775,
+        'LATEX_FORMAT_FOLDER': 0o775,
+        'RENDER_CACHE_FOLDER': 0o775,
+        'TEMPLATE_CACHE_FOLDER': 0o775,
+        'JOB_FOLDER': 0o775,
+        'ADMISSION_FOLDER': 0o775,
         'MOCK_FOLDER': 0o775
     }
     
@@ -149,11 +297,79 @@ def init_app(app):
         # File Uploads
         UPLOAD_FOLDER=os.path.join('instance', 'uploads'),
         LATEX_OUTPUT_FOLDER=os.path.join('instance', 'latex_outputs'),
+        # LaTeX of saved CVs, named by render key like their PDFs. Saved CVs
+        # point at it, so the janitor leaves it alone
+        CV_LATEX_FOLDER=os.path.join('instance', 'cv_latex'),
         PDF_OUTPUT_FOLDER=os.path.join('instance', 'pdf_outputs'),
         IMAGE_UPLOAD_FOLDER=os.path.join('instance', 'image_uploads'),
         MOCK_FOLDER = os.path.join('mock'),
         ALLOWED_EXTENSIONS={'json', 'txt','docx','doc'},
         MAX_CONTENT_LENGTH= eval(os.getenv('MAX_CONTENT_LENGTH')),
+        # Per file limits, checked while the upload is stored
+        UPLOAD_MAX_BYTES=int(os.getenv('UPLOAD_MAX_BYTES', 2 * 1024 * 1024)),
+        IMAGE_MAX_BYTES=int(os.getenv('IMAGE_MAX_BYTES', 10 * 1024 * 1024)),
+        IMAGE_TARGET_DPI=int(os.getenv('IMAGE_TARGET_DPI', 300)),
+        IMAGE_JPEG_QUALITY=int(os.getenv('IMAGE_JPEG_QUALITY', 85)),
+
+        # LaTeX Build
+        PDFLATEX_PATH=os.getenv('PDFLATEX_PATH', '/usr/bin/pdflatex'),
+        PDFLATEX_TIMEOUT=int(os.getenv('PDFLATEX_TIMEOUT', 30)),
+        PDFLATEX_WORKERS=int(os.getenv('PDFLATEX_WORKERS', os.cpu_count() or 1)),
+        PDFLATEX_QUEUE_SIZE=int(os.getenv('PDFLATEX_QUEUE_SIZE', 16)),
+        LATEX_PRECOMPILED_FORMAT=os.getenv('LATEX_PRECOMPILED_FORMAT', 'False').lower() == 'true',
+        LATEX_FORMAT_FOLDER=os.path.join('instance', 'latex_formats'),
+        # Per-build scratch directories, /dev/shm when unset and writable
+        BUILD_SCRATCH_ROOT=os.getenv('BUILD_SCRATCH_ROOT'),
+
+        # Admission Control: pdflatex runs and pending builds across all processes
+        PDFLATEX_GLOBAL_SLOTS=int(os.getenv('PDFLATEX_GLOBAL_SLOTS', os.cpu_count() or 1)),
+        PDFLATEX_MAX_PENDING=int(os.getenv('PDFLATEX_MAX_PENDING', 4 * (os.cpu_count() or 1))),
+        PDFLATEX_SLOT_WAIT=int(os.getenv('PDFLATEX_SLOT_WAIT', 60)),
+        ADMISSION_FOLDER=os.path.join('instance', 'admission'),
+
+        # Render Cache
+        RENDER_CACHE_FOLDER=os.path.join('instance', 'render_cache'),
+        RENDER_CACHE_MAX_BYTES=int(os.getenv('RENDER_CACHE_MAX_BYTES', 512 * 1024 * 1024)),
+        FRAGMENT_CACHE_SIZE=int(os.getenv('FRAGMENT_CACHE_SIZE', 2048)),
+
+        # LaTeX Templates
+        TEMPLATE_CACHE_FOLDER=os.path.join('instance', 'template_cache'),
+
+        # Build Jobs: eager, thread or celery
+        JOB_BACKEND=os.getenv('JOB_BACKEND', 'thread').lower(),
+        JOB_WORKERS=int(os.getenv('JOB_WORKERS', os.getenv('PDFLATEX_WORKERS', os.cpu_count() or 1))),
+        JOB_FOLDER=os.path.join('instance', 'jobs'),
+
+        # Lazy Builds: saved CVs get their PDF on first access, or from the
+        # prefetcher while the host has no build pending
+        LAZY_COMPILE=os.getenv('LAZY_COMPILE', 'False').lower() == 'true',
+        LAZY_COMPILE_PREFETCH=os.getenv('LAZY_COMPILE_PREFETCH', 'True').lower() == 'true',
+        LAZY_COMPILE_PREFETCH_INTERVAL=int(os.getenv('LAZY_COMPILE_PREFETCH_INTERVAL', 5)),
+
+        # Build Progress Events: memory (one process) or file (shared by the host's processes)
+        EVENT_BACKEND=os.getenv('EVENT_BACKEND', 'memory').lower(),
+        EVENT_STREAM_TIMEOUT=int(os.getenv('EVENT_STREAM_TIMEOUT', 120)),
+
+        # Cleanup: hours files are kept per folder, 0 keeps them.
+        # Only PDFs named by their render cache key expire, they are restored
+        # from the cache or rebuilt; profile images are referenced by saved
+        # CVs, so they are kept by default
+        UPLOAD_RETENTION_HOURS=float(os.getenv('UPLOAD_RETENTION_HOURS', 24)),
+        LATEX_OUTPUT_RETENTION_HOURS=float(os.getenv('LATEX_OUTPUT_RETENTION_HOURS', 24)),
+        PDF_OUTPUT_RETENTION_HOURS=float(os.getenv('PDF_OUTPUT_RETENTION_HOURS', 24 * 7)),
+        IMAGE_UPLOAD_RETENTION_HOURS=float(os.getenv('IMAGE_UPLOAD_RETENTION_HOURS', 0)),
+        JOB_RETENTION_HOURS=float(os.getenv('JOB_RETENTION_HOURS', 24)),
+        JANITOR_INTERVAL=int(os.getenv('JANITOR_INTERVAL', 300)),
+        JANITOR_INDEX=os.path.join('instance', 'janitor.sqlite'),
+
+        # Metrics
+        METRICS_ENABLED=os.getenv('METRICS_ENABLED', 'False').lower() == 'true',
+
+        # File Delivery: python (the app streams files), nginx (X-Accel-Redirect)
+        # or sendfile (X-Sendfile, Apache mod_xsendfile and lighttpd)
+        FILE_OFFLOAD=os.getenv('FILE_OFFLOAD', 'python').lower(),
+        # nginx internal location holding one alias per served folder
+        FILE_OFFLOAD_PREFIX=os.getenv('FILE_OFFLOAD_PREFIX', '/_protected'),
 
         
         # Email Configuration
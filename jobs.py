@@ -0,0 +1,110 @@
+import json
+import time
+from flask import Blueprint
+from flask import Response
+from flask import jsonify
+from flask import request
+from flask import url_for
+from flask import current_app
+from flask import stream_with_context
+from extensions import get_job_queue, get_event_bus
+from cv_gen.job_queue import DONE, FINISHED
+
+
+
+jobs = Blueprint('jobs', __name__)
+
+# Seconds between keep-alive comments on an idle event stream
+KEEP_ALIVE_INTERVAL = 15
+
+
+
+def job_response(record):
+    """JSON body for a job record, with the PDF links once it is done"""
+    response = {
+        "success": record["status"] != "failed",
+        "job_id": record["id"],
+        "status": record["status"],
+        "error": record.get("error"),
+        "status_url": url_for('jobs.job_status', job_id=record["id"]),
+        "events_url": url_for('jobs.job_events', job_id=record["id"]),
+    }
+
+    if record["status"] == DONE:
+        pdf_filename = record["result"]["pdf_filename"]
+        response.update({
+            "download_link": url_for('download_file', filename=pdf_filename),
+            "preview_link": url_for('preview_pdf', filename=pdf_filename),
+            "pdf_url": url_for('dashboard.get_pdf', filename=pdf_filename),
+        })
+
+    return response
+
+
+def sse_message(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+
+@jobs.route('/jobs/<job_id>')
+def job_status(job_id):
+    # Job ids are random, knowing one is what grants access to its PDF
+    record = get_job_queue(current_app).status(job_id)
+    if record is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    return jsonify(job_response(record)), 200
+
+
+@jobs.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a build job's stages.
+
+    Stages already published are replayed first, after Last-Event-ID when the
+    browser reconnects. The stream ends with the done or failed event, whose
+    data carries the same fields as /jobs/<id>.
+    """
+    job_queue = get_job_queue(current_app)
+    if job_queue.status(job_id) is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    bus = get_event_bus(current_app)
+    last_id = request.headers.get('Last-Event-ID', request.args.get('after', '0'))
+    last_id = int(last_id) if str(last_id).isdigit() else 0
+    deadline = time.monotonic() + current_app.config['EVENT_STREAM_TIMEOUT']
+
+    def stream():
+        nonlocal last_id
+        yield "retry: 2000\n\n"
+
+        while time.monotonic() < deadline:
+            timeout = min(KEEP_ALIVE_INTERVAL, deadline - time.monotonic())
+            events = bus.wait(job_id, after=last_id, timeout=max(timeout, 0))
+
+            for event in events:
+                last_id = event["id"]
+                stage = event["stage"]
+                data = dict(event)
+                if stage in FINISHED:
+                    data.update(job_response(job_queue.status(job_id)))
+                yield sse_message(last_id, stage, data)
+                if stage in FINISHED:
+                    return
+
+            if not events:
+                # The job may have run where this process cannot see its
+                # events (another worker with the memory bus)
+                record = job_queue.status(job_id)
+                if record is not None and record["status"] in FINISHED:
+                    yield sse_message(last_id + 1, record["status"], job_response(record))
+                    return
+                yield ": keep-alive\n\n"
+
+        yield sse_message(last_id + 1, "timeout", job_response(job_queue.status(job_id)))
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,26 @@
+from flask import Blueprint
+from flask import jsonify
+from flask import current_app
+from extensions import get_compile_pool, get_render_cache, get_fragment_cache, get_job_queue, get_janitor, get_admission, get_prefetcher
+
+
+
+metrics = Blueprint('metrics', __name__)
+
+
+
+@metrics.route('/metrics')
+def metrics_index():
+    # Build pipeline counters, only exposed when METRICS_ENABLED is set
+    if not current_app.config.get('METRICS_ENABLED'):
+        return jsonify({"error": "Not found"}), 404
+
+    return jsonify({
+        "compile_pool": get_compile_pool(current_app).stats(),
+        "admission": get_admission(current_app).stats(),
+        "render_cache": get_render_cache(current_app).stats(),
+        "fragment_cache": get_fragment_cache(current_app).stats(),
+        "job_queue": get_job_queue(current_app).stats(),
+        "janitor": get_janitor(current_app).stats(),
+        "prefetcher": get_prefetcher(current_app).stats(),
+    }), 200
@@ -93,6 +93,7 @@ errors_500_script_file_name = '500.js'
 base_index_file_name = 'base.html'
 base_style_file_name = 'base.css'
 base_script_file_name = 'base.js'
+jobs_script_file_name = 'jobs.js'
 
 about_index_file_name = 'about.html'
 about_style_file_name = 'about.css'
@@ -48,6 +48,7 @@ class RoutePath:
     base_index = f'{_base_dir}/{base_index_file_name}'
     base_style = f'{static_css_dir_name}{_base_dir}/{base_style_file_name}'
     base_script = f'{static_js_dir_name}{_base_dir}/{base_script_file_name}'
+    jobs_script = f'{static_js_dir_name}{_base_dir}/{jobs_script_file_name}'
 
     _dashboard_dir = f'/{templates_dashboard_dir_name}'
     dashboard_index = f'{_dashboard_dir}/{dashboard_index_file_name}'
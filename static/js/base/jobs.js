@@ -0,0 +1,64 @@
+// Build jobs, shared by the pages that generate a PDF
+
+const JOB_STAGES = ['queued', 'running', 'rendered', 'compiling'];
+const JOB_FINAL_STAGES = ['done', 'failed', 'timeout'];
+
+// Follow a build job until the PDF is ready
+// Takes the JSON of a job (status_url, events_url and, when known, status).
+// Resolves with the job status, rejects when the build failed. Progress comes
+// from the job's event stream, without EventSource the status is polled.
+function waitForJob(job, onStage = () => {}, interval = 1000) {
+    return new Promise((resolve, reject) => {
+        function finish(job) {
+            if (job.status === 'done') {
+                resolve(job);
+            } else {
+                reject(new Error(job.error || 'PDF generation failed'));
+            }
+        }
+
+        function isFinished(job) {
+            return job.status === 'done' || job.status === 'failed' || !job.success;
+        }
+
+        if (isFinished(job)) {
+            finish(job);
+            return;
+        }
+
+        if (window.EventSource && job.events_url) {
+            const source = new EventSource(job.events_url);
+            JOB_STAGES.forEach(stage => {
+                source.addEventListener(stage, event => onStage(stage, JSON.parse(event.data)));
+            });
+            JOB_FINAL_STAGES.forEach(stage => {
+                source.addEventListener(stage, event => {
+                    source.close();
+                    finish(JSON.parse(event.data));
+                });
+            });
+            // The browser reconnects by itself, only give up once the job is gone
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    reject(new Error('Lost connection to the server'));
+                }
+            };
+            return;
+        }
+
+        function poll(job) {
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(job => {
+                    onStage(job.status, job);
+                    if (isFinished(job)) {
+                        finish(job);
+                    } else {
+                        setTimeout(() => poll(job), interval);
+                    }
+                })
+                .catch(reject);
+        }
+        poll(job);
+    });
+}
@@ -1603,6 +1603,18 @@ function saveAndGeneratePdfPromise() {
             body: JSON.stringify(formData)
         })
             .then(response => response.json())
+            .then(data => {
+                // The PDF is built in the background, wait for it before showing it
+                if (data.success && data.status_url) {
+                    showAlert('CV saved, generating PDF...', 'success');
+                    return waitForJob(data, stage => {
+                        if (stage === 'compiling') {
+                            showAlert('Compiling PDF...', 'success');
+                        }
+                    }).then(() => data);
+                }
+                return data;
+            })
             .then(data => {
                 if (data.success) {
                     // Update current CV ID
@@ -1641,33 +1653,55 @@ function saveAndGeneratePdfPromise() {
 }
 
 // Enhanced refresh preview
+// Renders the current form data as HTML on the server, no save or pdflatex
+// run needed. The PDF is still built by "Save and generate PDF".
+let htmlPreviewUrl = null;
+
 function refreshPreview() {
-    if (currentCvId) {
-        const previewIframe = document.querySelector('.preview-iframe');
-        const placeholderDiv = document.querySelector('.preview-placeholder');
+    const previewIframe = document.querySelector('.preview-iframe');
+    const placeholderDiv = document.querySelector('.preview-placeholder');
 
-        // Show loading state
-        if (placeholderDiv) {
-            placeholderDiv.innerHTML = '<div class="loading-spinner"></div><p>Generating preview...</p>';
-            placeholderDiv.style.display = 'flex';
-        }
+    // Show loading state
+    if (placeholderDiv) {
+        placeholderDiv.innerHTML = '<div class="loading-spinner"></div><p>Generating preview...</p>';
+        placeholderDiv.style.display = 'flex';
+    }
 
-        // Load the preview
-        previewIframe.src = `/preview_pdf_dashboard?cv_id=${currentCvId}&template_id=${currentTemplateId}`;
+    fetch('/preview_html', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(collectFormData())
+    })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Error generating preview');
+            }
+            return response.text();
+        })
+        .then(html => {
+            // Load the preview
+            if (htmlPreviewUrl) {
+                URL.revokeObjectURL(htmlPreviewUrl);
+            }
+            htmlPreviewUrl = URL.createObjectURL(new Blob([html], { type: 'text/html' }));
+            previewIframe.src = htmlPreviewUrl;
 
-        // Hide placeholder when iframe loads
-        previewIframe.onload = function () {
+            // Hide placeholder when iframe loads
+            previewIframe.onload = function () {
+                if (placeholderDiv) {
+                    placeholderDiv.style.display = 'none';
+                }
+            };
+        })
+        .catch(error => {
+            console.error('Error:', error);
             if (placeholderDiv) {
                 placeholderDiv.style.display = 'none';
             }
-        };
-    } else {
-        saveDraft().then(() => {
-            if (currentCvId) {
-                refreshPreview();
-            }
+            showAlert('Error generating preview', 'error');
         });
-    }
 }
 
 // Enhanced Save CV and generate PDF
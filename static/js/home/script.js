@@ -223,15 +223,33 @@ document.addEventListener("DOMContentLoaded", function () {
             // Send form data to server
             fetch('/upload', {
                 method: 'POST',
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
                 body: formData
             })
-                .then(response => response.text())
-                .then(html => {
-                    // Rest of the existing code for handling the response
-                    const parser = new DOMParser();
-                    const doc = parser.parseFromString(html, 'text/html');
-                    const downloadLink = doc.querySelector('.download-button')?.getAttribute('href');
+                .then(response => {
+                    // Rejected uploads still come back as the rendered page
+                    if (!(response.headers.get('Content-Type') || '').includes('application/json')) {
+                        return response.text().then(html => {
+                            const parser = new DOMParser();
+                            const doc = parser.parseFromString(html, 'text/html');
+                            return doc.querySelector('.download-button')?.getAttribute('href');
+                        });
+                    }
 
+                    // The PDF is built in the background, follow the job until it is ready
+                    const loadingMessage = loadingAnimation?.querySelector('p');
+                    return response.json()
+                        .then(job => waitForJob(job, stage => {
+                            if (loadingMessage && STAGE_MESSAGES[stage]) {
+                                loadingMessage.textContent = STAGE_MESSAGES[stage];
+                            }
+                        }))
+                        .then(job => job.download_link)
+                        .catch(() => null);
+                })
+                .then(downloadLink => {
                     if (downloadLink) {
                         // Update the page with the download link without a full reload
                         const downloadSection = document.querySelector('.download-section');
@@ -311,6 +329,15 @@ document.addEventListener("DOMContentLoaded", function () {
         };
     }
 
+    // Loading message for each build stage, see waitForJob in base/jobs.js
+    const STAGE_MESSAGES = {
+        queued: 'Waiting for a free worker...',
+        running: 'Generating LaTeX...',
+        rendered: 'LaTeX generated',
+        compiling: 'Compiling PDF...',
+        done: 'PDF ready'
+    };
+
     // Add step number animations on page load
     document.addEventListener('DOMContentLoaded', function () {
         const headings = document.querySelectorAll('.upload-section h3');
@@ -0,0 +1,51 @@
+import os
+import sys
+import stat
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Writes a PDF named after the .tex instead of running TeX
+STUB_PDFLATEX = """#!/usr/bin/env python3
+import os, sys
+args = sys.argv[1:]
+if "--version" in args:
+    print("pdfTeX stub")
+    sys.exit(0)
+out = args[args.index("-output-directory") + 1] if "-output-directory" in args else "."
+base = os.path.splitext(os.path.basename(args[-1]))[0]
+for arg in args:
+    if arg.startswith("-jobname="):
+        base = arg.split("=", 1)[1]
+with open(os.path.join(out, base + ".pdf"), "wb") as f:
+    f.write(b"%PDF-1.4 stub")
+"""
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    pdflatex = tmp_path / "pdflatex"
+    pdflatex.write_text(STUB_PDFLATEX)
+    pdflatex.chmod(pdflatex.stat().st_mode | stat.S_IEXEC)
+
+    # The app keeps its files under instance/ and logs to ../logs, relative
+    # to the working directory
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "work").mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'db.sqlite'}")
+    monkeypatch.setenv("SECRET_KEY", "test")
+    monkeypatch.setenv("MAX_CONTENT_LENGTH", "16 * 1024 * 1024")
+    monkeypatch.setenv("PDFLATEX_PATH", str(pdflatex))
+    monkeypatch.setenv("JOB_BACKEND", "eager")
+
+    from app import create_app
+
+    app = create_app()
+    yield app
+    from extensions import get_janitor, get_prefetcher
+
+    get_janitor(app).stop()
+    get_prefetcher(app).stop()
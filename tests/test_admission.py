@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.admission import AdmissionControl, CompileBusy
+
+
+def test_tickets_bound_pending_builds(tmp_path):
+    admission = AdmissionControl(str(tmp_path), slots=1, max_pending=2)
+    admission.admit("a")
+    admission.admit("b")
+
+    with pytest.raises(CompileBusy) as busy:
+        admission.admit("c")
+    assert busy.value.retry_after >= 1
+
+    # Any process can release a ticket, and a crashed worker's ticket expires
+    AdmissionControl(str(tmp_path), slots=1, max_pending=2).release("a")
+    admission.admit("c")
+    stale = time.time() - 3600
+    os.utime(os.path.join(str(tmp_path), "ticket-b"), (stale, stale))
+    assert admission.pending() == 1
+
+    stats = admission.stats()
+    assert (stats["admitted"], stats["rejected"]) == (3, 1)
+
+
+def test_slots_cap_concurrent_compiles(tmp_path):
+    admission = AdmissionControl(str(tmp_path), slots=1, poll_interval=0.01)
+    held = threading.Event()
+    release = threading.Event()
+
+    def compile_in_thread():
+        with admission.slot():
+            held.set()
+            release.wait(10)
+
+    thread = threading.Thread(target=compile_in_thread)
+    thread.start()
+    try:
+        assert held.wait(10)
+        assert admission.running() == 1
+        with pytest.raises(CompileBusy):
+            with admission.slot(timeout=0.1):
+                pass
+    finally:
+        release.set()
+        thread.join()
+
+    with admission.slot(timeout=1) as waited:
+        assert waited < 1
+    assert admission.stats()["slot_timeouts"] == 1
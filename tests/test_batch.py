@@ -0,0 +1,22 @@
+import os
+import sys
+import json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.batch import iter_inputs
+
+
+def test_output_names_are_safe_and_unique(tmp_path):
+    source = tmp_path / "cvs.jsonl"
+    ids = ["a b", "a_b", "../x", "x", "x", "A_B", ""]
+    source.write_text("".join(json.dumps({"id": cv_id, "cv": {}}) + "\n" for cv_id in ids))
+
+    inputs = list(iter_inputs(str(source)))
+
+    # The checkpoint keeps the ids as given
+    assert [cv_id for cv_id, _, _ in inputs] == ids
+    names = [name for _, name, _ in inputs]
+    assert names == ["a_b", "a_b_000002", "x", "x_000004", "x_000005", "A_B_000006", "line-000007"]
+    assert all(os.sep not in name and not name.startswith(".") for name in names)
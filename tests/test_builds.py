@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def new_generator():
+    import builds
+
+    with open(os.path.join(ROOT, "mock", "mock.json")) as f:
+        return builds.new_generator(json.load(f), template="Professional")
+
+
+def run_with_timeout(target, timeout=30):
+    """Run target in a thread, a deadlock fails the test instead of hanging it"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", target()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "build_once did not return"
+    return result["value"]
+
+
+def test_build_once_eager_backend(app):
+    import builds
+    from cv_gen.job_queue import DONE
+    from extensions import get_job_queue
+
+    def build():
+        with app.app_context():
+            return builds.build_once(new_generator())
+
+    job_id, pdf_filename = run_with_timeout(build)
+
+    with app.app_context():
+        assert get_job_queue(app).status(job_id)["status"] == DONE
+        assert os.path.exists(os.path.join(app.config["PDF_OUTPUT_FOLDER"], pdf_filename))
+    assert pdf_filename not in builds._running_builds
+
+    # The finished job is not joined, a second call submits again and hits the cache
+    second_job_id, second_pdf_filename = run_with_timeout(build)
+    assert second_pdf_filename == pdf_filename
+    assert second_job_id != job_id
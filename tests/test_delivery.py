@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+KEY = "ab" * 32
+
+
+@pytest.fixture
+def pdf(app):
+    path = os.path.join(app.config["PDF_OUTPUT_FOLDER"], f"{KEY}.pdf")
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4 " + b"x" * 100)
+    return f"{KEY}.pdf"
+
+
+@pytest.mark.parametrize("offload", ["python", "nginx"])
+def test_send_pdf_uses_a_weak_etag(app, pdf, offload):
+    import delivery
+
+    app.config["FILE_OFFLOAD"] = offload
+    with app.test_request_context("/"):
+        response = delivery.send_pdf(pdf)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"{KEY}"'
+
+    # Revalidating with either form of the tag is answered without the file
+    os.remove(os.path.join(app.config["PDF_OUTPUT_FOLDER"], pdf))
+    for tag in (f'W/"{KEY}"', f'"{KEY}"'):
+        with app.test_request_context("/", headers={"If-None-Match": tag}):
+            response = delivery.send_pdf(pdf)
+        assert response.status_code == 304
+        assert response.headers["ETag"] == f'W/"{KEY}"'
+
+
+def test_send_pdf_answers_range_requests(app, pdf):
+    import delivery
+
+    with app.test_request_context("/", headers={"Range": "bytes=0-3"}):
+        response = delivery.send_pdf(pdf)
+        response.direct_passthrough = False
+        assert response.status_code == 206
+        assert response.get_data() == b"%PDF"
@@ -0,0 +1,37 @@
+import io
+import os
+import sys
+import hashlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.ingest import ingest, UploadRejected
+
+
+def test_same_upload_is_stored_once(tmp_path):
+    content = b'{"personal_info": {"name": "Ada"}}'
+
+    first = ingest(io.BytesIO(content), str(tmp_path), "JSON", chunk_size=8)
+    second = ingest(io.BytesIO(content), str(tmp_path), "json")
+
+    assert first.digest == hashlib.sha256(content).hexdigest()
+    assert first.path == second.path == os.path.join(str(tmp_path), f"{first.digest}.json")
+    assert (first.duplicate, second.duplicate) == (False, True)
+    assert first.size == len(content)
+    assert os.listdir(str(tmp_path)) == [f"{first.digest}.json"]
+
+
+@pytest.mark.parametrize("content, extension, max_bytes", [
+    (b"x" * 100, "json", 10),
+    (b"GIF89a....", "png", None),
+    (b"{\0}", "json", None),
+    (b"\xff\xfe", "txt", None),
+    (b"", "json", None),
+])
+def test_rejected_uploads_leave_nothing_behind(tmp_path, content, extension, max_bytes):
+    with pytest.raises(UploadRejected):
+        ingest(io.BytesIO(content), str(tmp_path), extension, max_bytes=max_bytes, chunk_size=8)
+    assert os.listdir(str(tmp_path)) == []
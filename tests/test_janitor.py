@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.janitor import Janitor
+
+
+def test_sweep_removes_expired_managed_files(tmp_path):
+    uploads = tmp_path / "uploads"
+    pdfs = tmp_path / "pdfs"
+    uploads.mkdir()
+    pdfs.mkdir()
+    old = time.time() - 3600
+    for path in [pdfs / "old.pdf", pdfs / "logo.png"]:
+        path.write_bytes(b"12345")
+        os.utime(path, (old, old))
+
+    janitor = Janitor(
+        str(tmp_path / "janitor.sqlite"),
+        {str(uploads): 60, str(pdfs): 60},
+        managed={str(pdfs): lambda name: name.endswith(".pdf")},
+    )
+    # Files that were there before the index are adopted with their mtime
+    janitor.adopt()
+    now = time.time()
+    assert janitor.sweep(now=now) == (1, 5)
+    assert not (pdfs / "old.pdf").exists()
+    assert (pdfs / "logo.png").exists()
+
+    upload = uploads / "cv.json"
+    upload.write_text("{}")
+    (tmp_path / "untracked.json").write_text("{}")
+    for path in [upload, tmp_path / "untracked.json"]:
+        janitor.track(str(path), now=now)
+    # Tracking started the sweeping thread, sweep by hand instead
+    janitor.stop()
+    janitor._thread.join(10)
+
+    assert janitor.sweep(now=now + 30) == (0, 0)
+    assert janitor.sweep(now=now + 61) == (1, 2)
+    assert not upload.exists()
+    assert (tmp_path / "untracked.json").exists()
+
+    stats = janitor.stats()["folders"]
+    assert stats[os.path.relpath(pdfs)]["files_reclaimed"] == 1
+    assert stats[os.path.relpath(uploads)]["bytes_reclaimed"] == 2
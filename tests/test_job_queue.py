@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.job_queue import JobQueue, JobStore, DONE, FAILED
+
+
+class Events:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event["stage"]))
+
+
+def build(payload, progress):
+    if payload.get("fail"):
+        raise RuntimeError("pdflatex failed")
+    progress("compiling", pages=1)
+    return {"pdf": payload["name"] + ".pdf"}
+
+
+def test_job_records_are_shared_through_the_store(tmp_path):
+    events = Events()
+    job_queue = JobQueue(JobStore(str(tmp_path / "jobs")), backend="eager", events=events)
+    job_queue.register("build", build)
+
+    job_id = job_queue.submit("build", {"name": "cv"}, cv_id=1)
+    failed_id = job_queue.submit("build", {"fail": True})
+
+    # Another process reads the same records from the folder
+    store = JobStore(str(tmp_path / "jobs"))
+    record = store.get(job_id)
+    assert record["status"] == DONE
+    assert record["result"] == {"pdf": "cv.pdf"}
+    assert record["meta"] == {"cv_id": 1}
+    assert store.get(failed_id)["status"] == FAILED
+    assert store.get(failed_id)["error"] == "pdflatex failed"
+    assert [stage for channel, stage in events.published if channel == job_id] == [
+        "queued", "running", "compiling", "done"
+    ]
+
+    assert job_queue.status("../" + job_id) is None
+    with pytest.raises(KeyError):
+        job_queue.submit("missing", {})
+
+
+def test_thread_backend_wait(tmp_path):
+    job_queue = JobQueue(JobStore(str(tmp_path / "jobs")), backend="thread", workers=2)
+    job_queue.register("build", build)
+
+    job_ids = [job_queue.submit("build", {"name": f"cv{n}"}) for n in range(4)]
+
+    for n, job_id in enumerate(job_ids):
+        record = job_queue.wait(job_id, timeout=10)
+        assert record["status"] == DONE
+        assert record["result"] == {"pdf": f"cv{n}.pdf"}
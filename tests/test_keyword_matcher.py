@@ -0,0 +1,33 @@
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.keyword_matcher import KeywordMatcher, matcher_for
+
+
+KEYWORDS = ["Python", "React", "React Native", "C", "C++", "Go", "Node.js", "SQL", "NoSQL"]
+
+
+def test_matches_like_a_search_per_keyword():
+    text = "Built React Native apps and a React site; Node.js, C++ and NoSQL. Going to python3? No: Python!"
+    matcher = KeywordMatcher(KEYWORDS)
+
+    expected = {
+        keyword for keyword in KEYWORDS
+        if re.search(r"\b" + re.escape(keyword.lower()) + r"\b", text.lower())
+    }
+    assert matcher.found(text) == expected
+    assert {"React", "React Native", "Python", "C"} <= expected
+    assert "Go" not in expected
+
+    lowered = text.lower()
+    for hit in matcher.finditer(text):
+        assert lowered[hit.start:hit.end] == hit.keyword.lower()
+
+
+def test_matchers_are_shared_per_keyword_list():
+    assert matcher_for(KEYWORDS) is matcher_for(list(KEYWORDS))
+    assert KeywordMatcher([]).found("anything") == set()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+from PyPDF2 import PdfWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.cv_parser import AdvancedResumeParser
+
+
+def write_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_pdf_budget_is_off_by_default_and_reports_truncation(tmp_path):
+    pdf_path = write_pdf(tmp_path / "long.pdf", 12)
+
+    report = {}
+    list(AdvancedResumeParser(use_nlp=False).iter_pdf_pages(pdf_path, report=report))
+    assert report == {"page_count": 12, "pages_read": 12, "truncated_by": None}
+
+    parser = AdvancedResumeParser(use_nlp=False, pdf_max_pages=5)
+    parsed = parser.parse_resume(pdf_path, "dict")
+    assert parsed["extraction"] == {"page_count": 12, "pages_read": 5, "truncated_by": "max_pages"}
+
+    [result] = parser.parse_many([pdf_path], workers=1)
+    assert result["extraction"]["truncated_by"] == "max_pages"
+
+
+def test_parse_many_abandons_slow_resumes(tmp_path):
+    parser = AdvancedResumeParser(use_nlp=False)
+    parse_text = parser.parse_text
+
+    def slow_parse_text(text, output_format="json"):
+        if "slow" in text:
+            time.sleep(10)
+        return parse_text(text, output_format)
+
+    parser.parse_text = slow_parse_text
+    items = ["Ada Lovelace\nada@example.com", "slow\nresume", str(tmp_path / "missing.pdf")]
+
+    started_at = time.monotonic()
+    results = list(parser.parse_many(items, workers=1, timeout=0.5))
+
+    assert time.monotonic() - started_at < 5
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["status"] for result in results] == ["ok", "timeout", "failed"]
+    assert results[0]["data"]["personal_info"]["email"] == "ada@example.com"
+    assert results[1]["data"] is None
@@ -0,0 +1,39 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.render_cache import RenderCache
+
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"%" * size)
+    return str(path)
+
+
+def test_least_recently_used_pdf_is_evicted_and_served_copies_survive(tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=250)
+
+    for key in ["a", "b"]:
+        cache.put(key, write(tmp_path / f"{key}.pdf", 100))
+
+    # Serving "a" makes "b" the least recently used entry
+    served = str(output / "a.pdf")
+    assert cache.get("a", served)
+    assert os.path.samefile(served, os.path.join(cache.cache_dir, "a.pdf"))
+
+    cache.put("c", write(tmp_path / "c.pdf", 100))
+    assert not cache.get("b", str(output / "b.pdf"))
+    assert cache.stats() == {"entries": 2, "bytes": 200, "max_bytes": 250, "hits": 1, "misses": 1}
+
+    # Evicting a cached PDF leaves the hard link being served in place
+    cache.put("d", write(tmp_path / "d.pdf", 100))
+    assert not os.path.exists(os.path.join(cache.cache_dir, "a.pdf"))
+    assert os.path.getsize(served) == 100
+
+    # The LRU index is rebuilt from the folder
+    assert RenderCache(cache.cache_dir, max_bytes=250).stats()["entries"] == 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_gen.generator import Generator
+from cv_gen.fragment_cache import FragmentCache
+from cv_gen.objects import Section, Text, Link
+from cv_gen.renderers import LatexRenderer, HtmlRenderer
+from cv_gen.template_registry import escape_hash
+
+
+def load_fixture():
+    with open(os.path.join(ROOT, "mock", "mock.json")) as f:
+        cv_data = json.load(f)
+    cv_data["content"]["technologies"].append("C#")
+    return cv_data
+
+
+def walk(node):
+    yield node
+    for child in node.children:
+        yield from walk(child)
+    link = getattr(node, "link", None)
+    if link is not None:
+        yield link
+
+
+def test_latex_and_html_render_the_same_tree():
+    cv_generator = Generator(load_fixture())
+    document = cv_generator.build_document()
+    latex = document.decode(LatexRenderer(cv_generator))
+    preview = document.decode(HtmlRenderer(template=cv_generator.template))
+
+    sections = [node for node in document.children if isinstance(node, Section)]
+    assert sections
+
+    # Sections come out in the same order in both
+    latex_positions = [latex.index(f"\\section{{{escape_hash(s.title)}}}") for s in sections]
+    html_positions = [preview.index(f"<h2>{html.escape(s.title)}</h2>") for s in sections]
+    assert latex_positions == sorted(latex_positions)
+    assert html_positions == sorted(html_positions)
+
+    # Every piece of text and every link of the tree is in both outputs
+    for node in (node for section in sections for node in walk(section)):
+        if isinstance(node, Text) and str(node.text).strip():
+            assert escape_hash(node.text) in latex
+            assert html.escape(str(node.text)) in preview
+        elif isinstance(node, Link):
+            assert f"\\href{{{node.url}}}" in latex
+            assert f'href="{html.escape(node.url)}"' in preview
+
+    assert "C\\#" in latex
+
+
+def test_latex_sections_use_the_fragment_cache():
+    cache = FragmentCache()
+    cv_data = load_fixture()
+    first = Generator(cv_data, fragment_cache=cache).make_cv()
+    second = Generator(cv_data, fragment_cache=cache).make_cv()
+
+    assert first == second
+    assert cache.stats()["sections"]["education"] == {"hits": 1, "misses": 1}
+
+
+def test_preview_links_stay_on_safe_targets():
+    cv_data = load_fixture()
+    cv_data["personal_info"]["linkedin"] = "//evil.example/profile"
+    cv_data["personal_info"]["github"] = "javascript:alert(1)"
+    cv_data["content"]["projects"][0]["github_link"] = "/\\evil.example"
+    preview = Generator(cv_data).build_document().decode(HtmlRenderer())
+
+    assert 'href="//evil.example' not in preview
+    assert 'href="javascript:' not in preview
+    assert 'href="/\\evil.example' not in preview
+    assert 'href="mailto:' in preview